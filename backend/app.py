@@ -1,17 +1,57 @@
 from flask import Flask, jsonify, send_from_directory
+import numpy as np
 import pandas as pd
 import os
 
 app = Flask(__name__)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 NOTEBOOK_DIR = os.path.abspath(os.path.join(BASE_DIR, '../notebook'))
+# Published by the analysis pipeline: CURRENT names the live version, a
+# subdirectory holding dates.npy (int64 epoch days) and prices.npy (float64)
+PRICE_STORE_DIR = os.path.join(NOTEBOOK_DIR, 'price_store')
+
+# Per-process state, refreshed only when the files on disk change
+_price_store = {'version': None, 'days': None, 'prices': None}
+_change_points = {'mtime': None, 'records': None}
+
+
+def load_price_store():
+    # Read-only memory maps: every worker shares the same pages, nothing is parsed.
+    # CURRENT is replaced only after a version's files are complete, so keying
+    # on it never pairs dates and prices from different runs.
+    with open(os.path.join(PRICE_STORE_DIR, 'CURRENT')) as f:
+        version = f.read().strip()
+    if _price_store['version'] != version:
+        version_dir = os.path.join(PRICE_STORE_DIR, version)
+        _price_store.update(
+            version=version,
+            days=np.load(os.path.join(version_dir, 'dates.npy'), mmap_mode='r'),
+            prices=np.load(os.path.join(version_dir, 'prices.npy'), mmap_mode='r'),
+        )
+    return _price_store['days'], _price_store['prices']
+
+
+def load_change_points():
+    csv_path = os.path.join(NOTEBOOK_DIR, 'change_points.csv')
+    mtime = os.stat(csv_path).st_mtime_ns
+    if _change_points['mtime'] != mtime:
+        df = pd.read_csv(csv_path)
+        df.fillna('N/A', inplace=True)  # 👈 Replaces NaN with 'N/A'
+        _change_points.update(mtime=mtime, records=df.to_dict(orient='records'))
+    return _change_points['records']
+
+
+@app.route('/api/prices')
+def get_prices():
+    days, prices = load_price_store()
+    return jsonify({
+        'dates': np.asarray(days, dtype='datetime64[D]').astype(str).tolist(),
+        'prices': prices.tolist()
+    })
 
 @app.route('/api/change_points')
 def get_change_points():
-    csv_path = os.path.join(NOTEBOOK_DIR, 'change_points.csv')
-    df = pd.read_csv(csv_path)
-    df.fillna('N/A', inplace=True)  # 👈 Replaces NaN with 'N/A'
-    return jsonify(df.to_dict(orient='records'))
+    return jsonify(load_change_points())
 
 @app.route('/api/plot')
 def get_plot():
@@ -20,6 +60,6 @@ def get_plot():
 @app.route('/')
 def home():
     return "Flask backend is running!"
-    
+
 if __name__ == '__main__':
     app.run(debug=True, port=8080)
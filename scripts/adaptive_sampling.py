@@ -0,0 +1,118 @@
+# Convergence-driven sampling
+#
+# Instead of a fixed number of draws, chains are sampled in batches. After
+# each batch, split R-hat and bulk/tail ESS are computed over everything drawn
+# so far, and sampling stops once every monitored variable meets the targets.
+# Undefined (non-finite) diagnostics count as unmet: a discrete tau stuck at
+# different values in different chains has no finite R-hat. Each later batch
+# restarts every chain from its last draw, in the same worker processes, with
+# NUTS warm-started from the previous batch's step size and posterior
+# variances (see warm_start.py), so the short re-tuning phase only
+# fine-tunes. If max_draws is reached first, the posterior is returned
+# marked unconverged, with a warning.
+#
+# Diagnostics are recomputed over all accumulated draws after every batch,
+# so their total cost is O(total draws x batches), i.e. quadratic in the
+# number of batches. max_draws / batch_draws bounds the batches, and at the
+# default 20 batches this is small next to the sampling itself.
+
+import json
+import warnings
+
+import numpy as np
+
+from .backends import backend_sample_kwargs
+from .parallel_sampling import chain_pool, concat_traces, sample_parallel
+from .warm_start import warm_step_factory
+
+DEFAULT_TARGETS = {'r_hat': 1.01, 'ess_bulk': 400, 'ess_tail': 400}
+MONITORED_VARS = ('tau_sorted', 'mu', 'sigma')
+
+
+def convergence_report(trace, var_names=MONITORED_VARS):
+    """Worst R-hat and smallest bulk/tail ESS over var_names.
+
+    Any non-finite diagnostic (e.g. the R-hat of a variable stuck at
+    different values in different chains) makes the reported value NaN.
+    """
+    import arviz as az
+
+    var_names = [v for v in var_names if v in trace.posterior]
+    r_hat = az.rhat(trace, var_names=var_names)
+    ess_bulk = az.ess(trace, var_names=var_names, method='bulk')
+    ess_tail = az.ess(trace, var_names=var_names, method='tail')
+
+    def worst(dataset, reduce):
+        values = np.concatenate([np.ravel(dataset[v].values) for v in dataset.data_vars])
+        return float(reduce(values)) if values.size and np.isfinite(values).all() else float('nan')
+    return {'r_hat': worst(r_hat, np.max), 'ess_bulk': worst(ess_bulk, np.min),
+            'ess_tail': worst(ess_tail, np.min), 'draws': int(trace.posterior.sizes['draw'])}
+
+
+def targets_met(report, targets):
+    # NaN compares false, so undefined diagnostics never count as met
+    return (report['r_hat'] <= targets['r_hat'] and report['ess_bulk'] >= targets['ess_bulk']
+            and report['ess_tail'] >= targets['ess_tail'])
+
+
+def _last_points(trace, free_vars):
+    posterior = trace.posterior
+    return [{v: posterior[v].values[c, -1] for v in free_vars}
+            for c in range(posterior.sizes['chain'])]
+
+
+def _append_draws(trace, batch):
+    offset = trace.posterior.sizes['draw']
+    for group in batch.groups():
+        dataset = getattr(batch, group)
+        if 'draw' in dataset.dims:
+            setattr(batch, group, dataset.assign_coords(draw=dataset['draw'].values + offset))
+    return concat_traces([trace, batch], dim='draw')
+
+
+def sample_until_converged(factory, free_vars, tune=1000, batch_draws=250, max_draws=5000,
+                           retune=100, chains=4, cores=None, random_seed=None, backend='c',
+                           targets=None, var_names=MONITORED_VARS, postprocess=None, initvals=None,
+                           step_factory=None):
+    """Sample in batches of batch_draws until targets are met or max_draws is reached.
+
+    free_vars names the model's free variables (the starting point of the
+    next batch); postprocess(batch, seed) is applied to every batch before it
+    is merged, e.g. to draw tau for the marginal model. initvals and
+    step_factory apply to the first batch only (see sample_parallel); later
+    batches warm-start NUTS from the previous batch. All batches share one
+    worker pool. max_draws caps the number of batches, which is the only
+    way out when a diagnostic stays undefined. The trace posterior gets
+    'converged' (0/1) and 'convergence' (JSON history of reports) attributes.
+    """
+    targets = {**DEFAULT_TARGETS, **(targets or {})}
+    n_batches = max(1, -(-max_draws // batch_draws))
+    seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(random_seed).spawn(n_batches)]
+    compile_kwargs = backend_sample_kwargs(backend).get('compile_kwargs')
+
+    trace, history = None, []
+    with chain_pool(chains, cores, backend=backend) as pool:
+        for b in range(n_batches):
+            if trace is None:
+                batch_tune, batch_initvals, batch_step = tune, initvals, step_factory
+            else:
+                batch_tune, batch_initvals = retune, _last_points(trace, free_vars)
+                batch_step = warm_step_factory(trace, compile_kwargs)
+            batch = sample_parallel(factory, batch_draws, batch_tune, chains, cores, seeds[b],
+                                    backend=backend, initvals=batch_initvals, step_factory=batch_step,
+                                    pool=pool)
+            if postprocess is not None:
+                postprocess(batch, seeds[b])
+            trace = batch if trace is None else _append_draws(trace, batch)
+            report = convergence_report(trace, var_names)
+            history.append(report)
+            if targets_met(report, targets):
+                break
+
+    converged = targets_met(history[-1], targets)
+    if not converged:
+        warnings.warn(f"Sampling stopped at {history[-1]['draws']} draws without reaching the "
+                      f"convergence targets {targets}: {history[-1]}")
+    trace.posterior.attrs['converged'] = int(converged)
+    trace.posterior.attrs['convergence'] = json.dumps(history)
+    return trace
@@ -0,0 +1,191 @@
+# Content-addressed cache of pipeline stage outputs
+#
+# Each stage gets a key hashed from its name, the keys of the stages it reads
+# from and its own parameters, so a key changes exactly when something the
+# stage depends on changes. Outputs live in objects/<key>/: the files the
+# stage wrote plus, optionally, its pickled return value. On a hit the files
+# are copied back into the output directory and the value is loaded, so
+# e.g. changing the event window leaves the sampling and plotting stages
+# untouched. Keys also carry a version per stage, bumped whenever a stage's
+# code changes what it produces. Entries are evicted like PosteriorCache
+# entries: unused for max_age_days, then least recently used beyond max_bytes.
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import time
+
+import numpy as np
+
+VALUE_FILE = 'value.pkl'
+COMPLETE_FILE = 'complete'
+DEFAULT_MAX_BYTES = 1 << 30
+DEFAULT_MAX_AGE_DAYS = 30
+
+# Bump a stage's version when a change to its code changes its outputs, so
+# entries written by the old code are not served again. Stages reading
+# another stage's output put that stage's key (or, for a small value such as
+# the selected K or the search windows, the value itself) among their
+# dependencies, so a bump also invalidates everything downstream. The
+# posterior itself is versioned per model in MODEL_VERSIONS of the pipeline.
+# Stages not listed are at version 1.
+STAGE_VERSIONS = {
+    'adf_test': 1,
+    'events': 1,
+    'eda_stats': 2,  # multi-window and EWMA columns
+    'pelt_screening': 1,
+    'k_selection': 1,
+    'coarse_search': 1,
+    'diagnostics': 1,
+    'change_points': 1,
+    'tau_draws': 1,
+    'event_probabilities': 1,
+    'event_study': 1,
+    'eda_plots': 1,
+    'diagnostics_plot': 1,
+    'change_point_plot': 1,
+    'online_detector': 2,  # min_run alert rule
+}
+
+
+def array_digest(*arrays):
+    """sha256 of the bytes of one or more arrays (memory maps are read, not copied)."""
+    digest = hashlib.sha256()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(str((array.dtype.str, array.shape)).encode())
+        digest.update(memoryview(array).cast('B'))
+    return digest.hexdigest()
+
+
+def stage_key(name, *dependencies, **params):
+    """Key of a stage from its version, dependency keys and JSON-serialisable parameters."""
+    payload = json.dumps({'stage': name, 'version': STAGE_VERSIONS.get(name, 1),
+                          'dependencies': list(dependencies), 'params': params},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def evict_entries(entries, remove, max_bytes, max_age_days, keep=None):
+    """Remove expired entries, then LRU entries beyond max_bytes; returns the removed keys.
+
+    entries is a list of (mtime, size, key), least recently used first, and
+    remove(key) deletes one entry.
+    """
+    removed = []
+    cutoff = time.time() - max_age_days * 86400
+    total = sum(size for _, size, _ in entries)
+    for mtime, size, key in entries:
+        if key == keep:
+            continue
+        if mtime < cutoff or total > max_bytes:
+            remove(key)
+            removed.append(key)
+            total -= size
+    return removed
+
+
+class ArtifactCache:
+    """Stage runner that skips stages whose key has been computed before.
+
+    A disabled cache runs every stage and stores nothing, so callers do not
+    need a separate code path.
+    """
+
+    def __init__(self, cache_dir, enabled=True, max_bytes=DEFAULT_MAX_BYTES,
+                 max_age_days=DEFAULT_MAX_AGE_DAYS):
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.hits = []
+        self.misses = []
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, 'objects', key[:2], key)
+
+    def has(self, key):
+        return self.enabled and os.path.exists(os.path.join(self._entry_dir(key), COMPLETE_FILE))
+
+    def restore(self, key, outputs, out_dir='.'):
+        """Copy a stored entry's files into out_dir, skipping identical ones."""
+        entry_dir = self._entry_dir(key)
+        for output in outputs:
+            src, dst = os.path.join(entry_dir, output), os.path.join(out_dir, output)
+            if not (os.path.exists(dst) and os.path.getsize(dst) == os.path.getsize(src)
+                    and _same_content(src, dst)):
+                shutil.copyfile(src, dst)
+
+    def run(self, name, key, compute, outputs=(), out_dir='.', load=None, store_value=True):
+        """Return the stage's value, computing it only if key is new.
+
+        compute() writes the files named in outputs into out_dir and returns
+        the stage value. On a hit, the files are restored into out_dir and the
+        value comes from load() if given (for values better re-read from an
+        output file), else from the pickled copy.
+        """
+        entry_dir = self._entry_dir(key)
+        if self.has(key):
+            os.utime(os.path.join(entry_dir, COMPLETE_FILE))
+            self.restore(key, outputs, out_dir)
+            self.hits.append(name)
+            if load is not None:
+                return load()
+            if store_value:
+                with open(os.path.join(entry_dir, VALUE_FILE), 'rb') as f:
+                    return pickle.load(f)
+            return None
+
+        value = compute()
+        self.misses.append(name)
+        if not self.enabled:
+            return value
+        # Write into a temporary directory and rename, so a crashed run never
+        # leaves an entry that looks complete
+        tmp_dir = f'{entry_dir}.{os.getpid()}.tmp'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for output in outputs:
+            shutil.copyfile(os.path.join(out_dir, output), os.path.join(tmp_dir, output))
+        if store_value and load is None:
+            with open(os.path.join(tmp_dir, VALUE_FILE), 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        open(os.path.join(tmp_dir, COMPLETE_FILE), 'w').close()
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(tmp_dir, entry_dir)
+        self.evict(keep=key)
+        return value
+
+    def entries(self):
+        """(last use, size, key) of every complete entry, least recently used first."""
+        entries = []
+        objects = os.path.join(self.cache_dir, 'objects')
+        for prefix in os.listdir(objects) if os.path.isdir(objects) else ():
+            for key in os.listdir(os.path.join(objects, prefix)):
+                entry_dir = os.path.join(objects, prefix, key)
+                try:
+                    used = os.stat(os.path.join(entry_dir, COMPLETE_FILE)).st_mtime
+                except OSError:  # in progress, or left by a crashed run
+                    continue
+                size = sum(os.path.getsize(os.path.join(entry_dir, name)) for name in os.listdir(entry_dir))
+                entries.append((used, size, key))
+        return sorted(entries)
+
+    def remove(self, key):
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    def evict(self, keep=None):
+        """Drop entries unused for max_age_days, then LRU ones beyond max_bytes."""
+        return evict_entries(self.entries(), self.remove, self.max_bytes, self.max_age_days, keep)
+
+
+def _same_content(a, b, chunk_size=1 << 20):
+    with open(a, 'rb') as fa, open(b, 'rb') as fb:
+        while True:
+            ca, cb = fa.read(chunk_size), fb.read(chunk_size)
+            if ca != cb:
+                return False
+            if not ca:
+                return True
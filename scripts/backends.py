@@ -0,0 +1,138 @@
+# Sampling backends
+#
+# The same PyMC model can be evaluated by PyTensor's C backend, compiled with
+# Numba, or handed to a JAX NUTS implementation (numpyro, blackjax). Which of
+# these work depends on the machine, so availability is probed once and the
+# fastest working backend is used unless one is requested. The pure-Python
+# linker is the last resort and orders of magnitude slower per gradient.
+#
+# A backend counts as available only once a trivial function has been
+# compiled and evaluated with it: an installed package says nothing about a
+# missing compiler, a broken LLVM or a JAX build for another CPU. Probes run
+# once per process. fit_model still walks down the ranking if sampling with
+# the chosen backend fails.
+
+import importlib.util
+import inspect
+import os
+import sys
+import warnings
+from functools import lru_cache
+
+# Fastest first. Numba ranks below C: its JIT compile takes longer than the
+# C build and per-gradient speed on these models is about the same.
+BACKENDS = ('numpyro', 'blackjax', 'c', 'numba', 'python')
+# JAX samplers run NUTS only, so they cannot sample the discrete tau model
+JAX_BACKENDS = ('numpyro', 'blackjax')
+# JAX reads this on import. The models are far too small to gain from a GPU,
+# and every chain or worker process grabbing one visible GPU would contend.
+JAX_PLATFORM_ENV = {'JAX_PLATFORMS': 'cpu'}
+
+
+def _has(module):
+    return importlib.util.find_spec(module) is not None
+
+
+@lru_cache(maxsize=None)
+def _sample_params():
+    from .cp_models import pm
+    return frozenset(inspect.signature(pm.sample).parameters)
+
+
+def _tensor_modules():
+    try:
+        import pytensor
+        import pytensor.tensor as pt
+    except ImportError:  # PyMC3 ships Theano
+        import theano as pytensor
+        import theano.tensor as pt
+    return pytensor, pt
+
+
+def _probe_function(mode):
+    import numpy as np
+    pytensor, pt = _tensor_modules()
+    if mode == 'C':
+        mode = pytensor.compile.mode.Mode(linker='cvm', optimizer='fast_run')
+    x = pt.dvector('x')
+    f = pytensor.function([x], (x ** 2).sum(), mode=mode)
+    return float(f(np.array([1.0, 2.0]))) == 5.0
+
+
+def _probe_jax(sampler):
+    pin_jax_to_cpu()
+    import jax
+    import jax.numpy as jnp
+    importlib.import_module(sampler)
+    return float(jax.jit(lambda v: (v ** 2).sum())(jnp.array([1.0, 2.0]))) == 5.0 and _probe_function('JAX')
+
+
+@lru_cache(maxsize=None)
+def backend_works(name):
+    """Whether backend name compiles and evaluates a trivial function here (probed once)."""
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            if name in JAX_BACKENDS:
+                return _has('jax') and _has(name) and _probe_jax(name)
+            if name == 'numba':
+                return _has('numba') and _probe_function('NUMBA')
+            if name == 'c':
+                return bool(_tensor_modules()[0].config.cxx) and _probe_function('C')
+            return True
+    except Exception:
+        return False
+
+
+def _candidates(variant=None):
+    # Backends this PyMC version can drive for variant, fastest first
+    params = _sample_params()
+    return [name for name in BACKENDS
+            if (name not in JAX_BACKENDS or ('nuts_sampler' in params and variant != 'discrete'))
+            and (name != 'numba' or 'compile_kwargs' in params)]
+
+
+def available_backends():
+    """Backends that compiled and ran a test function in this process, fastest first."""
+    return tuple(name for name in _candidates() if backend_works(name))
+
+
+def next_backend(variant='marginal', exclude=()):
+    """Fastest working backend for variant not in exclude, or None; probes only as far as needed."""
+    return next((name for name in _candidates(variant) if name not in exclude and backend_works(name)), None)
+
+
+def select_backend(requested='auto', variant='marginal'):
+    """Resolve 'auto' or a requested backend to one that works for variant.
+
+    A requested backend that is unavailable (or cannot sample the variant)
+    falls back to the automatic choice with a warning.
+    """
+    if requested in (None, 'auto'):
+        return next_backend(variant)
+    if requested not in BACKENDS:
+        raise ValueError(f"Unknown backend {requested!r}; expected 'auto' or one of {BACKENDS}")
+    if requested not in _candidates(variant) or not backend_works(requested):
+        fallback = next_backend(variant)
+        warnings.warn(f"Sampling backend {requested!r} is not available for the {variant} model; "
+                      f"using {fallback!r}")
+        return fallback
+    return requested
+
+
+def backend_sample_kwargs(backend):
+    """Extra pm.sample arguments selecting backend."""
+    if backend in JAX_BACKENDS:
+        return {'nuts_sampler': backend}
+    if backend == 'numba':
+        return {'compile_kwargs': {'mode': 'NUMBA'}}
+    if backend == 'python' and 'compile_kwargs' in _sample_params():
+        return {'compile_kwargs': {'mode': 'FAST_COMPILE'}}
+    return {}
+
+
+def pin_jax_to_cpu():
+    """Run JAX on the CPU in this process, also if jax is already imported."""
+    os.environ.update(JAX_PLATFORM_ENV)
+    if 'jax' in sys.modules:
+        sys.modules['jax'].config.update('jax_platforms', 'cpu')
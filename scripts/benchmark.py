@@ -0,0 +1,223 @@
+# Benchmark harness for the change point engines
+#
+# Generates synthetic log-return series with planted mean/variance breaks,
+# runs every available engine on them and reports wall time, peak memory,
+# ESS per second (samplers) and detection accuracy as the Hausdorff distance
+# between detected and true breaks. Engines whose cost grows too fast are
+# skipped above their max_n.
+#
+# Accuracy is only comparable between engines that look for the same kind of
+# break. pelt_mean assumes one variance for the whole series, so it is scored
+# on series with mean shifts only; every other engine models both mean and
+# variance and is scored on series whose breaks change both.
+#
+#   python -m scripts.benchmark --sizes 1000 10000 100000 1000000 --out bench.csv
+
+import argparse
+import importlib.util
+
+import numpy as np
+import pandas as pd
+
+from .bocpd import OnlineChangePointDetector
+from .conjugate_dp import fit_conjugate_dp
+from .pelt import pelt
+from .posterior_summary import tau_histograms
+from .profiling import StageProfiler
+
+
+def synthetic_series(n, n_breaks=3, min_spacing=None, random_seed=None, kind='meanvar'):
+    """Piecewise Normal log returns with planted breaks.
+
+    Returns (log_returns, breaks); breaks are segment start indices, the
+    tau_sorted convention. With kind='meanvar' segment means and
+    volatilities are drawn around daily Brent magnitudes, alternating calm
+    and turbulent regimes so every break is detectable in principle. With
+    kind='mean' every segment has the same volatility and consecutive means
+    differ by one to two standard deviations.
+    """
+    rng = np.random.default_rng(random_seed)
+    if min_spacing is None:
+        min_spacing = max(n // (4 * (n_breaks + 1)), 2)
+    # Spread the breaks so every segment has at least min_spacing points
+    slack = n - (n_breaks + 1) * min_spacing
+    offsets = np.sort(rng.integers(0, slack + 1, n_breaks))
+    breaks = offsets + min_spacing * np.arange(1, n_breaks + 1)
+    bounds = np.concatenate([[0], breaks, [n]])
+    if kind == 'mean':
+        scales = np.full(n_breaks + 1, 0.02)
+        steps = rng.uniform(1, 2, n_breaks) * rng.choice([-1, 1], n_breaks) * scales[0]
+        means = np.concatenate([[0], np.cumsum(steps)])
+    elif kind == 'meanvar':
+        means = rng.normal(0, 0.003, n_breaks + 1)
+        calm = np.arange(n_breaks + 1) % 2 == 0
+        scales = np.where(calm, rng.uniform(0.008, 0.015, n_breaks + 1),
+                          rng.uniform(0.025, 0.04, n_breaks + 1))
+    else:
+        raise ValueError(f"Unknown break kind {kind!r}; expected 'mean' or 'meanvar'")
+    log_returns = np.concatenate([
+        rng.normal(means[k], scales[k], bounds[k + 1] - bounds[k]) for k in range(n_breaks + 1)
+    ])
+    return log_returns, breaks.astype(np.int64)
+
+
+def hausdorff(detected, true):
+    """Symmetric Hausdorff distance between two sets of break indices."""
+    detected = np.asarray(detected, dtype=np.int64)
+    true = np.asarray(true, dtype=np.int64)
+    if detected.size == 0 and true.size == 0:
+        return 0.0
+    if detected.size == 0 or true.size == 0:
+        return np.inf
+    gaps = np.abs(detected[:, None] - true[None, :])
+    return float(max(gaps.min(axis=1).max(), gaps.min(axis=0).max()))
+
+
+def _posterior_modes(tau_draws):
+    return tau_histograms(tau_draws).argmax(axis=1).tolist()
+
+
+def _run_pelt_mean(log_returns, n_breaks):
+    return pelt(log_returns, cost='mean'), {}
+
+
+def _run_pelt_meanvar(log_returns, n_breaks):
+    return pelt(log_returns, cost='meanvar'), {}
+
+
+def _run_conjugate_dp(log_returns, n_breaks):
+    posterior, _ = fit_conjugate_dp(log_returns, n_breaks, draws=1000, random_seed=0)
+    return _posterior_modes(posterior['tau_sorted']), {}
+
+
+def map_run_onsets(map_run_lengths):
+    """Change points implied by the MAP run length after every return.
+
+    The MAP run after return t started at t - r_t. Walking back from the
+    last return, each such onset closes the previous segment, whose own
+    MAP run (after the return just before the onset) gives the next one.
+    """
+    change_points = []
+    t = len(map_run_lengths) - 1
+    while t >= 0:
+        onset = t - int(map_run_lengths[t])
+        if onset > 0:
+            change_points.append(onset)
+        t = onset - 1
+    return change_points[::-1]
+
+
+def _run_bocpd(log_returns, n_breaks):
+    # Alerts fire some returns after a break, so locations come from the run
+    # length posterior instead: the onset of the most probable run
+    detector = OnlineChangePointDetector()
+    map_run_lengths = np.empty(len(log_returns), dtype=np.int64)
+    for t, x in enumerate(np.asarray(log_returns, dtype=np.float64)):
+        detector.update(x)
+        map_run_lengths[t] = detector.map_run_length
+    return map_run_onsets(map_run_lengths), {}
+
+
+def _run_pymc(log_returns, n_breaks, variant):
+    import arviz as az
+    from .cp_models import (build_marginal_cp_model, build_multi_cp_model, pm,
+                            sample_tau_posterior)
+
+    build = build_marginal_cp_model if variant == 'marginal' else build_multi_cp_model
+    profiler = StageProfiler(trace_memory=False)
+    with build(log_returns, n_breaks), profiler.stage('sample'):
+        trace = pm.sample(500, tune=500, chains=2, cores=1, progressbar=False,
+                          random_seed=0)
+    if variant == 'marginal':
+        sample_tau_posterior(trace, log_returns, n_breaks, random_seed=0)
+    ess = az.ess(trace, var_names=['mu', 'sigma'])
+    min_ess = float(min(ess[v].values.min() for v in ess.data_vars))
+    return _posterior_modes(trace.posterior['tau_sorted'].values), {
+        'ess_per_s': min_ess / profiler.stages[0]['wall_s'],
+    }
+
+
+def _run_pymc_marginal(log_returns, n_breaks):
+    return _run_pymc(log_returns, n_breaks, 'marginal')
+
+
+def _run_pymc_discrete(log_returns, n_breaks):
+    return _run_pymc(log_returns, n_breaks, 'discrete')
+
+
+# name -> (runner, largest series length it is run on, kind of break it models)
+ENGINES = {
+    'pelt_mean': (_run_pelt_mean, 10 ** 6, 'mean'),
+    'pelt_meanvar': (_run_pelt_meanvar, 10 ** 6, 'meanvar'),
+    'bocpd': (_run_bocpd, 10 ** 5, 'meanvar'),
+    'conjugate_dp': (_run_conjugate_dp, 10 ** 4, 'meanvar'),
+    'pymc_marginal': (_run_pymc_marginal, 5 * 10 ** 3, 'meanvar'),
+    'pymc_discrete': (_run_pymc_discrete, 5 * 10 ** 3, 'meanvar'),
+}
+
+
+def available_engines():
+    have_pymc = (importlib.util.find_spec('pymc') is not None
+                 or importlib.util.find_spec('pymc3') is not None)
+    return [name for name in ENGINES if have_pymc or not name.startswith('pymc')]
+
+
+def run_benchmark(sizes=(10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6), engines=None, n_breaks=3,
+                  repeats=1, random_seed=0, trace_memory=True):
+    """Run every engine on synthetic series of each size; one row per run.
+
+    Each engine gets the series with the kind of break it models (see
+    ENGINES), recorded in the 'breaks' column.
+    """
+    engines = engines or available_engines()
+    rows = []
+    for n in sizes:
+        for rep in range(repeats):
+            series = {kind: synthetic_series(int(n), n_breaks, random_seed=random_seed + rep, kind=kind)
+                      for kind in {ENGINES[name][2] for name in engines}}
+            for name in engines:
+                runner, max_n, kind = ENGINES[name]
+                if n > max_n:
+                    continue
+                log_returns, true_breaks = series[kind]
+                profiler = StageProfiler(trace_memory=trace_memory)
+                with profiler.stage(name):
+                    detected, extra = runner(log_returns, n_breaks)
+                stage = profiler.stages[0]
+                rows.append({
+                    'engine': name,
+                    'breaks': kind,
+                    'n': int(n),
+                    'repeat': rep,
+                    'wall_s': stage['wall_s'],
+                    'cpu_s': stage['cpu_s'],
+                    'children_cpu_s': stage['children_cpu_s'],
+                    'peak_mem_delta_mb': stage['peak_mem_delta_mb'],
+                    'n_detected': len(detected),
+                    'hausdorff': hausdorff(detected, true_breaks),
+                    'ess_per_s': extra.get('ess_per_s', np.nan),
+                })
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark change point engines on synthetic data.')
+    parser.add_argument('--sizes', type=float, nargs='+', default=[1e3, 1e4, 1e5, 1e6])
+    parser.add_argument('--engines', nargs='+', choices=list(ENGINES), default=None)
+    parser.add_argument('--breaks', type=int, default=3)
+    parser.add_argument('--repeats', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true', help='skip tracemalloc (faster)')
+    parser.add_argument('--out', help='write the results to this CSV')
+    args = parser.parse_args(argv)
+
+    results = run_benchmark([int(s) for s in args.sizes], args.engines, args.breaks, args.repeats,
+                            args.seed, trace_memory=not args.no_memory)
+    print(results.to_string(index=False))
+    if args.out:
+        results.to_csv(args.out, index=False)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,36 @@
 # Comprehensive Brent Oil Price Change Point Analysis and Dashboard
 # Tasks: Data Analysis Workflow, Bayesian Change Point Modeling, and Interactive Dashboard
 # Date: August 5, 2025
+#
+# Every stage is a function, so tools that only need the price loader or the
+# event table can import this module without running the analysis. pymc,
+# arviz, matplotlib, statsmodels and scipy are imported inside the stages
+# that use them. The full pipeline runs from the command line:
+#
+#   python -m scripts.brent_oil_change_point_model --csv BrentOilPrices.csv --variant marginal
+
+import argparse
+import os
+import shutil
+import warnings
 
 import pandas as pd
 import numpy as np
-import pymc3 as pm
-import matplotlib.pyplot as plt
-import arviz as az
-from statsmodels.tsa.stattools import adfuller
-from datetime import datetime
-from flask import Flask, jsonify
-import os
+
+from .artifact_cache import ArtifactCache, array_digest, stage_key
+from .backends import BACKENDS
+from .eda_stats import eda_statistics
+from .event_association import associate_events, event_break_probabilities
+from .event_catalog import EventCatalog
+from .event_study import ESTIMATION_WINDOW, EVENT_WINDOWS, event_study
+from .ingest import DOWNSTREAM_ARTIFACTS, ingest_prices, mark_fresh
+from .pelt import default_penalty, pelt_sweep
+from .posterior_cache import PosteriorCache, posterior_key
+from .posterior_summary import HDI_PROBS, summarize_change_points, tau_histograms
+from .price_cache import CACHE_DIRNAME
+from .price_store import from_epoch_days, publish_price_store
+from .profiling import StageProfiler
+from .rolling_stats import EWMA_LAMBDAS, ROLLING_WINDOWS, rolling_std
 
 # ---------------------------------------
 # Task 1: Laying the Foundation for Analysis
@@ -43,153 +63,342 @@ Communication Channels:
 - Presentation slides for government bodies.
 """
 
-# Load and preprocess Brent oil price data
-df = pd.read_csv('BrentOilPrices.csv')  # Assumes CSV with 'Date' and 'Price' columns
-df['Date'] = pd.to_datetime(df['Date'], format='%d-%b-%y')
-df = df.sort_values('Date')
-prices = df['Price'].values
-dates = df['Date'].values
-time_idx = np.arange(len(prices))
-
-# Exploratory Data Analysis (EDA)
-# Plot raw price series
-plt.figure(figsize=(12, 6))
-plt.plot(dates, prices, label='Brent Oil Price (USD)')
-plt.title('Brent Oil Prices (1987-2022)')
-plt.xlabel('Date')
-plt.ylabel('Price (USD/barrel)')
-plt.legend()
-plt.savefig('eda_prices.png')
-plt.close()
-
-# Check stationarity with Augmented Dickey-Fuller test
-result = adfuller(prices)
-print(f'ADF Statistic: {result[0]}, p-value: {result[1]}')  # p > 0.05 indicates non-stationarity
-
-# Compute and plot log returns for stationarity
-log_returns = np.diff(np.log(prices))
-plt.figure(figsize=(12, 6))
-plt.plot(dates[1:], log_returns, label='Log Returns')
-plt.title('Log Returns of Brent Oil Prices')
-plt.xlabel('Date')
-plt.ylabel('Log Returns')
-plt.legend()
-plt.savefig('eda_log_returns.png')
-plt.close()
-
-# Analyze volatility (30-day rolling standard deviation)
-rolling_std = pd.Series(log_returns).rolling(window=30).std()
-plt.figure(figsize=(12, 6))
-plt.plot(dates[1:], rolling_std, label='30-Day Rolling Std Dev')
-plt.title('Volatility of Brent Oil Log Returns')
-plt.xlabel('Date')
-plt.ylabel('Standard Deviation')
-plt.legend()
-plt.savefig('eda_volatility.png')
-plt.close()
+MODEL_VARIANTS = ('marginal', 'discrete', 'conjugate_dp')
+# Part of every posterior key: bump a variant's version when a change to its
+# likelihood, priors or sampler changes its posterior, so cached posteriors
+# (and every stage keyed on them) are not reused
+MODEL_VERSIONS = {'marginal': 1, 'discrete': 1, 'conjugate_dp': 1}
+# (draws, tune) per variant; the exact DP draws posterior samples without tuning
+SAMPLER_DEFAULTS = {'marginal': (1000, 1000), 'discrete': (2000, 1000), 'conjugate_dp': (4000, 0)}
+DEFAULT_CHAINS = 4
+# Adaptive sampling draws in batches of this size, up to ADAPTIVE_MAX_DRAWS
+ADAPTIVE_BATCH_DRAWS = 250
+ADAPTIVE_MAX_DRAWS = 5000
+# Free variables of each MCMC model, used to restart chains between batches
+FREE_VARS = {'marginal': ('mu', 'sigma'), 'discrete': ('tau', 'mu', 'sigma')}
 
 # Compile event dataset (10-15 major events)
-events_data = [
-    {'Event_Date': '1991-01-17', 'Event_Description': 'Gulf War Begins'},
-    {'Event_Date': '2003-03-20', 'Event_Description': 'Iraq War Begins'},
-    {'Event_Date': '2008-09-15', 'Event_Description': 'Global Financial Crisis'},
-    {'Event_Date': '2011-02-15', 'Event_Description': 'Arab Spring Onset'},
-    {'Event_Date': '2014-06-10', 'Event_Description': 'ISIS Insurgency in Iraq'},
-    {'Event_Date': '2014-11-27', 'Event_Description': 'OPEC Maintains Production'},
-    {'Event_Date': '2016-11-30', 'Event_Description': 'OPEC Production Cut'},
-    {'Event_Date': '2018-05-08', 'Event_Description': 'U.S. Withdraws from Iran Deal'},
-    {'Event_Date': '2020-03-08', 'Event_Description': 'OPEC+ Price War'},
-    {'Event_Date': '2020-04-12', 'Event_Description': 'OPEC+ Production Cut'},
-    {'Event_Date': '2022-02-24', 'Event_Description': 'Russia-Ukraine Conflict Begins'},
+EVENTS = [
+    {'Event_Date': '1991-01-17', 'Event_Description': 'Gulf War Begins', 'Event_Type': 'Conflict'},
+    {'Event_Date': '2003-03-20', 'Event_Description': 'Iraq War Begins', 'Event_Type': 'Conflict'},
+    {'Event_Date': '2008-09-15', 'Event_Description': 'Global Financial Crisis', 'Event_Type': 'Economic'},
+    {'Event_Date': '2011-02-15', 'Event_Description': 'Arab Spring Onset', 'Event_Type': 'Political'},
+    {'Event_Date': '2014-06-10', 'Event_Description': 'ISIS Insurgency in Iraq', 'Event_Type': 'Conflict'},
+    {'Event_Date': '2014-11-27', 'Event_Description': 'OPEC Maintains Production', 'Event_Type': 'OPEC Policy'},
+    {'Event_Date': '2016-11-30', 'Event_Description': 'OPEC Production Cut', 'Event_Type': 'OPEC Policy'},
+    {'Event_Date': '2018-05-08', 'Event_Description': 'U.S. Withdraws from Iran Deal', 'Event_Type': 'Sanctions'},
+    {'Event_Date': '2020-03-08', 'Event_Description': 'OPEC+ Price War', 'Event_Type': 'OPEC Policy'},
+    {'Event_Date': '2020-04-12', 'Event_Description': 'OPEC+ Production Cut', 'Event_Type': 'OPEC Policy'},
+    {'Event_Date': '2022-02-24', 'Event_Description': 'Russia-Ukraine Conflict Begins', 'Event_Type': 'Conflict'},
 ]
-events = pd.DataFrame(events_data)
-events['Event_Date'] = pd.to_datetime(events['Event_Date'])
-events.to_csv('events.csv', index=False)
+
+
+def load_prices(csv_path='BrentOilPrices.csv', window=30):
+    """Load and preprocess Brent oil price data.
+
+    Assumes a CSV with 'Date' and 'Price' columns. Only rows appended since
+    the last call are parsed and validated; the returned ingest record holds
+    memory-mapped 'prices', 'log_returns' and 'rolling_std' (window-day)
+    arrays, plus 'dates' as datetime64 values.
+    """
+    ingested = ingest_prices(csv_path, window=window)
+    ingested['dates'] = from_epoch_days(ingested['days']).values
+    return ingested
+
+
+def compute_returns(prices, window=30):
+    """Log returns of a price series and their rolling standard deviation."""
+    log_returns = np.diff(np.log(np.asarray(prices, dtype=np.float64)))
+    return log_returns, rolling_std(log_returns, window)
+
+
+def adf_test(series):
+    """Augmented Dickey-Fuller test; p > 0.05 indicates non-stationarity."""
+    from statsmodels.tsa.stattools import adfuller
+    return adfuller(series)
+
+
+def load_events(path=None):
+    """Event table from events.csv, or the curated list when path is None."""
+    events = pd.read_csv(path) if path else pd.DataFrame(EVENTS)
+    events['Event_Date'] = pd.to_datetime(events['Event_Date'])
+    return events
+
+
+def load_event_catalog(path=None):
+    """EventCatalog from a saved catalog directory, an events CSV, or the curated list."""
+    if path and os.path.isdir(path):
+        return EventCatalog.open(path)
+    return EventCatalog.from_frame(load_events(path))
+
+
+def screen_change_points(log_returns, factors=(0.5, 1, 2, 4), cost='meanvar'):
+    """Fast screening: PELT breaks for a sweep of penalties (milliseconds).
+
+    Returns ({penalty: breaks}, default_penalty); the penalties are the
+    default BIC-style penalty scaled by each factor.
+    """
+    base = default_penalty(log_returns, cost)
+    return pelt_sweep(log_returns, [base * f for f in factors], cost=cost), base
+
 
 # ---------------------------------------
 # Task 2: Change Point Modeling and Insight Generation
 # ---------------------------------------
 
-# Part 2.1: Core Analysis (Multiple Change Point Model)
-with pm.Model() as multi_cp_model:
-    n_change_points = 3  # Adjust based on data complexity
-    tau = pm.DiscreteUniform("tau", lower=0, upper=len(log_returns)-1, shape=n_change_points)
-    tau_sorted = pm.Deterministic("tau_sorted", pm.math.sort(tau))
-    mu = pm.Normal("mu", mu=0, sd=0.1, shape=n_change_points+1)
-    sigma = pm.HalfNormal("sigma", sd=0.1)
-    
-    # Define piecewise mean for log returns
-    idx = time_idx[:-1]
-    mu_t = pm.math.switch(idx < tau_sorted[0], mu[0], 
-                          pm.math.switch(idx < tau_sorted[1], mu[1],
-                                         pm.math.switch(idx < tau_sorted[2], mu[2], mu[3])))
-    
-    # Likelihood
-    likelihood = pm.Normal("likelihood", mu=mu_t, sd=sigma, observed=log_returns)
-    
-    # MCMC sampling
-    trace = pm.sample(2000, tune=1000, return_inferencedata=True)
-
-# Model diagnostics
-print(az.summary(trace, var_names=["tau_sorted", "mu", "sigma"]))
-az.plot_trace(trace, var_names=["tau_sorted", "mu", "sigma"])
-plt.savefig('model_diagnostics.png')
-plt.close()
-
-# Extract change points
-tau_modes = [int(np.bincount(trace.posterior["tau_sorted"].values[:, :, i].flatten()).argmax()) 
-             for i in range(n_change_points)]
-change_point_dates = [dates[tau + 1] for tau in tau_modes]  # Adjust for log returns offset
-print("Detected Change Points:")
-for i, cp_date in enumerate(change_point_dates):
-    print(f"Change Point {i+1}: {cp_date.strftime('%Y-%m-%d')}")
-
-# Quantify impact
-mu_means = trace.posterior["mu"].mean(dim=["chain", "draw"]).values
-for i in range(n_change_points):
-    price_change_percent = (np.exp(mu_means[i+1]) - np.exp(mu_means[i])) / np.exp(mu_means[i]) * 100
-    print(f"Segment {i} to {i+1}: Mean log return from {mu_means[i]:.4f} to {mu_means[i+1]:.4f}, "
-          f"Estimated price change: {price_change_percent:.2f}%")
-
-# Associate change points with events
-window = pd.Timedelta(days=7)
-change_point_events = []
-for cp_date in change_point_dates:
-    relevant_events = events[(events['Event_Date'] >= cp_date - window) & 
-                            (events['Event_Date'] <= cp_date + window)]
-    if not relevant_events.empty:
-        closest_event = relevant_events.iloc[0]
-        change_point_events.append({
-            'Change_Point_Date': cp_date.strftime('%Y-%m-%d'),
-            'Event_Date': closest_event['Event_Date'].strftime('%Y-%m-%d'),
-            'Event_Description': closest_event['Event_Description']
-        })
+def _sampler_settings(variant, draws=None, tune=None, chains=None, backend='auto', targets=None,
+                      max_draws=None, warm_start=None):
+    if variant not in MODEL_VARIANTS:
+        raise ValueError(f"Unknown model variant {variant!r}; expected one of {MODEL_VARIANTS}")
+    default_draws, default_tune = SAMPLER_DEFAULTS[variant]
+    settings = {'draws': default_draws if draws is None else draws,
+                'tune': default_tune if tune is None else tune}
+    if variant != 'conjugate_dp':
+        settings['chains'] = DEFAULT_CHAINS if chains is None else chains
+        settings['backend'] = backend
+        if warm_start is not None:
+            from .warm_start import WARM_TUNE, warm_start_id
+            if tune is None:
+                settings['tune'] = WARM_TUNE
+            settings['warm_start'] = warm_start_id(warm_start)
+        if targets is not None:
+            # Adaptive mode: draws is the batch size
+            if draws is None:
+                settings['draws'] = ADAPTIVE_BATCH_DRAWS
+            settings['targets'] = targets
+            settings['max_draws'] = ADAPTIVE_MAX_DRAWS if max_draws is None else max_draws
+    return settings
+
+
+def model_posterior_key(log_returns, n_change_points=3, variant='marginal', random_seed=None,
+                        draws=None, tune=None, chains=None, backend='auto', targets=None,
+                        max_draws=None, warm_start=None, windows=None, resolution=1):
+    """PosteriorCache key of a fit_model call.
+
+    The backend enters as requested, so computing the key never has to
+    probe (or import) the sampling libraries.
+    """
+    settings = _sampler_settings(variant, draws, tune, chains, backend, targets, max_draws, warm_start)
+    spec = {'variant': variant, 'model_version': MODEL_VERSIONS[variant], 'n_change_points': n_change_points}
+    if windows is not None:
+        spec['windows'] = [[int(lo), int(hi)] for lo, hi in windows]
+    if resolution != 1:
+        spec['resolution'] = resolution
+    if variant == 'conjugate_dp':
+        from .conjugate_dp import DEFAULT_PRIOR
+        spec['prior'] = DEFAULT_PRIOR
+    return posterior_key(log_returns, spec, settings, random_seed)
+
+
+def fit_model(log_returns, n_change_points=3, variant='marginal', random_seed=None,
+              draws=None, tune=None, posterior_cache=None, chains=None, cores=None, backend='auto',
+              targets=None, max_draws=None, warm_start=None, windows=None, resolution=1):
+    """Posterior over change points and segment parameters.
+
+    'marginal' sums the change point locations out so NUTS samples mu and
+    sigma alone; 'discrete' samples tau directly with a Metropolis step;
+    'conjugate_dp' skips MCMC and computes the exact posterior with
+    Normal-Inverse-Gamma segments. draws and tune default to SAMPLER_DEFAULTS.
+    MCMC chains (DEFAULT_CHAINS) run in parallel processes, up to cores at a
+    time (default: one per chain, capped at the CPU count). backend picks
+    the compiled sampling backend (see backends.py); 'auto' uses the fastest
+    one available, sampling that fails on a backend is retried on the next
+    one, and the backend used is stored as the sampling_backend attribute of
+    trace.posterior.
+    Passing convergence targets (a dict with any of r_hat, ess_bulk,
+    ess_tail; {} for the defaults) samples MCMC variants adaptively: draws
+    become the batch size and sampling stops once R-hat and ESS of
+    tau_sorted, mu and sigma meet the targets, or at max_draws.
+    warm_start (an earlier posterior of the same MCMC variant and K, or its
+    PosteriorCache key) starts every chain at that posterior and NUTS at its
+    adapted step size and mass matrix, with tune defaulting to a short
+    WARM_TUNE; use it to refit after prices are appended.
+    windows, a (lo, hi) pair of return indices per change point, restricts
+    change point k to lo..hi (see multiresolution.py); resolution is the
+    number of original returns per observation, recorded with the cached
+    posterior.
+    With a PosteriorCache, an identical earlier fit is returned instead of
+    sampling again. Returns (trace, log_evidence), where log_evidence is None
+    for the MCMC variants.
+    """
+    import arviz as az
+
+    if variant == 'conjugate_dp':
+        warm_start = None
+    settings = _sampler_settings(variant, draws, tune, chains, backend, targets, max_draws, warm_start)
+    draws, tune = settings['draws'], settings['tune']
+    if posterior_cache is not None:
+        key = model_posterior_key(log_returns, n_change_points, variant, random_seed, draws, tune, chains,
+                                  backend, targets, max_draws, warm_start, windows, resolution)
+        trace = posterior_cache.get(key)
+        if trace is not None:
+            return trace, trace.posterior.attrs.get('log_evidence')
+
+    if variant == 'conjugate_dp':
+        from .conjugate_dp import fit_conjugate_dp
+        posterior, log_evidence = fit_conjugate_dp(log_returns, n_change_points, draws=draws,
+                                                   random_seed=random_seed, windows=windows)
+        trace = az.from_dict(posterior=posterior)
+        trace.posterior.attrs['log_evidence'] = log_evidence
     else:
-        change_point_events.append({
-            'Change_Point_Date': cp_date.strftime('%Y-%m-%d'),
-            'Event_Date': 'N/A',
-            'Event_Description': 'No event within ±7 days'
-        })
-
-# Save change point results
-change_points_df = pd.DataFrame(change_point_events)
-change_points_df.to_csv('change_points.csv', index=False)
-
-# Visualize price series with change points and events
-plt.figure(figsize=(14, 7))
-plt.plot(dates, prices, label='Brent Oil Price')
-for cp_date in change_point_dates:
-    plt.axvline(cp_date, color='r', linestyle='--', 
-                label=f"Change Point: {cp_date.strftime('%Y-%m-%d')}" if cp_date == change_point_dates[0] else "")
-for _, event in events.iterrows():
-    plt.axvline(event['Event_Date'], color='g', linestyle=':', alpha=0.5, 
-                label='Events' if event['Event_Date'] == events['Event_Date'].iloc[0] else "")
-plt.title('Brent Oil Prices with Change Points and Events')
-plt.xlabel('Date')
-plt.ylabel('Price (USD/barrel)')
-plt.legend()
-plt.savefig('price_with_change_points.png')
-plt.close()
+        # The likelihood is evaluated from prefix sums of log_returns, so any
+        # number of change points can be used without rewriting the model.
+        # The marginal model is gradient-based for every variable, so far fewer
+        # draws are needed than for the discrete one.
+        from .backends import backend_sample_kwargs, next_backend, select_backend
+        from .cp_models import sample_tau_posterior
+        from .parallel_sampling import model_factory, sample_parallel
+        log_evidence = None
+        factory = model_factory(variant, log_returns, n_change_points, windows)
+        initvals = None
+        if warm_start is not None:
+            from .warm_start import warm_start_point, warm_step_factory
+            if isinstance(warm_start, str):
+                source = posterior_cache.get(warm_start) if posterior_cache is not None else None
+                if source is None:
+                    raise ValueError(f"Warm start posterior {warm_start!r} is not in the posterior cache")
+                warm_start = source
+            initvals = [warm_start_point(warm_start, variant, len(log_returns), windows)] * settings['chains']
+
+        def add_tau(trace, seed):
+            # Recover the posterior over change point locations
+            if variant == 'marginal':
+                sample_tau_posterior(trace, log_returns, n_change_points, random_seed=seed, windows=windows)
+
+        def sample(resolved):
+            step_factory = None
+            if warm_start is not None:
+                step_factory = warm_step_factory(warm_start, backend_sample_kwargs(resolved).get('compile_kwargs'))
+            if targets is not None:
+                from .adaptive_sampling import sample_until_converged
+                return sample_until_converged(factory, FREE_VARS[variant], tune, draws, settings['max_draws'],
+                                              chains=settings['chains'], cores=cores, random_seed=random_seed,
+                                              backend=resolved, targets=targets, postprocess=add_tau,
+                                              initvals=initvals, step_factory=step_factory)
+            trace = sample_parallel(factory, draws, tune, settings['chains'], cores, random_seed,
+                                    backend=resolved, initvals=initvals, step_factory=step_factory)
+            add_tau(trace, random_seed)
+            return trace
+
+        # A backend that passed its probe can still fail on the real model
+        # (an op it cannot compile, a crashing JIT); walk down the ranking
+        resolved, tried = select_backend(backend, variant), []
+        while True:
+            try:
+                trace = sample(resolved)
+                break
+            except Exception as error:
+                tried.append(resolved)
+                fallback = next_backend(variant, exclude=tried)
+                if fallback is None:
+                    raise
+                warnings.warn(f"Sampling with the {resolved!r} backend failed ({error!r}); retrying with "
+                              f"{fallback!r}")
+                resolved = fallback
+        trace.posterior.attrs['sampling_backend'] = resolved
+
+    if posterior_cache is not None:
+        posterior_cache.put(key, trace, {'variant': variant, 'model_version': MODEL_VERSIONS[variant],
+                                         'n_change_points': n_change_points,
+                                         'n_obs': len(log_returns), 'resolution': resolution,
+                                         'windows': windows, 'seed': random_seed, **settings,
+                                         'sampling_backend': trace.posterior.attrs.get('sampling_backend'),
+                                         'converged': trace.posterior.attrs.get('converged')})
+    return trace, log_evidence
+
+
+def extract_change_points(trace, dates):
+    """Posterior-mode change point indices and the dates they map to.
+
+    tau indexes log returns, so the change date is dates[tau + 1]. See
+    summarize_change_points for the full posterior summary.
+    """
+    tau_modes = tau_histograms(trace.posterior['tau_sorted'].values).argmax(axis=1).tolist()
+    return tau_modes, [pd.Timestamp(dates[tau + 1]) for tau in tau_modes]
+
+
+def segment_impacts(trace):
+    """Posterior mean log return per segment and the implied % price change between segments."""
+    mu_means = trace.posterior['mu'].mean(dim=['chain', 'draw']).values
+    changes = [(np.exp(mu_means[i + 1]) - np.exp(mu_means[i])) / np.exp(mu_means[i]) * 100
+               for i in range(len(mu_means) - 1)]
+    return mu_means, changes
+
+
+EDA_PLOTS = ('eda_prices.png', 'eda_log_returns.png', 'eda_volatility.png')
+# Posterior draws of the sorted change point indices, (chain, draw, K)
+TAU_DRAWS_FILE = 'tau_draws.npy'
+
+
+def _save_figure(plt, out_dir, name):
+    plt.savefig(os.path.join(out_dir, name))
+    plt.close()
+
+
+def render_eda_plots(dates, prices, log_returns, rolling_std, out_dir='.'):
+    """Price, log return and 30-day rolling volatility plots (EDA_PLOTS)."""
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(12, 6))
+    plt.plot(dates, prices, label='Brent Oil Price (USD)')
+    plt.title('Brent Oil Prices (1987-2022)')
+    plt.xlabel('Date')
+    plt.ylabel('Price (USD/barrel)')
+    plt.legend()
+    _save_figure(plt, out_dir, 'eda_prices.png')
+
+    plt.figure(figsize=(12, 6))
+    plt.plot(dates[1:], log_returns, label='Log Returns')
+    plt.title('Log Returns of Brent Oil Prices')
+    plt.xlabel('Date')
+    plt.ylabel('Log Returns')
+    plt.legend()
+    _save_figure(plt, out_dir, 'eda_log_returns.png')
+
+    plt.figure(figsize=(12, 6))
+    plt.plot(dates[1:], rolling_std, label='30-Day Rolling Std Dev')
+    plt.title('Volatility of Brent Oil Log Returns')
+    plt.xlabel('Date')
+    plt.ylabel('Standard Deviation')
+    plt.legend()
+    _save_figure(plt, out_dir, 'eda_volatility.png')
+
+
+def render_diagnostics_plot(trace, out_dir='.'):
+    import arviz as az
+    import matplotlib.pyplot as plt
+
+    az.plot_trace(trace, var_names=["tau_sorted", "mu", "sigma"])
+    _save_figure(plt, out_dir, 'model_diagnostics.png')
+
+
+def render_change_point_plot(dates, prices, change_point_dates, events=None, out_dir='.'):
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(14, 7))
+    plt.plot(dates, prices, label='Brent Oil Price')
+    for cp_date in change_point_dates:
+        plt.axvline(cp_date, color='r', linestyle='--',
+                    label=f"Change Point: {cp_date.strftime('%Y-%m-%d')}" if cp_date == change_point_dates[0] else "")
+    if events is not None:
+        for _, event in events.iterrows():
+            plt.axvline(event['Event_Date'], color='g', linestyle=':', alpha=0.5,
+                        label='Events' if event['Event_Date'] == events['Event_Date'].iloc[0] else "")
+    plt.title('Brent Oil Prices with Change Points and Events')
+    plt.xlabel('Date')
+    plt.ylabel('Price (USD/barrel)')
+    plt.legend()
+    _save_figure(plt, out_dir, 'price_with_change_points.png')
+
+
+def render_plots(dates, prices, log_returns, rolling_std, trace=None, change_point_dates=(),
+                 events=None, out_dir='.'):
+    """EDA plots, model diagnostics (if trace is given) and the change point plot."""
+    render_eda_plots(dates, prices, log_returns, rolling_std, out_dir)
+    if trace is not None:
+        render_diagnostics_plot(trace, out_dir)
+    render_change_point_plot(dates, prices, change_point_dates, events, out_dir)
+
 
 # Part 2.2: Advanced Extensions (Future Work)
 """
@@ -204,62 +413,63 @@ Future Work:
 # Task 3: Developing an Interactive Dashboard
 # ---------------------------------------
 
-# Flask Backend
-app = Flask(__name__)
-
-@app.route('/api/prices', methods=['GET'])
-def get_prices():
-    return jsonify({
-        'dates': df['Date'].dt.strftime('%Y-%m-%d').tolist(),
-        'prices': df['Price'].tolist()
-    })
-
-@app.route('/api/change_points', methods=['GET'])
-def get_change_points():
-    return jsonify(change_points_df.to_dict(orient='records'))
-
-@app.route('/api/events', methods=['GET'])
-def get_events():
-    return jsonify(events[['Event_Date', 'Event_Description']].to_dict(orient='records'))
-
-if __name__ == '__main__':
-    # Save Flask app as a separate file for deployment
-    with open('app.py', 'w') as f:
-        f.write("""
+# Flask app saved as a separate file for deployment
+APP_TEMPLATE = """
 from flask import Flask, jsonify
+import numpy as np
 import pandas as pd
 
+from scripts.price_store import current_version, open_published_store
+
 app = Flask(__name__)
 
-# Load data
-df = pd.read_csv('BrentOilPrices.csv')
-df['Date'] = pd.to_datetime(df['Date'], format='%d-%b-%y')
+# Prices published by the analysis run: memory-mapped, never parsed, and a
+# newly published version is picked up without a restart
+PRICE_STORE_DIR = 'price_store'
+_prices = {'version': None, 'days': None, 'prices': None}
+
+def published_prices():
+    if current_version(PRICE_STORE_DIR) != _prices['version']:
+        version, days, prices = open_published_store(PRICE_STORE_DIR)
+        _prices.update(version=version, days=days, prices=prices)
+    return _prices['days'], _prices['prices']
+
 events = pd.read_csv('events.csv')
 events['Event_Date'] = pd.to_datetime(events['Event_Date'])
 change_points = pd.read_csv('change_points.csv')
+# Rolling and EWMA volatility computed once by the eda_stats stage
+eda_stats = pd.read_csv('eda_stats.csv')
 
 @app.route('/api/prices', methods=['GET'])
 def get_prices():
+    days, prices = published_prices()
     return jsonify({
-        'dates': df['Date'].dt.strftime('%Y-%m-%d').tolist(),
-        'prices': df['Price'].tolist()
+        'dates': np.asarray(days, dtype='datetime64[D]').astype(str).tolist(),
+        'prices': prices.tolist()
     })
 
 @app.route('/api/change_points', methods=['GET'])
 def get_change_points():
     return jsonify(change_points.to_dict(orient='records'))
 
+@app.route('/api/volatility', methods=['GET'])
+def get_volatility():
+    columns = [c for c in eda_stats if c.startswith(('std_', 'realized_vol_', 'ewma_vol_'))]
+    return jsonify({
+        'dates': eda_stats['date'].tolist(),
+        **{c: eda_stats[c].where(eda_stats[c].notna(), None).tolist() for c in columns}
+    })
+
 @app.route('/api/events', methods=['GET'])
 def get_events():
     return jsonify(events[['Event_Date', 'Event_Description']].to_dict(orient='records'))
 
 if __name__ == '__main__':
     app.run(debug=True)
-        """)
+        """
 
-# Note: React frontend is saved as a separate file
-with open('Dashboard.jsx', 'w') as f:
-    f.write("""
+# React frontend
+DASHBOARD_JSX = """
 import React, { useState, useEffect } from 'react';
 import { LineChart, Line, XAxis, YAxis, Tooltip, Legend, ReferenceLine } from 'recharts';
 import axios from 'axios';
@@ -289,11 +499,11 @@ const Dashboard = () => {
         <Legend />
         <Line type="monotone" dataKey="price" stroke="#8884d8" name="Price (USD)" />
         {changePoints.map(cp => (
-          <ReferenceLine key={cp.Change_Point_Date} x={cp.Change_Point_Date} stroke="red" 
+          <ReferenceLine key={cp.Change_Point_Date} x={cp.Change_Point_Date} stroke="red"
                          label={{ value: `Change Point: ${cp.Change_Point_Date}`, position: 'top', fill: 'red' }} />
         ))}
         {events.map(e => (
-          <ReferenceLine key={e.Event_Date} x={e.Event_Date} stroke="green" strokeDasharray="3 3" 
+          <ReferenceLine key={e.Event_Date} x={e.Event_Date} stroke="green" strokeDasharray="3 3"
                          label={{ value: e.Event_Description, position: 'top', fill: 'green' }} />
         ))}
       </LineChart>
@@ -318,11 +528,10 @@ const Dashboard = () => {
 };
 
 export default Dashboard;
-    """)
+    """
 
 # CSS for React dashboard
-with open('Dashboard.css', 'w') as f:
-    f.write("""
+DASHBOARD_CSS = """
 .dashboard {
   padding: 20px;
   max-width: 1200px;
@@ -355,12 +564,20 @@ li {
     width: 100% !important;
   }
 }
-    """)
+    """
+
+
+def write_dashboard_files(out_dir='.'):
+    for name, content in (('app.py', APP_TEMPLATE), ('Dashboard.jsx', DASHBOARD_JSX),
+                          ('Dashboard.css', DASHBOARD_CSS)):
+        with open(os.path.join(out_dir, name), 'w') as f:
+            f.write(content)
+
 
 # ---------------------------------------
 # Generate Report Summary (for Submission)
 # ---------------------------------------
-report_content = """
+REPORT_TEMPLATE = """
 # Brent Oil Price Analysis Report
 ## August 5, 2025
 
@@ -394,13 +611,385 @@ This analysis identifies significant structural breaks in Brent oil prices (1987
 
 ## Dashboard
 An interactive dashboard is available, displaying price trends, change points, and event markers, accessible via a Flask/React web application.
-""".format(
-    "\n".join([f"  - {cp['Change_Point_Date']}: Associated with {cp['Event_Description']} (Event on {cp['Event_Date']})" 
-               for cp in change_point_events]),
-    f"Segment 1 to 2: Price change of {(np.exp(mu_means[1]) - np.exp(mu_means[0])) / np.exp(mu_means[0]) * 100:.2f}%"
-)
+"""
+
+
+def write_report(change_point_events, price_changes, path='report.md'):
+    report_content = REPORT_TEMPLATE.format(
+        "\n".join([f"  - {cp['Change_Point_Date']}: Associated with {cp['Event_Description']} (Event on {cp['Event_Date']})"
+                   for cp in change_point_events]),
+        f"Segment 1 to 2: Price change of {price_changes[0]:.2f}%" if price_changes else "N/A"
+    )
+    with open(path, 'w') as f:
+        f.write(report_content)
+
+
+def run_analysis(csv_path='BrentOilPrices.csv', n_change_points=3, model_variant='marginal',
+                 window_days=7, out_dir='.', plots=True, print_profile=True, random_seed=None,
+                 draws=None, tune=None, use_cache=True, chains=None, cores=None, backend='auto',
+                 targets=None, max_draws=None, k_max=6, criterion=None, warm_start=False, levels=None,
+                 events_path=None, profile_memory=False):
+    """Run the full pipeline and write every artifact into out_dir.
+
+    n_change_points='auto' compares K = 1..k_max first (see
+    model_selection.py), writes the table to k_selection.csv and continues
+    with the best K. With warm_start, an MCMC fit starts from the newest
+    cached posterior of the same variant and K fitted on fewer returns
+    (see warm_start.py), e.g. yesterday's fit before today's price came in.
+    levels (block lengths such as (21,) for months) first locates the change
+    points on aggregated returns and then fits daily returns with each
+    change point limited to a window around its coarse position (see
+    multiresolution.py).
+    events_path is an events CSV or a saved EventCatalog directory; by
+    default the curated EVENTS are used. profile_memory adds each stage's
+    peak Python memory to run_record.json, at the cost of tracemalloc
+    overhead.
+
+    Expensive stages go through an ArtifactCache keyed by the data hash and
+    the stage parameters, so a rerun only recomputes what changed. Sampled
+    posteriors are reused through a PosteriorCache and copied to
+    out_dir/trace.nc.
+    """
+    # Per-stage wall/CPU time (and optionally peak memory), written to run_record.json
+    profiler = StageProfiler(trace_memory=profile_memory)
+    cache = ArtifactCache(os.path.join(out_dir, CACHE_DIRNAME, 'artifacts'), enabled=use_cache)
+    posterior_cache = (PosteriorCache(os.path.join(out_dir, CACHE_DIRNAME, 'posteriors'))
+                       if use_cache else None)
+
+    def out(name):
+        return os.path.join(out_dir, name)
+
+    profiler.begin('load')
+    ingested = load_prices(csv_path, window=30)
+    print(f"Ingest: {ingested['mode']} ({ingested['new_rows']} new rows)")
+    dates = ingested['dates']
+    prices = np.asarray(ingested['prices'])
+    log_returns = np.asarray(ingested['log_returns'])
+    data_key = array_digest(ingested['days'], prices)
+    # Memory-mapped copy opened zero-copy by the backend workers, swapped in
+    # atomically and only rewritten when the prices changed
+    publish_price_store(out('price_store'), ingested['days'], prices, data_key)
+
+    # Returns, rolling volatility, drawdown and moments in one pass over the prices
+    profiler.begin('eda_stats')
+
+    def compute_eda_stats():
+        table, summary = eda_statistics(ingested['prices'], ROLLING_WINDOWS, EWMA_LAMBDAS, dates)
+        table.to_csv(out('eda_stats.csv'), index=False)
+        summary.to_frame('value').to_csv(out('eda_summary.csv'), index_label='statistic')
+        return table, summary
+    eda_key = stage_key('eda_stats', data_key, windows=ROLLING_WINDOWS, lambdas=EWMA_LAMBDAS)
+    eda_table, eda_summary = cache.run('eda_stats', eda_key, compute_eda_stats,
+                                       outputs=['eda_stats.csv', 'eda_summary.csv'], out_dir=out_dir)
+    print(f"Returns: std {eda_summary['std']:.4f}, skew {eda_summary['skew']:.2f}, "
+          f"excess kurtosis {eda_summary['kurtosis']:.2f}, max drawdown {eda_summary['max_drawdown']:.1%}")
+    latest = eda_table.iloc[-1]
+    print(f"Annualised volatility on {pd.Timestamp(dates[-1]).strftime('%Y-%m-%d')}: "
+          f"30-day {latest['realized_vol_30']:.1%}, 252-day {latest['realized_vol_252']:.1%}, "
+          f"EWMA(0.94) {latest['ewma_vol_94']:.1%}")
+
+    # Check stationarity with Augmented Dickey-Fuller test
+    profiler.begin('adf_test')
+    result = cache.run('adf_test', stage_key('adf_test', data_key), lambda: adf_test(prices))
+    print(f'ADF Statistic: {result[0]}, p-value: {result[1]}')  # p > 0.05 indicates non-stationarity
+
+    profiler.begin('events')
+    catalog = load_event_catalog(events_path)
+    events = catalog.frame()
+    events_key = stage_key('events', catalog.digest())
+    cache.run('events', events_key, lambda: events.to_csv(out('events.csv'), index=False),
+              outputs=['events.csv'], out_dir=out_dir, store_value=False)
+
+    profiler.begin('pelt_screening')
+    window = pd.Timedelta(days=window_days)
+    pelt_results, base_penalty = cache.run('pelt_screening', stage_key('pelt_screening', data_key),
+                                           lambda: screen_change_points(log_returns))
+    for penalty, breaks in pelt_results.items():
+        print(f"PELT penalty {penalty:.2f}: {len(breaks)} change points")
+    pelt_change_point_dates = [pd.Timestamp(dates[tau + 1]) for tau in pelt_results[base_penalty]]
+    pd.DataFrame(associate_events(pelt_change_point_dates, catalog, window)).to_csv(
+        out('pelt_change_points.csv'), index=False)
+
+    k_table = None
+    if n_change_points == 'auto':
+        profiler.begin('k_selection')
+
+        def compute_selection():
+            from .model_selection import select_n_change_points
+            table, best_k, _ = select_n_change_points(
+                log_returns, k_max, model_variant, criterion, cores, posterior_cache, random_seed,
+                draws=draws, tune=tune, chains=chains, backend=backend, targets=targets,
+                max_draws=max_draws)
+            table.to_csv(out('k_selection.csv'), index=False)
+            return table, best_k
+        selection_key = stage_key('k_selection', data_key, k_max=k_max, variant=model_variant,
+                                  model_version=MODEL_VERSIONS[model_variant], criterion=criterion, draws=draws,
+                                  tune=tune, chains=chains, backend=backend, targets=targets, max_draws=max_draws,
+                                  seed=random_seed)
+        k_table, n_change_points = cache.run('k_selection', selection_key, compute_selection,
+                                             outputs=['k_selection.csv'], out_dir=out_dir)
+        print(k_table.to_string(index=False))
+        print(f"Selected number of change points: {n_change_points}")
+
+    # Part 2.1: Core Analysis (Multiple Change Point Model)
+    # The trace is only loaded when a stage that reads it has to be recomputed;
+    # arviz alone takes seconds to import.
+    windows = None
+    if levels:
+        profiler.begin('coarse_search')
+
+        def compute_windows():
+            from .multiresolution import coarse_windows
+            return coarse_windows(log_returns, n_change_points, model_variant, levels, random_seed=random_seed,
+                                  draws=draws, tune=tune, posterior_cache=posterior_cache, chains=chains,
+                                  cores=cores, backend=backend, targets=targets, max_draws=max_draws)
+        coarse_key = stage_key('coarse_search', data_key, levels=sorted(levels), n_change_points=n_change_points,
+                               variant=model_variant, model_version=MODEL_VERSIONS[model_variant], draws=draws,
+                               tune=tune, chains=chains, backend=backend, targets=targets, max_draws=max_draws,
+                               seed=random_seed)
+        windows = cache.run('coarse_search', coarse_key, compute_windows)
+        for i, (lo, hi) in enumerate(windows):
+            print(f"Change point {i + 1} search window: {pd.Timestamp(dates[lo + 1]).date()} "
+                  f"to {pd.Timestamp(dates[hi + 1]).date()}")
+
+    profiler.begin('sampling')
+    warm_key = None
+    if warm_start and posterior_cache is not None and model_variant != 'conjugate_dp':
+        earlier = [key for key, metadata in posterior_cache.find(variant=model_variant,
+                                                                  model_version=MODEL_VERSIONS[model_variant],
+                                                                  n_change_points=n_change_points)
+                   if metadata.get('n_obs', len(log_returns)) < len(log_returns)
+                   and metadata.get('resolution', 1) == 1]
+        warm_key = earlier[0] if earlier else None
+        print(f"Warm start from {warm_key[:12]}" if warm_key else "No earlier posterior to warm start from")
+    sampling_key = model_posterior_key(log_returns, n_change_points, model_variant, random_seed,
+                                       draws, tune, chains, backend, targets, max_draws, warm_key, windows)
+    loaded = {}
+
+    def get_trace():
+        if 'trace' not in loaded:
+            trace, _ = fit_model(log_returns, n_change_points, model_variant, random_seed, draws, tune,
+                                 posterior_cache, chains, cores, backend, targets, max_draws, warm_key,
+                                 windows)
+            if posterior_cache is not None:
+                shutil.copyfile(posterior_cache.path(sampling_key), out('trace.nc'))
+            else:
+                trace.to_netcdf(out('trace.nc'))
+            loaded['trace'] = trace
+        return loaded['trace']
+
+    if posterior_cache is not None and posterior_cache.has(sampling_key):
+        shutil.copyfile(posterior_cache.path(sampling_key), out('trace.nc'))
+        cache.hits.append('sampling')
+    else:
+        get_trace()
+
+    # Model diagnostics
+    profiler.begin('diagnostics')
+
+    def compute_summary():
+        import arviz as az
+        return az.summary(get_trace(), var_names=["tau_sorted", "mu", "sigma"])
+    print(cache.run('diagnostics', stage_key('diagnostics', sampling_key), compute_summary))
+
+    profiler.begin('change_points')
+
+    def compute_change_points():
+        trace = get_trace()
+        summary, pmf = summarize_change_points(trace.posterior['tau_sorted'].values, dates)
+        summary.to_csv(out('change_point_summary.csv'), index=False)
+        pmf.to_csv(out('change_point_pmf.csv'), index=False)
+        return summary, segment_impacts(trace), trace.posterior.attrs.get('log_evidence')
+    # Only the summary and the sparse tau histogram are stored, not the draws
+    change_points_key = stage_key('change_points', sampling_key, data_key, hdi_probs=HDI_PROBS)
+    tau_summary, (mu_means, price_changes), log_evidence = cache.run(
+        'change_points', change_points_key, compute_change_points,
+        outputs=['change_point_summary.csv', 'change_point_pmf.csv'], out_dir=out_dir)
+    tau_modes = tau_summary['mode'].tolist()
+    change_point_dates = list(tau_summary['mode_date'])
+    if log_evidence is not None:
+        print(f'Log evidence (K={n_change_points}): {log_evidence:.2f}')
+    print("Detected Change Points:")
+    for row in tau_summary.itertuples():
+        print(f"Change Point {row.change_point}: {row.mode_date.strftime('%Y-%m-%d')} "
+              f"(94% HDI {row.hdi_94_lower_date.strftime('%Y-%m-%d')} to "
+              f"{row.hdi_94_upper_date.strftime('%Y-%m-%d')})")
+
+    # Quantify impact
+    for i, price_change_percent in enumerate(price_changes):
+        print(f"Segment {i} to {i+1}: Mean log return from {mu_means[i]:.4f} to {mu_means[i+1]:.4f}, "
+              f"Estimated price change: {price_change_percent:.2f}%")
+
+    # Associate change points with events
+    profiler.begin('event_association')
+    change_point_events = associate_events(change_point_dates, catalog, window)
+    pd.DataFrame(change_point_events).to_csv(out('change_points.csv'), index=False)
+
+    # Probability of a break near each event, over every posterior draw of tau
+    profiler.begin('event_probabilities')
+
+    # The tau draws are kept as a plain .npy keyed by the posterior, so a new
+    # window or event list re-reads them without importing arviz or refitting
+    def compute_tau_draws():
+        np.save(out(TAU_DRAWS_FILE), get_trace().posterior['tau_sorted'].values)
+
+    tau_draws_key = stage_key('tau_draws', sampling_key)
+
+    def get_tau_draws():
+        cache.run('tau_draws', tau_draws_key, compute_tau_draws,
+                  outputs=[TAU_DRAWS_FILE], out_dir=out_dir, store_value=False)
+        return np.load(out(TAU_DRAWS_FILE))
+
+    def compute_event_probabilities():
+        probabilities = event_break_probabilities(get_tau_draws(), dates, catalog, window)
+        probabilities.to_csv(out('event_probabilities.csv'), index=False)
+        return probabilities
+    event_probabilities = cache.run(
+        'event_probabilities',
+        stage_key('event_probabilities', tau_draws_key, data_key, events_key, window_days=window_days),
+        compute_event_probabilities, outputs=['event_probabilities.csv'], out_dir=out_dir)
+    print(f"Events by probability of a change point within ±{window_days} days:")
+    for row in event_probabilities.sort_values('probability', ascending=False).head(5).itertuples():
+        print(f"  {row.Event_Date.strftime('%Y-%m-%d')} {row.Event_Description}: {row.probability:.3f}")
+
+    # Price moves around each event relative to its pre-event estimation window
+    profiler.begin('event_study')
+
+    def compute_event_study():
+        study = event_study(log_returns, dates, catalog, instruments=['Brent'])
+        study.to_csv(out('event_study.csv'), index=False)
+        return study
+    study = cache.run('event_study', stage_key('event_study', data_key, events_key, windows=EVENT_WINDOWS,
+                                               estimation=ESTIMATION_WINDOW),
+                      compute_event_study, outputs=['event_study.csv'], out_dir=out_dir)
+    print("Abnormal log returns around events (±5 trading days):")
+    for row in study[study['window'] == 5].itertuples():
+        print(f"  {row.Event_Date.strftime('%Y-%m-%d')} {row.Event_Description}: "
+              f"{row.abnormal_pct:+.1f}% (t = {row.t_stat:.2f})")
+
+    if plots:
+        profiler.begin('eda_plots')
+        cache.run('eda_plots', stage_key('eda_plots', eda_key, data_key, window=30),
+                  lambda: render_eda_plots(dates, prices, log_returns, eda_table['std_30'].to_numpy(), out_dir),
+                  outputs=EDA_PLOTS, out_dir=out_dir, store_value=False)
+        profiler.begin('diagnostics_plot')
+        cache.run('diagnostics_plot', stage_key('diagnostics_plot', sampling_key),
+                  lambda: render_diagnostics_plot(get_trace(), out_dir),
+                  outputs=['model_diagnostics.png'], out_dir=out_dir, store_value=False)
+        profiler.begin('change_point_plot')
+        cache.run('change_point_plot',
+                  stage_key('change_point_plot', change_points_key, data_key, events_key),
+                  lambda: render_change_point_plot(dates, prices, change_point_dates, events, out_dir),
+                  outputs=['price_with_change_points.png'], out_dir=out_dir, store_value=False)
+
+    # Online monitoring: seed a BOCPD detector with the history; each new daily
+    # print is then processed with detector.update(new_log_return)
+    profiler.begin('online_detector')
+
+    def compute_detector():
+        from .bocpd import OnlineChangePointDetector
+        return OnlineChangePointDetector.from_history(log_returns)
+    detector = cache.run('online_detector', stage_key('online_detector', data_key), compute_detector)
+    print(f"Online detector: current run length {detector.map_run_length} days, "
+          f"P(change {detector.min_run}-{detector.alert_lag} days ago) = {detector.recent_change_probability:.3f}")
+    print("Historical alerts:", [pd.Timestamp(dates[i + 1]).strftime('%Y-%m-%d') for i in detector.alerts])
+
+    profiler.begin('dashboard')
+    write_dashboard_files(out_dir)
+
+    profiler.begin('report')
+    write_report(change_point_events, price_changes, out('report.md'))
+
+    # Every artifact derived from the price history that this run wrote is
+    # now current; skipped plots and K selection stay stale
+    skipped = set()
+    if not plots:
+        skipped.update(EDA_PLOTS, ('model_diagnostics.png', 'price_with_change_points.png'))
+    if k_table is None:
+        skipped.add('k_selection.csv')
+    mark_fresh(ingested['state_dir'], [name for name in DOWNSTREAM_ARTIFACTS if name not in skipped])
+
+    if cache.hits:
+        print(f"Reused cached stages: {', '.join(cache.hits)}")
+    posterior_info = (loaded['trace'].posterior.attrs if 'trace' in loaded
+                      else posterior_cache.metadata(sampling_key))
+    if posterior_info.get('converged') == 0:
+        print("WARNING: sampling did not reach the convergence targets; change points may be unreliable")
+    profiler.metadata.update(model_variant=model_variant, n_change_points=n_change_points,
+                             n_observations=len(prices), cached_stages=cache.hits,
+                             sampling_backend=posterior_info.get('sampling_backend'),
+                             converged=posterior_info.get('converged'))
+    profiler.write_json(out('run_record.json'))
+    if print_profile:
+        profiler.print_summary()
+
+    print("Analysis complete. Outputs saved: EDA plots, change_points.csv, app.py, Dashboard.jsx, Dashboard.css, report.md")
+    return {
+        # None when every stage reading the posterior was served from the cache
+        'trace': loaded.get('trace'),
+        'log_evidence': log_evidence,
+        'change_point_indices': tau_modes,
+        'change_point_dates': change_point_dates,
+        'change_point_summary': tau_summary,
+        'change_point_events': change_point_events,
+        'event_probabilities': event_probabilities,
+        'event_study': study,
+        'pelt_change_points': pelt_results,
+        'detector': detector,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Brent oil price change point analysis.')
+    parser.add_argument('--csv', default='BrentOilPrices.csv', help='price CSV with Date and Price columns')
+    parser.add_argument('--change-points', type=lambda v: v if v == 'auto' else int(v), default=3,
+                        help="number of change points, or 'auto' to choose it from 1..--k-max")
+    parser.add_argument('--k-max', type=int, default=6)
+    parser.add_argument('--criterion', choices=('evidence', 'loo', 'waic'), default=None,
+                        help='K selection criterion (default: evidence for conjugate_dp, else loo)')
+    parser.add_argument('--variant', choices=MODEL_VARIANTS, default='marginal')
+    parser.add_argument('--draws', type=int, default=None)
+    parser.add_argument('--tune', type=int, default=None)
+    parser.add_argument('--chains', type=int, default=None, help=f'MCMC chains (default {DEFAULT_CHAINS})')
+    parser.add_argument('--cores', type=int, default=None, help='processes sampling chains in parallel')
+    parser.add_argument('--backend', choices=('auto',) + BACKENDS, default='auto',
+                        help='compiled sampling backend; auto picks the fastest available')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='sample in batches until the R-hat/ESS targets are met')
+    parser.add_argument('--target-rhat', type=float, default=None)
+    parser.add_argument('--target-ess', type=float, default=None, help='bulk and tail ESS target')
+    parser.add_argument('--max-draws', type=int, default=None, help='adaptive sampling draw limit')
+    parser.add_argument('--warm-start', action='store_true',
+                        help='start MCMC from the newest cached posterior fitted on fewer prices')
+    parser.add_argument('--levels', type=int, nargs='+', default=None, metavar='BLOCK',
+                        help='coarse-to-fine search over returns aggregated in blocks of these lengths, '
+                             'e.g. --levels 21 for monthly')
+    parser.add_argument('--events', default=None,
+                        help='events CSV or saved EventCatalog directory (default: the curated list)')
+    parser.add_argument('--window-days', type=int, default=7, help='event association window')
+    parser.add_argument('--out-dir', default='.')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--no-plots', action='store_true')
+    parser.add_argument('--no-cache', action='store_true', help='recompute every stage')
+    parser.add_argument('--quiet-profile', action='store_true', help='do not print the stage timing table')
+    parser.add_argument('--profile-memory', action='store_true',
+                        help='record peak memory per stage with tracemalloc (slows plotting)')
+    args = parser.parse_args(argv)
+    targets = None
+    if args.adaptive:
+        targets = {}
+        if args.target_rhat is not None:
+            targets['r_hat'] = args.target_rhat
+        if args.target_ess is not None:
+            targets.update(ess_bulk=args.target_ess, ess_tail=args.target_ess)
+    return run_analysis(args.csv, args.change_points, args.variant, args.window_days, args.out_dir,
+                        plots=not args.no_plots, print_profile=not args.quiet_profile,
+                        random_seed=args.seed, draws=args.draws, tune=args.tune,
+                        use_cache=not args.no_cache, chains=args.chains, cores=args.cores,
+                        backend=args.backend, targets=targets, max_draws=args.max_draws,
+                        k_max=args.k_max, criterion=args.criterion, warm_start=args.warm_start,
+                        levels=args.levels, events_path=args.events, profile_memory=args.profile_memory)
 
-with open('report.md', 'w') as f:
-    f.write(report_content)
 
-print("Analysis complete. Outputs saved: EDA plots, change_points.csv, app.py, Dashboard.jsx, Dashboard.css, report.md")
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+# PyMC change point model builders
+#
+# The likelihood is expressed through segment sums (see segment_stats.py), so
+# the cost of one log-density/gradient evaluation depends on the number of
+# change points K, not on the length of the series.
+
+import numpy as np
+
+try:
+    import pymc as pm
+except ImportError:  # older environments still ship PyMC3
+    import pymc3 as pm
+
+from .segment_stats import (
+    changepoint_forward,
+    cumulative_sums,
+    log_n_allowed,
+    log_n_configurations,
+    prefix_normal_loglik,
+    sample_change_points,
+    window_mask,
+)
+
+# Finite stand-in for log(0); keeps gradients free of inf - inf terms
+NEG_INF = -1e30
+
+
+def segment_sum_loglik(c1, c2, tau_sorted, mu, sigma, n):
+    """Tensor form of segment_stats.segment_normal_logp.
+
+    c1 and c2 are prefix-sum tensors of the data and its square; tau_sorted is
+    an integer tensor of K sorted change points, mu holds K+1 segment means.
+    tau_sorted is clipped to 0..n so the prefix sums stay indexable when a
+    sampler proposes change points outside the prior support; the prior
+    still rejects such proposals.
+    """
+    tau_sorted = pm.math.clip(tau_sorted, 0, n)
+    bounds = pm.math.concatenate([np.array([0]), tau_sorted, np.array([n])])
+    counts = bounds[1:] - bounds[:-1]
+    s1 = c1[bounds[1:]] - c1[bounds[:-1]]
+    s2 = c2[bounds[1:]] - c2[bounds[:-1]]
+    sse = pm.math.sum(s2 - 2.0 * mu * s1 + counts * mu ** 2)
+    return -0.5 * n * pm.math.log(2 * np.pi * sigma ** 2) - sse / (2 * sigma ** 2)
+
+
+def build_multi_cp_model(log_returns, n_change_points=3, windows=None):
+    """Multiple change point model on log returns with K = n_change_points.
+
+    Same priors as the original nested-switch model: tau ~ DiscreteUniform
+    over the series, one Normal mean per segment and a shared HalfNormal
+    sigma. The likelihood is added as a Potential built from prefix sums.
+    windows, a (lo, hi) pair per change point, narrows each tau prior to
+    lo..hi (see multiresolution.py).
+    """
+    log_returns = np.asarray(log_returns, dtype=np.float64)
+    n = len(log_returns)
+    c1, c2 = cumulative_sums(log_returns)
+    lower, upper = 0, n - 1
+    if windows is not None:
+        lower = np.array([max(int(lo), 0) for lo, _ in windows])
+        upper = np.array([min(int(hi), n - 1) for _, hi in windows])
+
+    with pm.Model() as model:
+        tau = pm.DiscreteUniform("tau", lower=lower, upper=upper, shape=n_change_points)
+        tau_sorted = pm.Deterministic("tau_sorted", tau.sort())
+        mu = pm.Normal("mu", mu=0, sigma=0.1, shape=n_change_points + 1)
+        sigma = pm.HalfNormal("sigma", sigma=0.1)
+
+        pm.Potential("likelihood", segment_sum_loglik(pm.math.constant(c1), pm.math.constant(c2),
+                                                      tau_sorted, mu, sigma, n))
+    return model
+
+
+def _logaddexp(a, b):
+    m = pm.math.maximum(a, b)
+    return m + pm.math.log(pm.math.exp(a - m) + pm.math.exp(b - m))
+
+
+def _logsumexp(v):
+    # Written out rather than pm.math.logsumexp, whose inf guard yields NaN
+    # gradients once any term exceeds the float range of exp.
+    m = pm.math.max(v)
+    return m + pm.math.log(pm.math.sum(pm.math.exp(v - m)))
+
+
+def _logcumsumexp(v, size):
+    """Inclusive log-cumsum-exp of a 1-d tensor of static length `size`.
+
+    Uses log2(size) doubling steps of a stable logaddexp so no intermediate
+    ever under- or overflows, whatever the dynamic range of v.
+    """
+    shift = 1
+    while shift < size:
+        padded = pm.math.concatenate([np.full(shift, NEG_INF), v[:-shift]])
+        v = _logaddexp(v, padded)
+        shift *= 2
+    return v
+
+
+def build_marginal_cp_model(log_returns, n_change_points=3, windows=None):
+    """Change point model with the locations summed out analytically.
+
+    The K change points get a uniform prior over all placements of K distinct
+    positions in 1..n-1 and are marginalised with a forward recursion over
+    segments, each stage a log-sum-exp over candidate positions computed from
+    prefix sums. Only mu and sigma remain, so NUTS samples the whole model.
+    Recover tau draws afterwards with sample_tau_posterior. windows, a
+    (lo, hi) pair per change point, restricts the placements (and the
+    uniform prior) to change point k in lo..hi; the recursion then only runs
+    over positions inside some window, so narrow windows make every
+    gradient evaluation correspondingly cheaper.
+    """
+    log_returns = np.asarray(log_returns, dtype=np.float64)
+    n = len(log_returns)
+    c1, c2 = cumulative_sums(log_returns)
+    if windows is None:
+        positions = np.arange(n + 1)
+        allowed = np.zeros((n_change_points, n + 1), dtype=bool)
+        allowed[:, 1:n] = True
+        log_prior = -log_n_configurations(n, n_change_points)
+    else:
+        mask = window_mask(windows, n)
+        # Candidate positions plus n, where the last segment ends
+        positions = np.union1d(np.flatnonzero(mask.any(axis=0)), [n])
+        allowed = mask[:, positions]
+        log_prior = -log_n_allowed(mask)
+    c1, c2 = c1[positions], c2[positions]
+    t = positions.astype(np.float64)
+    size = len(positions)
+
+    with pm.Model() as model:
+        mu = pm.Normal("mu", mu=0, sigma=0.1, shape=n_change_points + 1)
+        sigma = pm.HalfNormal("sigma", sigma=0.1)
+
+        # E[k, i]: log-likelihood of log_returns[:positions[i]] under segment mean mu[k]
+        E = (-0.5 * t * pm.math.log(2 * np.pi * sigma ** 2)
+             - (c2 - 2.0 * mu[:, None] * c1 + t * mu[:, None] ** 2) / (2 * sigma ** 2))
+
+        F = pm.math.where(allowed[0], E[0], NEG_INF)
+        for k in range(1, n_change_points):
+            running = _logcumsumexp(F - E[k], size)
+            shifted = pm.math.concatenate([np.full(1, NEG_INF), running[:-1]])
+            F = pm.math.where(allowed[k], E[k] + shifted, NEG_INF)
+        last = F + E[n_change_points, -1] - E[n_change_points]
+
+        pm.Potential("likelihood", _logsumexp(last) + log_prior)
+    return model
+
+
+def sample_tau_posterior(trace, log_returns, n_change_points, random_seed=None, windows=None):
+    """Add exact tau_sorted draws to the posterior of a marginal model fit.
+
+    For every (chain, draw) the change points are sampled from
+    p(tau | mu, sigma, log_returns), so trace.posterior["tau_sorted"] has the
+    same layout as in build_multi_cp_model. Pass the windows the model was
+    built with, if any.
+    """
+    rng = np.random.default_rng(random_seed)
+    c1, c2 = cumulative_sums(log_returns)
+    allowed = None if windows is None else window_mask(windows, len(log_returns))
+    mu = trace.posterior["mu"].values
+    sigma = trace.posterior["sigma"].values
+    n_chains, n_draws = sigma.shape
+    tau = np.empty((n_chains, n_draws, n_change_points), dtype=np.int64)
+    for c in range(n_chains):
+        for d in range(n_draws):
+            E = prefix_normal_loglik(c1, c2, mu[c, d], sigma[c, d])
+            tau[c, d] = sample_change_points(E, rng, changepoint_forward(E, allowed))
+    trace.posterior["tau_sorted"] = (("chain", "draw", "tau_sorted_dim_0"), tau)
+    return trace
@@ -0,0 +1,123 @@
+# Single-pass EDA statistics
+#
+# Log returns, the rolling statistics of rolling_stats for several windows,
+# the running price high and low, drawdown and the summary moments of the
+# returns are all produced by one streaming pass over the prices. The
+# prices are read in chunks (a memory-mapped price store is never loaded
+# whole); each chunk's rolling sums come from prefix sums over the chunk
+# plus the trailing returns of the previous one, and its moments are merged
+# into the running totals with the pairwise (Chan/Pebay) update. Temporary
+# memory is bounded by the chunk size; only the output columns are full
+# length.
+
+import numpy as np
+import pandas as pd
+
+from .rolling_stats import (
+    CHUNK_SIZE,
+    EWMA_LAMBDAS,
+    ROLLING_WINDOWS,
+    TRADING_DAYS,
+    check_lambdas,
+    check_windows,
+    fill_ewma,
+    fill_rolling,
+    rolling_columns,
+)
+
+
+def _chunk_moments(x):
+    """(count, mean, M2, M3, M4) of x, with Mp the sum of centred p-th powers."""
+    mean = x.mean()
+    d = x - mean
+    d2 = d * d
+    return len(x), mean, d2.sum(), (d2 * d).sum(), (d2 * d2).sum()
+
+
+def merge_moments(a, b):
+    """Combine the (count, mean, M2, M3, M4) of two disjoint samples."""
+    na, ma, m2a, m3a, m4a = a
+    nb, mb, m2b, m3b, m4b = b
+    if not na or not nb:
+        return a if na else b
+    n = na + nb
+    delta = mb - ma
+    mean = ma + delta * nb / n
+    m2 = m2a + m2b + delta ** 2 * na * nb / n
+    m3 = (m3a + m3b + delta ** 3 * na * nb * (na - nb) / n ** 2
+          + 3 * delta * (na * m2b - nb * m2a) / n)
+    m4 = (m4a + m4b + delta ** 4 * na * nb * (na * na - na * nb + nb * nb) / n ** 3
+          + 6 * delta ** 2 * (na * na * m2b + nb * nb * m2a) / n ** 2
+          + 4 * delta * (na * m3b - nb * m3a) / n)
+    return n, mean, m2, m3, m4
+
+
+def eda_statistics(prices, windows=ROLLING_WINDOWS, lambdas=EWMA_LAMBDAS, dates=None,
+                   periods_per_year=TRADING_DAYS, chunk_size=CHUNK_SIZE):
+    """EDA table and summary of a price series in one pass.
+
+    Returns (table, summary). table has one row per log return (aligned
+    with dates[1:], added as 'date' when dates are given) and the columns
+    log_return, the rolling_statistics columns for windows and lambdas,
+    running_max and running_min of the price and drawdown
+    (price / running_max - 1). summary holds count, mean, std, skew and
+    excess kurtosis of the returns, their min and max, and the maximum
+    drawdown.
+    """
+    n = len(prices) - 1
+    if n < 1:
+        raise ValueError("Need at least two prices")
+    windows = check_windows(windows)
+    lambdas = check_lambdas(lambdas)
+    keep = windows[-1] - 1 if windows else 0
+
+    names = ['log_return'] + rolling_columns(windows, lambdas) + ['running_max', 'running_min', 'drawdown']
+    columns = {name: np.empty(n) for name in names}
+
+    moments = (0, 0.0, 0.0, 0.0, 0.0)
+    extremes = (np.inf, -np.inf, 0.0)
+    tail = np.empty(0)
+    state = None
+    peak = trough = float(prices[0])
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        block = np.asarray(prices[start:stop + 1], dtype=np.float64)
+        returns = columns['log_return'][start:stop]
+        logs = np.log(block)
+        np.subtract(logs[1:], logs[:-1], out=returns)
+
+        # Rolling windows reach back into the previous chunk's trailing returns
+        extended = np.concatenate([tail, returns])
+        fill_rolling(columns, slice(start, stop), extended, len(tail), windows, periods_per_year)
+        if lambdas:
+            state = fill_ewma(columns, slice(start, stop), returns, state, lambdas, periods_per_year)
+
+        high = columns['running_max'][start:stop]
+        low = columns['running_min'][start:stop]
+        np.maximum.accumulate(np.maximum(block[1:], peak), out=high)
+        np.minimum.accumulate(np.minimum(block[1:], trough), out=low)
+        drawdown = columns['drawdown'][start:stop]
+        np.divide(block[1:], high, out=drawdown)
+        drawdown -= 1
+        peak, trough = high[-1], low[-1]
+
+        moments = merge_moments(moments, _chunk_moments(returns))
+        extremes = (min(extremes[0], returns.min()), max(extremes[1], returns.max()),
+                    min(extremes[2], drawdown.min()))
+        tail = extended[max(0, len(extended) - keep):]
+
+    count, mean, m2, m3, m4 = moments
+    summary = pd.Series({
+        'count': count,
+        'mean': mean,
+        'std': np.sqrt(m2 / (count - 1)) if count > 1 else np.nan,
+        'skew': np.sqrt(count) * m3 / m2 ** 1.5 if m2 else np.nan,
+        'kurtosis': count * m4 / m2 ** 2 - 3 if m2 else np.nan,
+        'min_return': extremes[0],
+        'max_return': extremes[1],
+        'max_drawdown': extremes[2],
+    })
+    table = pd.DataFrame(columns, copy=False)
+    if dates is not None:
+        table.insert(0, 'date', pd.DatetimeIndex(dates)[1:])
+    return table, summary
@@ -0,0 +1,79 @@
+# Association of detected change points with the event dataset
+#
+# Events are looked up through an EventCatalog (sorted epoch days), so every
+# window query is a searchsorted, for single change point dates and for the
+# full posterior of tau alike. A plain events DataFrame is indexed on the fly.
+
+import numpy as np
+import pandas as pd
+
+from .event_catalog import EventCatalog
+from .price_store import to_epoch_days
+
+
+def associate_events(change_point_dates, events, window=pd.Timedelta(days=7)):
+    """Pair each change point date with the closest event within +/- window.
+
+    events is a DataFrame or an EventCatalog. Returns one record per change
+    point with Change_Point_Date, Event_Date and Event_Description, as
+    written to change_points.csv. Ties go to the earlier event.
+    """
+    catalog = EventCatalog.coerce(events)
+    closest = catalog.nearest(change_point_dates, max_days=window.days)
+    matched = catalog.frame(closest[closest >= 0]).itertuples()
+
+    change_point_events = []
+    for cp_date, i in zip(change_point_dates, closest):
+        cp_date = pd.Timestamp(cp_date)
+        if i >= 0:
+            closest_event = next(matched)
+            change_point_events.append({
+                'Change_Point_Date': cp_date.strftime('%Y-%m-%d'),
+                'Event_Date': closest_event.Event_Date.strftime('%Y-%m-%d'),
+                'Event_Description': closest_event.Event_Description
+            })
+        else:
+            change_point_events.append({
+                'Change_Point_Date': cp_date.strftime('%Y-%m-%d'),
+                'Event_Date': 'N/A',
+                'Event_Description': f'No event within ±{window.days} days'
+            })
+    return change_point_events
+
+
+def event_break_probabilities(tau_draws, dates, events, window=pd.Timedelta(days=7)):
+    """Posterior probability that a change point falls within +/- window of each event.
+
+    events is a DataFrame or an EventCatalog; tau_draws holds sorted change
+    point draws shaped (..., K) (e.g. trace.posterior['tau_sorted'].values)
+    and dates the price dates, so draw tau is the change on dates[tau + 1]. Every (draw, change point)
+    covers a contiguous run of the sorted events; the runs of one draw are
+    made disjoint and counted with a difference array, so the cost is
+    O(draws * K * log(events) + events). Returns the events sorted by date
+    with 'probability' (any change point) and 'probability_cp<k>' (change
+    point k) columns.
+    """
+    catalog = EventCatalog.coerce(events)
+    events, event_days = catalog.frame(), catalog.days
+    tau = np.asarray(tau_draws, dtype=np.int64)
+    tau = tau.reshape(-1, tau.shape[-1])
+    n_draws, n_change_points = tau.shape
+    n_events = len(event_days)
+    cp_days = to_epoch_days(pd.to_datetime(dates))[tau + 1]
+
+    start = np.searchsorted(event_days, cp_days - window.days, side='left')
+    stop = np.searchsorted(event_days, cp_days + window.days, side='right')
+
+    def coverage(start, stop):
+        hits = (np.bincount(start.ravel(), minlength=n_events + 1)
+                - np.bincount(stop.ravel(), minlength=n_events + 1))
+        return np.cumsum(hits)[:n_events] / n_draws
+
+    result = events.copy()
+    for k in range(n_change_points):
+        result[f'probability_cp{k + 1}'] = coverage(start[:, k], stop[:, k])
+    # tau is sorted, so runs only overlap their predecessor; trim that overlap
+    start[:, 1:] = np.maximum(start[:, 1:], stop[:, :-1])
+    stop = np.maximum(stop, start)
+    result.insert(len(events.columns), 'probability', coverage(start, stop))
+    return result
@@ -0,0 +1,188 @@
+# Date-indexed event catalog
+#
+# Events are kept sorted by date as int64 epoch days, with the positions and
+# days of each Event_Type precomputed, so window and nearest-event queries
+# are a couple of searchsorted calls (O(log n)) instead of a mask over the
+# table. A catalog can be saved as a directory: days.npy plus events.jsonl
+# (one {description, type} record per line, in the same order). Appending
+# events dated on or after the last one extends both files in place; anything
+# else rewrites them in date order. days.npy is written last and decides how
+# many records exist, so records left by a crashed append are ignored on
+# open and overwritten by the next append. A rewrite writes both files aside
+# and renames the records first; a crash between the two renames is
+# completed the next time the directory is opened or written.
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from .price_store import append_array, from_epoch_days, to_epoch_days
+
+DAYS_FILE = 'days.npy'
+RECORDS_FILE = 'events.jsonl'
+PENDING_SUFFIX = '.pending'
+
+
+def _recover(store_dir):
+    """Finish or undo a save() that was interrupted before renaming both files."""
+    records_pending = os.path.join(store_dir, RECORDS_FILE + PENDING_SUFFIX)
+    days_pending = os.path.join(store_dir, DAYS_FILE + PENDING_SUFFIX)
+    if os.path.exists(records_pending):
+        # Nothing was renamed yet, so the old pair is intact
+        os.remove(records_pending)
+        if os.path.exists(days_pending):
+            os.remove(days_pending)
+    elif os.path.exists(days_pending):
+        os.replace(days_pending, os.path.join(store_dir, DAYS_FILE))
+
+
+class EventCatalog:
+    def __init__(self, days=(), descriptions=(), types=(), store_dir=None):
+        order = np.argsort(np.asarray(days, dtype=np.int64), kind='stable')
+        self.days = np.asarray(days, dtype=np.int64)[order]
+        self.descriptions = np.asarray(descriptions, dtype=object)[order]
+        self.types = np.asarray(types, dtype=object)[order]
+        self.store_dir = store_dir
+        self._index_types()
+
+    def _index_types(self):
+        self._by_type = {t: np.flatnonzero(self.types == t) for t in pd.unique(self.types)}
+        self._type_days = {t: self.days[positions] for t, positions in self._by_type.items()}
+
+    def __len__(self):
+        return len(self.days)
+
+    @classmethod
+    def from_frame(cls, events, store_dir=None):
+        """Catalog of a DataFrame with Event_Date, Event_Description and optionally Event_Type."""
+        types = events['Event_Type'].fillna('') if 'Event_Type' in events else [''] * len(events)
+        catalog = cls(to_epoch_days(pd.to_datetime(events['Event_Date'])), events['Event_Description'],
+                      types, store_dir)
+        if store_dir is not None:
+            catalog.save()
+        return catalog
+
+    @classmethod
+    def from_csv(cls, path, store_dir=None):
+        return cls.from_frame(pd.read_csv(path), store_dir)
+
+    @classmethod
+    def coerce(cls, events):
+        return events if isinstance(events, cls) else cls.from_frame(events)
+
+    @classmethod
+    def open(cls, store_dir):
+        _recover(store_dir)
+        days = np.load(os.path.join(store_dir, DAYS_FILE))
+        with open(os.path.join(store_dir, RECORDS_FILE)) as f:
+            # Records beyond len(days) belong to an unfinished append
+            records = [json.loads(line) for line, _ in zip(f, range(len(days)))]
+        catalog = cls.__new__(cls)
+        catalog.days = days
+        catalog.descriptions = np.array([r['description'] for r in records], dtype=object)
+        catalog.types = np.array([r['type'] for r in records], dtype=object)
+        catalog.store_dir = store_dir
+        catalog._index_types()
+        return catalog
+
+    def _records(self, positions):
+        return ''.join(json.dumps({'description': self.descriptions[i], 'type': self.types[i]}) + '\n'
+                       for i in positions)
+
+    def save(self, store_dir=None):
+        self.store_dir = store_dir or self.store_dir
+        os.makedirs(self.store_dir, exist_ok=True)
+        _recover(self.store_dir)
+        records_path = os.path.join(self.store_dir, RECORDS_FILE)
+        days_path = os.path.join(self.store_dir, DAYS_FILE)
+        with open(records_path + PENDING_SUFFIX, 'w') as f:
+            f.write(self._records(range(len(self))))
+        with open(days_path + PENDING_SUFFIX, 'wb') as f:
+            np.save(f, self.days)
+        os.replace(records_path + PENDING_SUFFIX, records_path)
+        os.replace(days_path + PENDING_SUFFIX, days_path)
+
+    def append(self, events):
+        """Add the events of a DataFrame (or EventCatalog), persisting them if the catalog is stored."""
+        new = EventCatalog.coerce(events)
+        in_order = not len(self) or not len(new) or new.days[0] >= self.days[-1]
+        merged = EventCatalog(np.concatenate([self.days, new.days]),
+                              np.concatenate([self.descriptions, new.descriptions]),
+                              np.concatenate([self.types, new.types]), self.store_dir)
+        self.days, self.descriptions, self.types = merged.days, merged.descriptions, merged.types
+        self._by_type, self._type_days = merged._by_type, merged._type_days
+        if self.store_dir is None:
+            return
+        if in_order:
+            _recover(self.store_dir)
+            days_path = os.path.join(self.store_dir, DAYS_FILE)
+            committed = len(np.load(days_path, mmap_mode='r'))
+            # Records first: open() only reads as many as days.npy lists. Any
+            # records past that are from an append that crashed before
+            # extending days.npy and are cut off here.
+            with open(os.path.join(self.store_dir, RECORDS_FILE), 'rb+') as f:
+                for _ in range(committed):
+                    f.readline()
+                f.truncate()
+                f.write(new._records(range(len(new))).encode())
+            append_array(days_path, new.days)
+        else:
+            self.save()
+
+    def digest(self):
+        """sha256 of the catalog contents."""
+        digest = hashlib.sha256(np.ascontiguousarray(self.days).tobytes())
+        digest.update(json.dumps([list(self.descriptions), list(self.types)], default=str).encode())
+        return digest.hexdigest()
+
+    def _positions(self, event_type):
+        if event_type is None:
+            return None
+        return self._by_type.get(event_type, np.empty(0, dtype=np.int64))
+
+    def _days(self, event_type):
+        if event_type is None:
+            return self.days
+        return self._type_days.get(event_type, np.empty(0, dtype=np.int64))
+
+    def frame(self, positions=None):
+        """Events at positions (default all) as a DataFrame with the events.csv columns."""
+        positions = np.arange(len(self)) if positions is None else np.asarray(positions, dtype=np.int64)
+        return pd.DataFrame({'Event_Date': from_epoch_days(self.days[positions]),
+                             'Event_Description': self.descriptions[positions],
+                             'Event_Type': self.types[positions]})
+
+    def window(self, start, end, event_type=None):
+        """Positions of events dated start..end inclusive, optionally of one type."""
+        days = self._days(event_type)
+        start_day, end_day = to_epoch_days(pd.to_datetime([start, end]))
+        positions = np.arange(np.searchsorted(days, start_day, side='left'),
+                              np.searchsorted(days, end_day, side='right'))
+        return positions if event_type is None else self._positions(event_type)[positions]
+
+    def around(self, date, window=pd.Timedelta(days=7), event_type=None):
+        """Events within +/- window of date as a DataFrame."""
+        date = pd.Timestamp(date)
+        return self.frame(self.window(date - window, date + window, event_type))
+
+    def nearest(self, dates, event_type=None, max_days=None):
+        """Position of the closest event to each date (ties to the earlier one), -1 if none.
+
+        With max_days, events further away than that many days do not count.
+        """
+        days = self._days(event_type)
+        query = to_epoch_days(pd.to_datetime(np.atleast_1d(dates)))
+        if not len(days):
+            return np.full(len(query), -1)
+        after = np.searchsorted(days, query)
+        before = np.clip(after - 1, 0, None)
+        after = np.clip(after, None, len(days) - 1)
+        closest = np.where(np.abs(days[after] - query) < np.abs(days[before] - query), after, before)
+        if max_days is not None:
+            closest = np.where(np.abs(days[closest] - query) <= max_days, closest, -1)
+        if event_type is None:
+            return closest
+        return np.where(closest >= 0, self._positions(event_type)[np.clip(closest, 0, None)], -1)
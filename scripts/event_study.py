@@ -0,0 +1,81 @@
+# Event study: abnormal returns around dated events
+#
+# For every event, event window (+/- w trading days) and instrument, the
+# cumulative log return over the window is compared with what the
+# pre-event estimation window predicts (constant-mean model). Every window
+# sum is a difference of prefix sums, so all events, windows and instruments
+# are computed in one broadcast step without looping over events.
+
+import numpy as np
+import pandas as pd
+
+from .event_catalog import EventCatalog
+from .price_store import to_epoch_days
+
+EVENT_WINDOWS = (1, 5, 20)
+# Returns [event - 250, event - 20) in trading days: about a year, ending a month before
+ESTIMATION_WINDOW = (-250, -20)
+
+
+def _window_sums(c1, c2, start, stop):
+    """Sums of x and x**2 over [start, stop) rows; NaN where out of range. start/stop broadcast."""
+    n = c1.shape[0] - 1
+    valid = (start >= 0) & (stop <= n) & (start < stop)
+    start, stop = np.clip(start, 0, n), np.clip(stop, 0, n)
+    s1 = np.where(valid[..., None], c1[stop] - c1[start], np.nan)
+    s2 = np.where(valid[..., None], c2[stop] - c2[start], np.nan)
+    return s1, s2
+
+
+def event_study(log_returns, dates, events, windows=EVENT_WINDOWS, estimation=ESTIMATION_WINDOW,
+                instruments=None):
+    """Cumulative and abnormal log returns around every event.
+
+    log_returns is shaped (n,) or (n, instruments) and dates holds the n + 1
+    price dates (return t is from dates[t] to dates[t + 1]). Day 0 of an
+    event is the first return ending on or after its date. events is a
+    DataFrame or an EventCatalog. Returns one row per (event, window,
+    instrument) with the cumulative log return 'car', the 'expected' return
+    from the estimation window mean, the 'abnormal' return (car - expected),
+    its 't_stat' against the estimation window volatility and the abnormal
+    move in percent. Windows that run off the series are NaN.
+    """
+    catalog = EventCatalog.coerce(events)
+    returns = np.asarray(log_returns, dtype=np.float64)
+    returns = returns[:, None] if returns.ndim == 1 else returns
+    n, n_instruments = returns.shape
+    instruments = list(instruments) if instruments is not None else list(range(n_instruments))
+    # Prefix sums per instrument, with a leading zero row (as cumulative_sums)
+    zeros = np.zeros((1, n_instruments))
+    c1 = np.vstack([zeros, np.cumsum(returns, axis=0)])
+    c2 = np.vstack([zeros, np.cumsum(returns ** 2, axis=0)])
+
+    day0 = np.searchsorted(to_epoch_days(pd.to_datetime(dates))[1:], catalog.days)
+    windows = np.asarray(windows, dtype=np.int64)
+
+    est_sum, est_sq = _window_sums(c1, c2, day0 + estimation[0], day0 + estimation[1])
+    est_n = estimation[1] - estimation[0]
+    est_mean = est_sum / est_n
+    est_sd = np.sqrt(np.maximum(est_sq / est_n - est_mean ** 2, 0) * est_n / (est_n - 1))
+
+    # (events, windows, instruments)
+    car, _ = _window_sums(c1, c2, day0[:, None] - windows, day0[:, None] + windows + 1)
+    length = (2 * windows + 1)[None, :, None]
+    expected = est_mean[:, None, :] * length
+    abnormal = car - expected
+    t_stat = abnormal / (est_sd[:, None, :] * np.sqrt(length))
+
+    n_events, n_windows = len(catalog), len(windows)
+    index = np.indices((n_events, n_windows, n_instruments)).reshape(3, -1)
+    events_frame = catalog.frame(index[0])
+    return pd.DataFrame({
+        'Event_Date': events_frame['Event_Date'],
+        'Event_Description': events_frame['Event_Description'],
+        'window': windows[index[1]],
+        'instrument': np.asarray(instruments, dtype=object)[index[2]],
+        'car': car.ravel(),
+        'expected': expected.ravel(),
+        'abnormal': abnormal.ravel(),
+        't_stat': t_stat.ravel(),
+        'abnormal_pct': np.expm1(abnormal.ravel()) * 100,
+    })
@@ -0,0 +1,253 @@
+# Incremental ingestion of appended Brent prints
+#
+# The ingest state directory keeps the full parsed series as a price store
+# plus the derived log returns and rolling volatility, and remembers how many
+# bytes of the source CSV have been consumed. When rows are appended to the
+# CSV only the new bytes are parsed and validated, the derived arrays are
+# extended in place, and downstream artifacts are marked stale. A daily
+# update therefore parses and recomputes only the new rows; the consumed
+# prefix is re-read once to check, with a streamed SHA-256, that no earlier
+# line was edited (a cheap sequential read at this file size).
+#
+# The arrays are extended before state.json is rewritten, so state.json
+# always describes a prefix of them. It records how many prices that prefix
+# holds, and rows left past it by an interrupted append are cut off before
+# the next append.
+
+import hashlib
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from .price_cache import CACHE_DIRNAME, DATE_FORMAT, parse_price_csv
+from .price_store import (
+    append_array,
+    has_price_store,
+    open_price_store,
+    save_array,
+    to_epoch_days,
+    truncate_array,
+    write_price_store,
+)
+from .rolling_stats import rolling_std
+
+STATE_FILE = 'state.json'
+STALE_FILE = 'stale.json'
+LOG_RETURNS_FILE = 'log_returns.npy'
+ROLLING_STD_FILE = 'rolling_std.npy'
+# Read size when hashing the consumed prefix
+HASH_CHUNK_BYTES = 1 << 20
+
+# Outputs of the analysis that depend on the price history
+DOWNSTREAM_ARTIFACTS = (
+    'eda_prices.png',
+    'eda_log_returns.png',
+    'eda_volatility.png',
+    'eda_stats.csv',
+    'eda_summary.csv',
+    'pelt_change_points.csv',
+    'k_selection.csv',
+    'trace.nc',
+    'tau_draws.npy',
+    'model_diagnostics.png',
+    'change_points.csv',
+    'change_point_summary.csv',
+    'change_point_pmf.csv',
+    'event_probabilities.csv',
+    'event_study.csv',
+    'price_with_change_points.png',
+    'report.md',
+)
+
+
+def _prefix_hash(path, offset):
+    """Streamed sha256 of the first offset bytes of path."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        remaining = offset
+        while remaining > 0:
+            block = f.read(min(HASH_CHUNK_BYTES, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest
+
+
+def _read_json(path, default):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _write_json(path, data):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def default_state_dir(csv_path):
+    csv_path = os.path.abspath(csv_path)
+    name = hashlib.sha256(csv_path.encode()).hexdigest()[:16]
+    return os.path.join(os.path.dirname(csv_path), CACHE_DIRNAME, 'ingest', name)
+
+
+def rolling_std_tail(log_returns, window, count):
+    """Last `count` values of the rolling std, from the trailing returns only."""
+    tail = log_returns[-(count + window - 1):]
+    return rolling_std(tail, window)[-count:]
+
+
+def mark_stale(state_dir, artifacts, reason):
+    stale = _read_json(os.path.join(state_dir, STALE_FILE), {})
+    for artifact in artifacts:
+        stale[artifact] = reason
+    _write_json(os.path.join(state_dir, STALE_FILE), stale)
+
+
+def mark_fresh(state_dir, artifacts):
+    stale = _read_json(os.path.join(state_dir, STALE_FILE), {})
+    for artifact in artifacts:
+        stale.pop(artifact, None)
+    _write_json(os.path.join(state_dir, STALE_FILE), stale)
+
+
+def stale_artifacts(state_dir):
+    """Mapping of stale artifact name to the reason it became stale."""
+    return _read_json(os.path.join(state_dir, STALE_FILE), {})
+
+
+def validate_rows(rows, last_day=None):
+    """Parse and check appended rows; returns (epoch_days, prices).
+
+    Raises ValueError naming the offending rows if a date does not parse, a
+    price is not a positive number, or dates do not strictly increase after
+    the last ingested date.
+    """
+    dates = pd.to_datetime(rows['Date'], format=DATE_FORMAT, errors='coerce')
+    retry = dates.isna()
+    if retry.any():
+        dates[retry] = pd.to_datetime(rows['Date'][retry], format='mixed', errors='coerce')
+    prices = pd.to_numeric(rows['Price'], errors='coerce')
+
+    bad = dates.isna() | prices.isna() | ~np.isfinite(prices) | (prices <= 0)
+    if bad.any():
+        raise ValueError(f"Invalid appended rows:\n{rows[bad].to_string()}")
+    days = to_epoch_days(dates.values)
+    previous = np.concatenate([[last_day if last_day is not None else days[0] - 1], days[:-1]])
+    if (days <= previous).any():
+        raise ValueError(f"Appended rows are not in increasing date order:\n"
+                         f"{rows[days <= previous].to_string()}")
+    return days, prices.to_numpy(dtype=np.float64)
+
+
+def _array_paths(state_dir):
+    # Each array with its length relative to the number of prices
+    return [(os.path.join(state_dir, 'dates.npy'), 0), (os.path.join(state_dir, 'prices.npy'), 0),
+            (os.path.join(state_dir, LOG_RETURNS_FILE), -1), (os.path.join(state_dir, ROLLING_STD_FILE), -1)]
+
+
+def _restore_lengths(state_dir, n_prices):
+    """Cut the arrays back to the n_prices rows state.json describes; False if any is shorter."""
+    for path, offset in _array_paths(state_dir):
+        if not os.path.exists(path) or len(np.load(path, mmap_mode='r')) < n_prices + offset:
+            return False
+    for path, offset in _array_paths(state_dir):
+        truncate_array(path, n_prices + offset)
+    return True
+
+
+def _full_ingest(csv_path, state_dir, window):
+    df = parse_price_csv(csv_path)
+    prices = df['Price'].to_numpy(dtype=np.float64)
+    log_returns = np.diff(np.log(prices))
+    write_price_store(state_dir, df['Date'].values, prices)
+    save_array(os.path.join(state_dir, LOG_RETURNS_FILE), log_returns)
+    save_array(os.path.join(state_dir, ROLLING_STD_FILE), rolling_std(log_returns, window))
+    return len(df)
+
+
+def ingest_prices(csv_path='BrentOilPrices.csv', state_dir=None, window=30):
+    """Bring the ingest state up to date with the CSV and return it.
+
+    Returns a dict with memory-mapped 'days', 'prices', 'log_returns' and
+    'rolling_std' arrays, 'new_rows' (rows processed by this call) and
+    'mode': 'full' (first run, or the consumed part of the file changed),
+    'append' or 'unchanged'. Any edit to already consumed bytes, even one
+    that keeps the file length, is caught by a hash of the whole consumed
+    prefix and triggers a full ingest.
+    """
+    csv_path = os.path.abspath(csv_path)
+    if state_dir is None:
+        state_dir = default_state_dir(csv_path)
+    os.makedirs(state_dir, exist_ok=True)
+    state_path = os.path.join(state_dir, STATE_FILE)
+    state = _read_json(state_path, None)
+    size = os.path.getsize(csv_path)
+
+    reusable = (state is not None and state['window'] == window and 'rows' in state
+                and has_price_store(state_dir) and state['offset'] <= size
+                and _restore_lengths(state_dir, state['rows']))
+    if reusable:
+        digest = _prefix_hash(csv_path, state['offset'])
+        reusable = digest.hexdigest() == state['fingerprint']
+
+    if not reusable:
+        new_rows = n_prices = _full_ingest(csv_path, state_dir, window)
+        offset, mode = size, 'full'
+        digest = _prefix_hash(csv_path, offset)
+    elif size == state['offset']:
+        new_rows, offset, mode, n_prices = 0, size, 'unchanged', state['rows']
+    else:
+        with open(csv_path, 'rb') as f:
+            f.seek(state['offset'])
+            chunk = f.read(size - state['offset'])
+        # Leave a partially written last line for the next call
+        complete = chunk[:chunk.rfind(b'\n') + 1]
+        offset = state['offset'] + len(complete)
+        digest.update(complete)
+        rows = pd.read_csv(io.BytesIO(complete), header=None, names=['Date', 'Price'],
+                           dtype=str, skip_blank_lines=True)
+        new_rows = len(rows)
+        n_prices = state['rows'] + new_rows
+        mode = 'append' if new_rows else 'unchanged'
+        if new_rows:
+            old_days, old_prices = open_price_store(state_dir)
+            days, prices = validate_rows(rows, int(old_days[-1]))
+            new_returns = np.diff(np.log(np.concatenate([[old_prices[-1]], prices])))
+            log_returns = np.concatenate([
+                np.load(os.path.join(state_dir, LOG_RETURNS_FILE), mmap_mode='r')[-(window - 1):],
+                new_returns,
+            ])
+            append_array(os.path.join(state_dir, 'dates.npy'), days)
+            append_array(os.path.join(state_dir, 'prices.npy'), prices)
+            append_array(os.path.join(state_dir, LOG_RETURNS_FILE), new_returns)
+            append_array(os.path.join(state_dir, ROLLING_STD_FILE),
+                         rolling_std_tail(log_returns, window, new_rows))
+
+    if mode != 'unchanged':
+        mark_stale(state_dir, DOWNSTREAM_ARTIFACTS, f'{mode} ingest of {new_rows} rows')
+    _write_json(state_path, {
+        'csv_path': csv_path,
+        'offset': offset,
+        'rows': n_prices,
+        'fingerprint': digest.hexdigest(),
+        'window': window,
+    })
+
+    days, prices = open_price_store(state_dir)
+    return {
+        'state_dir': state_dir,
+        'mode': mode,
+        'new_rows': new_rows,
+        'days': days,
+        'prices': prices,
+        'log_returns': np.load(os.path.join(state_dir, LOG_RETURNS_FILE), mmap_mode='r'),
+        'rolling_std': np.load(os.path.join(state_dir, ROLLING_STD_FILE), mmap_mode='r'),
+    }
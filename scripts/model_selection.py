@@ -0,0 +1,131 @@
+# Choosing the number of change points
+#
+# For the conjugate DP the forward tables for K_max contain every smaller K,
+# so log p(data | K) for all K comes from one pass and the best K is sampled
+# from the same tables. The PyMC models fix K in the shapes of their
+# variables, so they are fitted once per K in parallel worker processes and
+# ranked by PSIS-LOO or WAIC on the pointwise log-likelihood given the
+# sampled change points.
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .parallel_sampling import worker_thread_env
+
+CRITERIA = ('evidence', 'loo', 'waic')
+
+
+def pointwise_log_likelihood(trace, log_returns, dtype=np.float64):
+    """log N(x_t | mu_seg(t), sigma_seg(t)) per (chain, draw, t) given the sampled tau.
+
+    Filled one draw at a time into a preallocated (chain, draw, t) array of
+    dtype, so peak memory is the output plus a few length-n vectors.
+    """
+    log_returns = np.asarray(log_returns, dtype=np.float64)
+    posterior = trace.posterior
+    tau = posterior['tau_sorted'].values
+    mu = posterior['mu'].values
+    sigma = posterior['sigma'].values
+    per_segment_sigma = sigma.ndim == 3
+    t = np.arange(len(log_returns))
+    out = np.empty(mu.shape[:2] + (len(log_returns),), dtype=dtype)
+    row = np.empty(len(log_returns))
+    for c in range(mu.shape[0]):
+        for d in range(mu.shape[1]):
+            # Segment of each t: how many change points lie at or before it
+            segment = np.searchsorted(tau[c, d], t, side='right')
+            sigma_t = sigma[c, d][segment] if per_segment_sigma else sigma[c, d]
+            np.subtract(log_returns, mu[c, d][segment], out=row)
+            row /= sigma_t
+            row **= 2
+            row *= -0.5
+            row -= np.log(sigma_t) + 0.5 * np.log(2 * np.pi)
+            out[c, d] = row
+    return out
+
+
+def _fit_one(log_returns, n_change_points, variant, cache_dir, fit_kwargs):
+    from .brent_oil_change_point_model import fit_model
+    from .posterior_cache import PosteriorCache
+
+    posterior_cache = PosteriorCache(cache_dir) if cache_dir else None
+    trace, _ = fit_model(log_returns, n_change_points, variant, posterior_cache=posterior_cache,
+                         cores=1, **fit_kwargs)
+    return n_change_points, trace
+
+
+def _information_criterion(trace, log_returns, criterion):
+    import arviz as az
+
+    data = az.InferenceData(posterior=trace.posterior)
+    data.add_groups(log_likelihood={'log_returns': pointwise_log_likelihood(trace, log_returns)})
+    return az.loo(data) if criterion == 'loo' else az.waic(data)
+
+
+def select_n_change_points(log_returns, k_max=6, variant='conjugate_dp', criterion=None,
+                           cores=None, posterior_cache=None, random_seed=None, **fit_kwargs):
+    """Compare K = 1..k_max and return (table, best_k, best_trace).
+
+    criterion defaults to 'evidence' for the conjugate DP and 'loo' for the
+    PyMC variants. The table has one row per K with the score ('log_evidence',
+    or 'elpd_loo'/'elpd_waic' with its standard error), a 'weight' (the
+    posterior probability of K for the evidence, exp-normalised elpd
+    otherwise) and the rank.
+    With a PosteriorCache every fit is stored, so a later fit_model call for
+    the chosen K is served from the cache.
+    """
+    import arviz as az
+    from .brent_oil_change_point_model import MODEL_VERSIONS, model_posterior_key
+
+    log_returns = np.asarray(log_returns, dtype=np.float64)
+    criterion = criterion or ('evidence' if variant == 'conjugate_dp' else 'loo')
+    if criterion not in CRITERIA:
+        raise ValueError(f"Unknown criterion {criterion!r}; expected one of {CRITERIA}")
+    ks = list(range(1, k_max + 1))
+
+    if criterion == 'evidence':
+        if variant != 'conjugate_dp':
+            raise ValueError("The marginal likelihood is only available for the conjugate_dp variant")
+        from .brent_oil_change_point_model import _sampler_settings
+        from .conjugate_dp import evidence_by_k, posterior_draws
+
+        evidence, scorer, F = evidence_by_k(log_returns, k_max)
+        scores = np.array(evidence[1:])
+        weights = np.exp(scores - scores.max())
+        table = pd.DataFrame({'n_change_points': ks, 'log_evidence': scores,
+                              'weight': weights / weights.sum()})
+        best_k = ks[int(np.argmax(scores))]
+        # Same draws as fit_model(..., variant='conjugate_dp') for best_k
+        draws = _sampler_settings(variant, fit_kwargs.get('draws'))['draws']
+        best_trace = az.from_dict(posterior=posterior_draws(
+            scorer, F, best_k, draws, np.random.default_rng(random_seed)))
+        best_trace.posterior.attrs['log_evidence'] = evidence[best_k]
+        if posterior_cache is not None:
+            key = model_posterior_key(log_returns, best_k, variant, random_seed, **fit_kwargs)
+            posterior_cache.put(key, best_trace, {'variant': variant, 'model_version': MODEL_VERSIONS[variant],
+                                                  'n_change_points': best_k, 'seed': random_seed,
+                                                  'selected_by': criterion})
+    else:
+        cache_dir = posterior_cache.cache_dir if posterior_cache is not None else None
+        fit_kwargs = dict(fit_kwargs, random_seed=random_seed)
+        workers = min(len(ks), cores or os.cpu_count() or 1)
+        context = multiprocessing.get_context('spawn')
+        with worker_thread_env(1), ProcessPoolExecutor(workers, mp_context=context) as pool:
+            futures = [pool.submit(_fit_one, log_returns, k, variant, cache_dir, fit_kwargs) for k in ks]
+            traces = dict(f.result() for f in futures)
+
+        results = [_information_criterion(traces[k], log_returns, criterion) for k in ks]
+        scale_key = f'elpd_{criterion}'
+        scores = np.array([getattr(r, scale_key) for r in results])
+        weights = np.exp(scores - scores.max())
+        table = pd.DataFrame({'n_change_points': ks, scale_key: scores,
+                              'se': [r.se for r in results], 'weight': weights / weights.sum()})
+        best_k = ks[int(np.argmax(scores))]
+        best_trace = traces[best_k]
+
+    table['rank'] = table.iloc[:, 1].rank(ascending=False, method='min').astype(int)
+    return table, best_k, best_trace
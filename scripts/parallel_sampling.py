@@ -0,0 +1,160 @@
+# Multi-chain sampling in a process pool
+#
+# PyMC models hold compiled functions and do not pickle reliably, so workers
+# receive a factory instead: a functools.partial of a module-level builder
+# and its (numpy) arguments, which pickles under the spawn start method. Each
+# worker builds the model, samples one chain with its own seed and BLAS
+# threads capped, and the chains are merged into one InferenceData.
+
+import inspect
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from functools import partial
+
+import numpy as np
+
+from .backends import JAX_BACKENDS, JAX_PLATFORM_ENV, backend_sample_kwargs, pin_jax_to_cpu
+
+# Environment variables read by the BLAS/OpenMP runtimes when a worker starts
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+                   'VECLIB_MAXIMUM_THREADS', 'NUMEXPR_NUM_THREADS')
+
+
+def model_factory(variant, log_returns, n_change_points, windows=None):
+    """Picklable zero-argument callable that builds the model for variant."""
+    from .cp_models import build_marginal_cp_model, build_multi_cp_model
+
+    builders = {'marginal': build_marginal_cp_model, 'discrete': build_multi_cp_model}
+    return partial(builders[variant], np.asarray(log_returns, dtype=np.float64), n_change_points,
+                   windows=windows)
+
+
+def chain_seeds(random_seed, chains):
+    """Independent per-chain seeds derived from one seed (None draws fresh entropy)."""
+    children = np.random.SeedSequence(random_seed).spawn(chains)
+    return [int(child.generate_state(1)[0]) for child in children]
+
+
+@contextmanager
+def worker_thread_env(n_threads):
+    # Spawned workers inherit the environment, so BLAS reads the limit on
+    # import, and JAX (in workers fitting with a JAX backend) stays on the CPU
+    saved = {name: os.environ.get(name) for name in THREAD_ENV_VARS + tuple(JAX_PLATFORM_ENV)}
+    os.environ.update({name: str(n_threads) for name in THREAD_ENV_VARS})
+    os.environ.update(JAX_PLATFORM_ENV)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def _sample_chain(factory, chain, draws, tune, seed, blas_threads, sample_kwargs, step_factory=None):
+    try:
+        from threadpoolctl import threadpool_limits
+        limiter = threadpool_limits(limits=blas_threads)
+    except ImportError:
+        limiter = None
+    from .cp_models import pm
+
+    kwargs = dict(draws=draws, tune=tune, chains=1, cores=1, random_seed=seed, progressbar=False,
+                  compute_convergence_checks=False, return_inferencedata=True)
+    if 'blas_cores' in inspect.signature(pm.sample).parameters:
+        kwargs['blas_cores'] = None
+    kwargs.update(sample_kwargs)
+    try:
+        with factory() as model:
+            if step_factory is not None:
+                kwargs['step'] = step_factory(model)
+            trace = pm.sample(**kwargs)
+    finally:
+        # Pool workers are reused, so a failed chain must not leave BLAS clamped
+        if limiter is not None:
+            limiter.restore_original_limits()
+    # Label the chain so the merged result has chain = 0..chains-1
+    for group in trace.groups():
+        dataset = getattr(trace, group)
+        if 'chain' in dataset.dims:
+            setattr(trace, group, dataset.assign_coords(chain=[chain]))
+    return trace
+
+
+def concat_traces(traces, dim):
+    """az.concat along 'chain' or 'draw', keeping NetCDF-writable attributes.
+
+    az.concat nests the attributes of its inputs into lists; the first
+    trace's attributes are kept instead, with sampling_time taken as the
+    longest chain (parallel) or the sum of consecutive batches.
+    """
+    import arviz as az
+
+    traces = list(traces)
+    merged = az.concat(traces, dim=dim)
+    combine = max if dim == 'chain' else sum
+    for group in merged.groups():
+        attrs = dict(getattr(traces[0], group).attrs)
+        times = [getattr(t, group).attrs.get('sampling_time') for t in traces]
+        if 'sampling_time' in attrs and all(isinstance(t, (int, float)) for t in times):
+            attrs['sampling_time'] = combine(times)
+        getattr(merged, group).attrs = attrs
+    return merged
+
+
+def merge_chains(traces):
+    return concat_traces(traces, dim='chain')
+
+
+@contextmanager
+def chain_pool(chains, cores=None, blas_threads=1, mp_context='spawn', backend='c'):
+    """Process pool for sample_parallel, or None where it samples in this process.
+
+    Pass it as pool= to several sample_parallel calls (e.g. consecutive
+    batches) so the workers, with PyMC already imported, are started once.
+    """
+    cores = min(chains, cores or os.cpu_count() or 1)
+    if backend in JAX_BACKENDS or cores == 1:
+        yield None
+        return
+    context = multiprocessing.get_context(mp_context)
+    with worker_thread_env(blas_threads), ProcessPoolExecutor(cores, mp_context=context) as pool:
+        yield pool
+
+
+def sample_parallel(factory, draws=1000, tune=1000, chains=4, cores=None, random_seed=None,
+                    blas_threads=1, mp_context='spawn', backend='c', initvals=None, step_factory=None,
+                    pool=None, **sample_kwargs):
+    """Sample `chains` chains of factory() in up to `cores` processes.
+
+    With cores=None one process per chain is used, capped at the CPU count.
+    JAX backends sample all chains in this process, as JAX runs them in
+    parallel itself. initvals is an optional list with one starting point
+    (dict of variable values) per chain; step_factory, if given, is called
+    with the model in each worker and returns the step method(s) to use
+    (ignored by the JAX backends). pool, from chain_pool, reuses running
+    workers instead of starting new ones. Returns a single InferenceData
+    with every chain.
+    """
+    sample_kwargs = {**backend_sample_kwargs(backend), **sample_kwargs}
+    if backend in JAX_BACKENDS:
+        from .cp_models import pm
+        pin_jax_to_cpu()
+        with factory():
+            return pm.sample(draws, tune=tune, chains=chains, random_seed=random_seed, initvals=initvals,
+                             progressbar=False, return_inferencedata=True, **sample_kwargs)
+
+    seeds = chain_seeds(random_seed, chains)
+    chain_kwargs = [sample_kwargs if initvals is None else {**sample_kwargs, 'initvals': initvals[c]}
+                    for c in range(chains)]
+    with (nullcontext(pool) if pool is not None
+          else chain_pool(chains, cores, blas_threads, mp_context, backend)) as pool:
+        if pool is None:
+            return merge_chains(_sample_chain(factory, c, draws, tune, seeds[c], blas_threads,
+                                              chain_kwargs[c], step_factory) for c in range(chains))
+        futures = [pool.submit(_sample_chain, factory, c, draws, tune, seeds[c], blas_threads,
+                               chain_kwargs[c], step_factory) for c in range(chains)]
+        return merge_chains(f.result() for f in futures)
@@ -0,0 +1,193 @@
+# PELT (Pruned Exact Linear Time) offline change point detection
+#
+# Non-Bayesian screening engine: finds the segmentation minimising total
+# segment cost plus a penalty per change point. Segment costs come from
+# prefix sums, so every cost evaluation is O(1) and the whole search runs in
+# roughly linear time.
+
+import numpy as np
+
+from .segment_stats import cumulative_sums
+
+# Floor for segment variances in the mean+variance cost (flat segments)
+MIN_VARIANCE = 1e-12
+
+
+def _mean_cost(c1, c2, s, t):
+    # Residual sum of squares of segments [s, t) around their own mean
+    counts = t - s
+    s1 = c1[t] - c1[s]
+    return (c2[t] - c2[s]) - s1 * s1 / counts
+
+
+def _meanvar_cost(c1, c2, s, t):
+    # -2 * Gaussian log-likelihood with segment mean and variance, up to a
+    # term linear in the segment length (which sums to a constant)
+    counts = t - s
+    variance = _mean_cost(c1, c2, s, t) / counts
+    return counts * np.log(np.maximum(variance, MIN_VARIANCE))
+
+
+COSTS = {
+    'mean': _mean_cost,
+    'meanvar': _meanvar_cost,
+}
+
+# Shortest allowed segment per cost; very short segments have near-zero
+# variance and would dominate the mean+variance cost
+DEFAULT_MIN_SIZE = {
+    'mean': 2,
+    'meanvar': 5,
+}
+
+
+def default_penalty(log_returns, cost='mean'):
+    """BIC-style penalty for one extra change point under the given cost."""
+    n = len(log_returns)
+    if cost == 'mean':
+        return 2 * np.var(log_returns) * np.log(n)
+    return 2 * np.log(n)
+
+
+def _mean_scan(t, c1t, c2t, starts, f, s1, s2, out, work):
+    # F[s] + _mean_cost(s, t) for every candidate s, less c2[t], which is
+    # returned instead of being added to every value
+    np.subtract(c1t, s1, out=work)
+    np.multiply(work, work, out=work)
+    np.subtract(t, starts, out=out)
+    np.divide(work, out, out=work)
+    np.subtract(f, s2, out=out)
+    np.subtract(out, work, out=out)
+    return c2t
+
+
+def _meanvar_scan(t, c1t, c2t, starts, f, s1, s2, out, work):
+    # F[s] + _meanvar_cost(s, t) for every candidate s
+    counts = np.subtract(t, starts, out=out)
+    np.subtract(c1t, s1, out=work)
+    np.multiply(work, work, out=work)
+    np.divide(work, counts, out=work)
+    np.subtract(c2t - s2, work, out=work)
+    np.divide(work, counts, out=work)
+    np.maximum(work, MIN_VARIANCE, out=work)
+    np.log(work, out=work)
+    np.multiply(work, counts, out=out)
+    np.add(out, f, out=out)
+    return 0.0
+
+
+SCANS = {
+    'mean': _mean_scan,
+    'meanvar': _meanvar_scan,
+}
+
+
+def _pelt(c1, c2, penalty, cost, min_size):
+    n = len(c1) - 1
+    scan = SCANS[cost]
+    F = np.full(n + 1, np.inf)
+    F[0] = -penalty
+    last = np.zeros(n + 1, dtype=np.int64)
+    # The m live candidates are packed at the front of these columns: segment
+    # start, F at the start and the prefix sums at the start. Candidates are
+    # appended in increasing order and pruned by compacting in place, so the
+    # scan reads contiguous memory and allocates nothing per step.
+    index = np.empty(n + 1, dtype=np.int64)
+    columns = np.empty((4, n + 1))
+    starts, f, s1, s2 = columns
+    values, work = np.empty(n + 1), np.empty(n + 1)
+    m = 0
+
+    def add(s):
+        nonlocal m
+        index[m] = s
+        columns[:, m] = s, F[s], c1[s], c2[s]
+        m += 1
+
+    add(0)
+    for t in range(min_size, n + 1):
+        offset = scan(t, c1[t], c2[t], starts[:m], f[:m], s1[:m], s2[:m], values[:m], work[:m])
+        best = values[:m].argmin()
+        F[t] = values[best] + offset + penalty
+        last[t] = index[best]
+        # Prune candidates that can never be optimal again
+        keep = values[:m] <= F[t] - offset
+        kept = np.count_nonzero(keep)
+        if kept < m:
+            columns[:, :kept] = columns[:, :m][:, keep]
+            index[:kept] = index[:m][keep]
+            m = kept
+        new = t - min_size + 1
+        if new >= min_size:
+            add(new)
+
+    change_points = []
+    t = last[n]
+    while t > 0:
+        change_points.append(int(t))
+        t = last[t]
+    return change_points[::-1]
+
+
+def pelt(log_returns, penalty=None, cost='mean', min_size=None):
+    """Optimal change points of log_returns for one penalty.
+
+    Change points are returned as indices where a new segment starts, the
+    same convention as tau_sorted in the Bayesian models.
+    """
+    if penalty is None:
+        penalty = default_penalty(log_returns, cost)
+    if min_size is None:
+        min_size = DEFAULT_MIN_SIZE[cost]
+    c1, c2 = cumulative_sums(log_returns)
+    return _pelt(c1, c2, penalty, cost, min_size)
+
+
+def _unpenalised_cost(c1, c2, change_points, cost):
+    bounds = np.concatenate([[0], change_points, [len(c1) - 1]]).astype(np.int64)
+    return float(COSTS[cost](c1, c2, bounds[:-1], bounds[1:]).sum())
+
+
+def pelt_sweep(log_returns, penalties, cost='mean', min_size=None):
+    """Run PELT for several penalties, sharing the prefix sums.
+
+    Returns a dict mapping each penalty to its list of change points.
+    Following CROPS (Haynes et al., 2017), the optimal total cost is a
+    concave piecewise-linear function of the penalty whose slope is the
+    number of change points, so PELT only runs where it is needed: between
+    two penalties with the same segmentation every penalty shares it, and
+    between segmentations differing by one change point the cheaper one at
+    each penalty is optimal.
+    """
+    if min_size is None:
+        min_size = DEFAULT_MIN_SIZE[cost]
+    c1, c2 = cumulative_sums(log_returns)
+    ordered = sorted(set(penalties))
+    results = {}
+
+    def solve(i):
+        if ordered[i] not in results:
+            results[ordered[i]] = _pelt(c1, c2, ordered[i], cost, min_size)
+        return results[ordered[i]]
+
+    def fill(lo, hi):
+        if hi - lo < 2:
+            return
+        low, high = solve(lo), solve(hi)
+        if low == high:
+            results.update((penalty, low) for penalty in ordered[lo + 1:hi])
+        elif len(low) == len(high) + 1:
+            costs = _unpenalised_cost(c1, c2, low, cost), _unpenalised_cost(c1, c2, high, cost)
+            for penalty in ordered[lo + 1:hi]:
+                results[penalty] = low if costs[0] + penalty * len(low) < costs[1] + penalty * len(high) else high
+        else:
+            mid = (lo + hi) // 2
+            solve(mid)
+            fill(lo, mid)
+            fill(mid, hi)
+
+    if ordered:
+        solve(0)
+        solve(len(ordered) - 1)
+        fill(0, len(ordered) - 1)
+    return {penalty: results[penalty] for penalty in penalties}
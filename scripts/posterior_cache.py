@@ -0,0 +1,99 @@
+# On-disk cache of sampled posteriors
+#
+# Each InferenceData is stored as <key>.nc (NetCDF) next to a small <key>.json
+# describing what produced it. The key hashes the log returns, the model
+# specification, the sampler settings and the random seed, so any change to
+# one of them samples afresh. Reading an entry refreshes its mtime; entries
+# unused for max_age_days are dropped, then the least recently used ones
+# until the directory fits in max_bytes.
+
+import hashlib
+import json
+import os
+import time
+
+from .artifact_cache import array_digest, evict_entries
+
+DEFAULT_MAX_BYTES = 1 << 30
+DEFAULT_MAX_AGE_DAYS = 30
+
+
+def posterior_key(log_returns, model_spec, sampler_settings, random_seed=None):
+    payload = json.dumps({
+        'data': array_digest(log_returns),
+        'model': model_spec,
+        'sampler': sampler_settings,
+        'seed': random_seed,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class PosteriorCache:
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.nc')
+
+    def has(self, key):
+        return os.path.exists(self.path(key))
+
+    def get(self, key):
+        """The cached InferenceData for key, or None."""
+        import arviz as az
+
+        if not self.has(key):
+            return None
+        os.utime(self.path(key))
+        # Load into memory so the file can be evicted or replaced later
+        trace = az.from_netcdf(self.path(key))
+        trace.load()
+        return trace
+
+    def put(self, key, trace, metadata=None):
+        tmp = f'{self.path(key)}.{os.getpid()}.tmp'
+        trace.to_netcdf(tmp)
+        os.replace(tmp, self.path(key))
+        with open(os.path.join(self.cache_dir, f'{key}.json'), 'w') as f:
+            json.dump({'created': time.time(), **(metadata or {})}, f, indent=2, default=str)
+        self.evict(keep=key)
+
+    def metadata(self, key):
+        """The description stored with key by put(), or {}."""
+        try:
+            with open(os.path.join(self.cache_dir, f'{key}.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def find(self, **match):
+        """(key, metadata) of entries whose metadata contains match, newest first."""
+        found = []
+        for _, _, key in self.entries():
+            metadata = self.metadata(key)
+            if all(metadata.get(name) == value for name, value in match.items()):
+                found.append((metadata.get('created', 0), key, metadata))
+        return [(key, metadata) for _, key, metadata in sorted(found, reverse=True)]
+
+    def entries(self):
+        """(mtime, size, key) of every entry, least recently used first."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.nc'):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime, stat.st_size, name[:-3]))
+        return sorted(entries)
+
+    def remove(self, key):
+        for suffix in ('.nc', '.json'):
+            try:
+                os.remove(os.path.join(self.cache_dir, key + suffix))
+            except FileNotFoundError:
+                pass
+
+    def evict(self, keep=None):
+        """Drop expired entries, then LRU entries beyond max_bytes; returns the removed keys."""
+        return evict_entries(self.entries(), self.remove, self.max_bytes, self.max_age_days, keep)
@@ -0,0 +1,85 @@
+# Change point posterior summaries
+#
+# All K change points are histogrammed in one np.bincount (each change point
+# gets its own block of bins), and every statistic is read off the histogram
+# and its cumulative sums: mode, mean, median and highest-density intervals.
+# The histogram is kept in sparse form (positions with non-zero mass), which
+# is all later stages need and is far smaller than the raw draws.
+
+import numpy as np
+import pandas as pd
+
+HDI_PROBS = (0.5, 0.94)
+
+
+def tau_histograms(tau_sorted, size=None):
+    """Draw counts (K, size) of every change point position, from (..., K) draws."""
+    draws = np.asarray(tau_sorted, dtype=np.int64)
+    draws = draws.reshape(-1, draws.shape[-1])
+    n_change_points = draws.shape[1]
+    size = int(draws.max()) + 1 if size is None else size
+    offsets = np.arange(n_change_points) * size
+    counts = np.bincount((draws + offsets).ravel(), minlength=n_change_points * size)
+    return counts.reshape(n_change_points, size)
+
+
+def _first_reaching(cdf, targets):
+    """Per row, the first column where cdf (rows non-decreasing, within [0, total]) reaches targets.
+
+    Rows are shifted apart so one searchsorted over the flattened array
+    serves all of them; a result past the end of a row means never.
+    """
+    rows, width = cdf.shape
+    shift = (np.arange(rows) * (cdf[:, -1].max() + 1))[:, None]
+    flat = np.searchsorted((cdf + shift).ravel(), (targets + shift).ravel()).reshape(targets.shape)
+    return flat - (np.arange(rows) * width)[:, None]
+
+
+def hdi_bounds(counts, prob):
+    """Narrowest contiguous interval [lo, hi] per row of counts holding at least prob of the mass."""
+    n_rows, size = counts.shape
+    cdf = np.zeros((n_rows, size + 1), dtype=np.int64)
+    np.cumsum(counts, axis=1, out=cdf[:, 1:])
+    need = np.ceil(prob * cdf[:, -1:]).astype(np.int64)
+    # Interval [a, b) for every start a: the first b with cdf[b] - cdf[a] >= need
+    stop = _first_reaching(cdf, cdf[:, :size] + need)
+    width = np.where(stop <= size, stop - np.arange(size), np.iinfo(np.int64).max)
+    lo = width.argmin(axis=1)
+    hi = np.take_along_axis(stop, lo[:, None], axis=1)[:, 0] - 1
+    return lo, hi
+
+
+def summarize_change_points(tau_sorted, dates=None, hdi_probs=HDI_PROBS):
+    """Per change point summary and sparse probability mass function.
+
+    Returns (summary, pmf). summary has one row per change point with the
+    mode, mean and median of tau and, for each p in hdi_probs, the bounds
+    hdi_<p>_lower/upper; pmf has one row per (change_point, tau) with
+    non-zero probability. With dates (prices, one longer than the returns
+    tau indexes) both get the matching change dates dates[tau + 1].
+    """
+    counts = tau_histograms(tau_sorted)
+    n_change_points, size = counts.shape
+    total = counts.sum(axis=1)
+    positions = np.arange(size)
+    cumulative = np.cumsum(counts, axis=1)
+    summary = pd.DataFrame({
+        'change_point': np.arange(1, n_change_points + 1),
+        'mode': counts.argmax(axis=1),
+        'mean': counts @ positions / total,
+        'median': _first_reaching(cumulative, np.ceil(total / 2)[:, None].astype(np.int64))[:, 0],
+    })
+    for prob in hdi_probs:
+        lo, hi = hdi_bounds(counts, prob)
+        label = f'hdi_{round(prob * 100)}'
+        summary[f'{label}_lower'], summary[f'{label}_upper'] = lo, hi
+
+    rows, taus = np.nonzero(counts)
+    pmf = pd.DataFrame({'change_point': rows + 1, 'tau': taus,
+                        'probability': counts[rows, taus] / total[rows]})
+    if dates is not None:
+        dates = pd.DatetimeIndex(dates)
+        for column in ['mode', 'median'] + [c for c in summary if c.startswith('hdi_')]:
+            summary[f'{column}_date'] = dates[summary[column].to_numpy() + 1]
+        pmf['date'] = dates[pmf['tau'].to_numpy() + 1]
+    return summary, pmf
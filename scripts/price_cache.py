@@ -0,0 +1,97 @@
+# Parsed price cache
+#
+# Parsing BrentOilPrices.csv (string dates in mixed formats) dominates start-up
+# time. The parsed, date-sorted series is stored as a price store (see
+# price_store.py: int64 epoch days and float64 prices) in a directory named
+# after the CSV's content hash. A small index remembers each CSV's size and
+# mtime, so an unchanged file is recognised without even hashing it, and the
+# arrays are then opened memory-mapped.
+#
+# This is the loader for tools that only want the prices of a CSV. The
+# pipeline ingests incrementally instead (ingest.py) and publishes the store
+# the dashboard apps read (price_store.publish_price_store).
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from .price_store import from_epoch_days, has_price_store, open_price_store, write_price_store
+
+CACHE_DIRNAME = '.price_cache'
+INDEX_FILE = 'index.json'
+DATE_FORMAT = '%d-%b-%y'
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_price_csv(csv_path):
+    """Read a Date/Price CSV, parse the dates and sort by date."""
+    df = pd.read_csv(csv_path)
+    try:
+        df['Date'] = pd.to_datetime(df['Date'], format=DATE_FORMAT)
+    except ValueError:
+        # Newer rows in the Brent file use 'Apr 22, 2020' style dates
+        df['Date'] = pd.to_datetime(df['Date'], format='mixed')
+    return df.sort_values('Date', kind='stable').reset_index(drop=True)
+
+
+def _read_index(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, INDEX_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_index(cache_dir, index):
+    path = os.path.join(cache_dir, INDEX_FILE)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp, path)
+
+
+def load_price_arrays(csv_path='BrentOilPrices.csv', cache_dir=None):
+    """Date-sorted (epoch_days, prices) arrays of a price CSV, via the cache.
+
+    The arrays are read-only memory maps when served from the cache. The CSV
+    is only parsed when its content hash has not been seen before.
+    """
+    csv_path = os.path.abspath(csv_path)
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(csv_path), CACHE_DIRNAME)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    stat = os.stat(csv_path)
+    index = _read_index(cache_dir)
+    entry = index.get(csv_path)
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+        key = entry['sha256']
+    else:
+        key = file_sha256(csv_path)
+    entry_dir = os.path.join(cache_dir, key)
+    if not has_price_store(entry_dir):
+        df = parse_price_csv(csv_path)
+        write_price_store(entry_dir, df['Date'].values, df['Price'].values)
+
+    new_entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': key}
+    if entry != new_entry:
+        index[csv_path] = new_entry
+        _write_index(cache_dir, index)
+
+    return open_price_store(entry_dir)
+
+
+def load_price_frame(csv_path='BrentOilPrices.csv', cache_dir=None):
+    """Date-sorted DataFrame with 'Date' and 'Price' columns, via the cache."""
+    days, prices = load_price_arrays(csv_path, cache_dir)
+    return pd.DataFrame({'Date': from_epoch_days(days), 'Price': np.asarray(prices)})
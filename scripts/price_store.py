@@ -0,0 +1,170 @@
+# Read-only, memory-mapped price store
+#
+# A store is a directory holding two plain .npy files: dates.npy (int64 days
+# since 1970-01-01) and prices.npy (float64), sorted by date. Opening it with
+# np.load(mmap_mode='r') is zero-copy, so any number of worker processes share
+# the same page-cache pages instead of each parsing and holding its own copy.
+#
+# A store that readers poll while it is replaced (the dashboard's) is
+# published instead: each version is a subdirectory named by its data hash,
+# created under a temporary name and renamed into place, and a CURRENT file
+# naming the live version is replaced last. Readers key their cache on
+# CURRENT, so they switch from one complete version to the next and never
+# see dates from one write with prices from another.
+
+import io
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+DATES_FILE = 'dates.npy'
+PRICES_FILE = 'prices.npy'
+CURRENT_FILE = 'CURRENT'
+
+
+def to_epoch_days(dates):
+    return np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+
+
+def from_epoch_days(days):
+    return pd.to_datetime(np.asarray(days, dtype=np.int64), unit='D')
+
+
+def save_array(path, array):
+    """np.save via a temporary file so readers never see a partial array."""
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+def _read_header(f):
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+    return version, shape, fortran_order, dtype
+
+
+def _header_bytes(version, dtype, fortran_order, length):
+    header = io.BytesIO()
+    fields = {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': fortran_order,
+              'shape': (length,)}
+    if version == (1, 0):
+        np.lib.format.write_array_header_1_0(header, fields)
+    else:
+        np.lib.format.write_array_header_2_0(header, fields)
+    return header.getvalue()
+
+
+def append_array(path, values):
+    """Append rows to a 1-d .npy file in place, in time proportional to len(values).
+
+    The data is written first and the header (whose shape field numpy pads
+    for growth) last, so a reader never sees a shape larger than the data.
+    """
+    with open(path, 'r+b') as f:
+        version, shape, fortran_order, dtype = _read_header(f)
+        header_size = f.tell()
+        values = np.asarray(values, dtype=dtype)
+        header = _header_bytes(version, dtype, fortran_order, shape[0] + len(values))
+        if len(header) == header_size:
+            f.seek(0, os.SEEK_END)
+            f.write(values.tobytes())
+            f.flush()
+            f.seek(0)
+            f.write(header)
+            return
+    # The header outgrew its padding: fall back to a full rewrite
+    save_array(path, np.concatenate([np.load(path), values]))
+
+
+def truncate_array(path, length):
+    """Cut a 1-d .npy file down to its first length rows in place.
+
+    The header is rewritten before the data is cut, so a reader never sees a
+    shape larger than the data.
+    """
+    with open(path, 'r+b') as f:
+        version, shape, fortran_order, dtype = _read_header(f)
+        if shape[0] <= length:
+            return
+        header_size = f.tell()
+        header = _header_bytes(version, dtype, fortran_order, length)
+        if len(header) == header_size:
+            f.seek(0)
+            f.write(header)
+            f.flush()
+            f.truncate(header_size + length * dtype.itemsize)
+            return
+    save_array(path, np.load(path)[:length])
+
+
+def write_price_store(store_dir, dates, prices):
+    """Write date-sorted dates (datetime-like or epoch days) and prices."""
+    os.makedirs(store_dir, exist_ok=True)
+    dates = np.asarray(dates)
+    days = dates.astype(np.int64) if dates.dtype.kind in 'iu' else to_epoch_days(dates)
+    save_array(os.path.join(store_dir, DATES_FILE), days)
+    save_array(os.path.join(store_dir, PRICES_FILE), np.asarray(prices, dtype=np.float64))
+
+
+def has_price_store(store_dir):
+    return (os.path.exists(os.path.join(store_dir, DATES_FILE))
+            and os.path.exists(os.path.join(store_dir, PRICES_FILE)))
+
+
+def open_price_store(store_dir):
+    """(epoch_days, prices) as read-only memory maps."""
+    return (np.load(os.path.join(store_dir, DATES_FILE), mmap_mode='r'),
+            np.load(os.path.join(store_dir, PRICES_FILE), mmap_mode='r'))
+
+
+def current_version(store_dir):
+    """Version named by store_dir/CURRENT, or None if nothing is published."""
+    try:
+        with open(os.path.join(store_dir, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def publish_price_store(store_dir, dates, prices, version):
+    """Make (dates, prices) the live version of a published store; returns False if it already is.
+
+    version identifies the data (e.g. its hash), so republishing unchanged
+    prices writes nothing.
+    """
+    version_dir = os.path.join(store_dir, version)
+    previous = current_version(store_dir)
+    if previous == version and has_price_store(version_dir):
+        return False
+    if not has_price_store(version_dir):
+        tmp_dir = f'{version_dir}.{os.getpid()}.tmp'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        write_price_store(tmp_dir, dates, prices)
+        shutil.rmtree(version_dir, ignore_errors=True)
+        os.replace(tmp_dir, version_dir)
+    current = os.path.join(store_dir, CURRENT_FILE)
+    with open(f'{current}.{os.getpid()}.tmp', 'w') as f:
+        f.write(version)
+    os.replace(f'{current}.{os.getpid()}.tmp', current)
+    # Keep the previous version for readers that read CURRENT just before the
+    # swap; dates.npy/prices.npy at the top level are from the unversioned layout
+    for entry in os.scandir(store_dir):
+        if entry.is_dir() and entry.name not in (version, previous) and not entry.name.endswith('.tmp'):
+            shutil.rmtree(entry.path, ignore_errors=True)
+        elif entry.name in (DATES_FILE, PRICES_FILE):
+            os.remove(entry.path)
+    return True
+
+
+def open_published_store(store_dir):
+    """(version, epoch_days, prices) of the live version of a published store."""
+    version = current_version(store_dir)
+    if version is None:
+        raise FileNotFoundError(f'No price store published in {store_dir}')
+    return (version, *open_price_store(os.path.join(store_dir, version)))
@@ -0,0 +1,112 @@
+# Per-stage timing and memory instrumentation for the analysis pipeline
+#
+# Each stage records wall time, CPU time of this process, CPU time of child
+# processes that finished during the stage (chain and K-selection worker
+# pools) and, when memory tracing is on, how far Python-tracked memory
+# (tracemalloc, which includes numpy buffers) peaked above its level at the
+# start of the stage. The run record is written as JSON so slow nightly runs
+# can be traced to a stage (sampling, trace plots, PNG rendering, ...).
+
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def children_cpu_time():
+    """User + system CPU seconds of terminated, waited-for child processes (None on Windows)."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class StageProfiler:
+    """Sequential stage timer: use `with profiler.stage(name):` or begin()/end().
+
+    Stages are not nested; begin() ends the running stage first. Memory
+    tracing slows allocation-heavy code (plotting by about 3x), so it is off
+    unless trace_memory=True. Child CPU time only counts workers that exit
+    within the stage; a pool shut down later is charged to the stage that
+    shuts it down.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.stages = []
+        self.metadata = {}
+        self._current = None
+
+    def begin(self, name):
+        if self._current is not None:
+            self.end()
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        memory_start = tracemalloc.get_traced_memory()[0] if self.trace_memory else None
+        self._current = (name, time.perf_counter(), time.process_time(), children_cpu_time(), memory_start)
+
+    def end(self):
+        if self._current is None:
+            return
+        name, wall_start, cpu_start, children_start, memory_start = self._current
+        children_end = children_cpu_time()
+        record = {
+            'stage': name,
+            'wall_s': time.perf_counter() - wall_start,
+            'cpu_s': time.process_time() - cpu_start,
+            'children_cpu_s': None if children_end is None else children_end - children_start,
+            'peak_mem_delta_mb': None,
+        }
+        if memory_start is not None and tracemalloc.is_tracing():
+            record['peak_mem_delta_mb'] = (tracemalloc.get_traced_memory()[1] - memory_start) / 2 ** 20
+        self.stages.append(record)
+        self._current = None
+
+    @contextmanager
+    def stage(self, name):
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end()
+
+    def to_dict(self):
+        return {
+            'started_at': self.started_at,
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'metadata': self.metadata,
+            'total_wall_s': sum(s['wall_s'] for s in self.stages),
+            'stages': self.stages,
+        }
+
+    def write_json(self, path):
+        self.end()
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def summary_table(self):
+        total = sum(s['wall_s'] for s in self.stages) or 1.0
+        lines = [f"{'Stage':<24}{'Wall (s)':>10}{'CPU (s)':>10}{'Child CPU':>10}{'Share':>8}{'Peak +MB':>10}"]
+        for s in self.stages:
+            children = f"{s['children_cpu_s']:.2f}" if s['children_cpu_s'] is not None else '-'
+            peak = f"{s['peak_mem_delta_mb']:.1f}" if s['peak_mem_delta_mb'] is not None else '-'
+            lines.append(f"{s['stage']:<24}{s['wall_s']:>10.2f}{s['cpu_s']:>10.2f}{children:>10}"
+                         f"{s['wall_s'] / total:>8.1%}{peak:>10}")
+        return '\n'.join(lines)
+
+    def print_summary(self):
+        print(self.summary_table())
@@ -0,0 +1,223 @@
+# Multi-window rolling statistics
+#
+# Rolling mean, standard deviation, skew and realised volatility for any
+# number of windows come from one set of prefix sums of x, x**2 and x**3:
+# every window statistic is a difference of two prefix sums, so adding a
+# window costs a few vector operations instead of another rolling pass.
+# The sums are taken over chunks (plus the trailing returns of the previous
+# chunk) centred on the chunk mean, which keeps them small and bounds the
+# temporary memory. The EWMA variant (RiskMetrics volatility) is a first
+# order recursion, evaluated in closed form over short blocks, whose state
+# is carried from chunk to chunk.
+
+import numpy as np
+import pandas as pd
+
+ROLLING_WINDOWS = (5, 20, 30, 60, 120, 252)
+# RiskMetrics decay factors for daily and monthly horizons
+EWMA_LAMBDAS = (0.94, 0.97)
+TRADING_DAYS = 252
+CHUNK_SIZE = 1 << 20
+# lam**-EWMA_BLOCK stays finite for any decay factor above 0.004
+EWMA_BLOCK = 128
+
+
+def ewma_column(lam):
+    """Column name of the EWMA volatility with decay factor lam: every digit after '0.'.
+
+    0.94 gives ewma_vol_94 and 0.975 gives ewma_vol_975, so distinct decay
+    factors never share a column.
+    """
+    return f"ewma_vol_{np.format_float_positional(lam, trim='-')[2:]}"
+
+
+def rolling_columns(windows=ROLLING_WINDOWS, lambdas=EWMA_LAMBDAS):
+    """Names of the columns rolling_statistics produces, in order."""
+    names = [f'{stat}_{w}' for w in windows for stat in ('mean', 'std', 'skew', 'realized_vol')]
+    return names + [ewma_column(lam) for lam in lambdas]
+
+
+def check_windows(windows):
+    windows = sorted({int(w) for w in windows})
+    if windows and windows[0] < 2:
+        raise ValueError(f"Rolling windows need at least two returns: {windows}")
+    return windows
+
+
+def check_lambdas(lambdas):
+    lambdas = sorted({float(lam) for lam in lambdas})
+    if lambdas and not 0 < lambdas[0] <= lambdas[-1] < 1:
+        raise ValueError(f"EWMA decay factors must lie strictly between 0 and 1: {lambdas}")
+    return lambdas
+
+
+def fill_rolling(columns, rows, extended, offset, windows, periods_per_year=TRADING_DAYS):
+    """Fill columns[...][rows] with the window statistics of extended[offset:].
+
+    extended holds up to max(windows) - 1 returns preceding the rows
+    followed by the returns of the rows themselves; rows without a full
+    window are NaN (as pandas' rolling).
+    """
+    shift = extended[offset:].mean()
+    centred = extended - shift
+    sums = np.zeros((3, len(extended) + 1))
+    np.cumsum(centred, out=sums[0, 1:])
+    np.cumsum(centred * centred, out=sums[1, 1:])
+    np.cumsum(centred * centred * centred, out=sums[2, 1:])
+
+    m = len(extended) - offset
+    scratch = np.empty((3, m))
+    for w in windows:
+        first = min(m, max(0, w - 1 - offset))
+        out = {stat: columns[f'{stat}_{w}'][rows] for stat in ('mean', 'std', 'skew', 'realized_vol')}
+        for values in out.values():
+            values[:first] = np.nan
+        mean, std, skew, realized = (values[first:] for values in out.values())
+        # Window sums of the centred x, x**2 and x**3, then in-place moments
+        s1, s2, s3 = scratch[:, :m - first]
+        np.subtract(sums[:, offset + 1 + first:offset + 1 + m],
+                    sums[:, offset + 1 + first - w:offset + 1 + m - w], out=scratch[:, :m - first])
+        np.multiply(s1, 1 / w, out=mean)
+
+        # Sum of squares of the raw returns
+        np.multiply(s1, 2 * shift, out=realized)
+        realized += s2
+        realized += w * shift * shift
+        np.maximum(realized, 0, out=realized)
+        realized *= periods_per_year / w
+        np.sqrt(realized, out=realized)
+
+        # s1 <- centred sum of squares M2
+        s1 *= mean
+        np.subtract(s2, s1, out=s1)
+        np.maximum(s1, 0, out=s1)
+        np.multiply(s1, 1 / (w - 1), out=std)
+        np.sqrt(std, out=std)
+
+        # s3 <- centred sum of cubes M3 = S3 - 3 mean S2 + 2 w mean**3
+        s2 *= mean
+        s2 *= 3
+        s3 -= s2
+        np.multiply(mean, mean, out=s2)
+        s2 *= mean
+        s2 *= 2 * w
+        s3 += s2
+        if w > 2:
+            # Adjusted Fisher-Pearson skew, as pandas' rolling().skew()
+            np.sqrt(s1, out=s2)
+            s2 *= s1
+            with np.errstate(divide='ignore', invalid='ignore'):
+                np.divide(s3, s2, out=skew)
+            skew *= np.sqrt(w * (w - 1)) / (w - 2) * np.sqrt(w)
+            skew[s1 <= 0] = np.nan
+        else:
+            skew[:] = np.nan
+        mean += shift
+
+
+def ewma_filter(x, lam, previous, block=EWMA_BLOCK):
+    """y[t] = lam * y[t - 1] + (1 - lam) * x[t] from y[-1] = previous, for non-negative x.
+
+    Within a block of `block` values the recursion has the closed form
+    y[j] = lam**(j + 1) * (y_start + (1 - lam) * sum_k<=j lam**-(k + 1) x[k]);
+    all terms are non-negative, so the cumulative sum is accurate. Only the
+    block end values are carried in a Python loop.
+    """
+    n = len(x)
+    rows = -(-n // block)
+    padded = np.zeros(rows * block)
+    padded[:n] = x
+    padded = padded.reshape(rows, block)
+    powers = lam ** np.arange(1, block + 1)
+    local = np.cumsum(padded / powers, axis=1)
+    local *= powers * (1 - lam)
+    starts = np.empty(rows)
+    for r in range(rows):
+        starts[r] = previous
+        previous = powers[-1] * previous + local[r, -1]
+    local += starts[:, None] * powers
+    return local.ravel()[:n]
+
+
+def fill_ewma(columns, rows, returns, state, lambdas, periods_per_year=TRADING_DAYS):
+    """Fill the ewma_vol columns for rows; returns the variance state for the next chunk.
+
+    state holds the last EWMA variance per lambda, or None at the start of
+    the series (the first squared return seeds the average).
+    """
+    squared = returns * returns
+    new_state = []
+    for i, lam in enumerate(lambdas):
+        variance = ewma_filter(squared, lam, squared[0] if state is None else state[i])
+        columns[ewma_column(lam)][rows] = np.sqrt(variance * periods_per_year)
+        new_state.append(variance[-1])
+    return new_state
+
+
+def rolling_statistics(log_returns, windows=ROLLING_WINDOWS, lambdas=EWMA_LAMBDAS,
+                       periods_per_year=TRADING_DAYS, chunk_size=CHUNK_SIZE):
+    """Rolling statistics of log returns for every window, in O(n) total.
+
+    Returns a DataFrame aligned with log_returns with mean_<w>, std_<w>,
+    skew_<w> and realized_vol_<w> (annualised root mean square return) for
+    each window w, and ewma_vol_<digits of lambda> (annualised RiskMetrics
+    volatility, see ewma_column) for each decay factor. mean, std and skew
+    match pandas' rolling() results. log_returns may be memory-mapped; it is
+    read in chunks of chunk_size.
+    """
+    windows = check_windows(windows)
+    lambdas = check_lambdas(lambdas)
+    n = len(log_returns)
+    columns = {name: np.empty(n) for name in rolling_columns(windows, lambdas)}
+    keep = windows[-1] - 1 if windows else 0
+    tail = np.empty(0)
+    state = None
+    for start in range(0, n, chunk_size):
+        rows = slice(start, min(start + chunk_size, n))
+        returns = np.asarray(log_returns[rows], dtype=np.float64)
+        extended = np.concatenate([tail, returns])
+        fill_rolling(columns, rows, extended, len(tail), windows, periods_per_year)
+        if lambdas:
+            state = fill_ewma(columns, rows, returns, state, lambdas, periods_per_year)
+        tail = extended[max(0, len(extended) - keep):]
+    return pd.DataFrame(columns, copy=False)
+
+
+def _fill_std(out, extended, offset, window):
+    # Two-moment version of fill_rolling for a single window
+    shift = extended[offset:].mean()
+    centred = extended - shift
+    sums = np.zeros((2, len(extended) + 1))
+    np.cumsum(centred, out=sums[0, 1:])
+    np.cumsum(centred * centred, out=sums[1, 1:])
+
+    m = len(extended) - offset
+    first = min(m, max(0, window - 1 - offset))
+    out[:first] = np.nan
+    s1, s2 = (sums[:, offset + 1 + first:offset + 1 + m]
+              - sums[:, offset + 1 + first - window:offset + 1 + m - window])
+    # s2 <- centred sum of squares M2
+    s1 *= s1
+    s1 *= 1 / window
+    s2 -= s1
+    np.maximum(s2, 0, out=s2)
+    np.multiply(s2, 1 / (window - 1), out=out[first:])
+    np.sqrt(out[first:], out=out[first:])
+
+
+def rolling_std(log_returns, window, chunk_size=CHUNK_SIZE):
+    """Rolling std of log returns over window (NaN for the first window - 1).
+
+    Same values as the std_<window> column of rolling_statistics, from the
+    first two prefix sums only.
+    """
+    window, = check_windows((window,))
+    n = len(log_returns)
+    out = np.empty(n)
+    tail = np.empty(0)
+    for start in range(0, n, chunk_size):
+        rows = slice(start, min(start + chunk_size, n))
+        extended = np.concatenate([tail, np.asarray(log_returns[rows], dtype=np.float64)])
+        _fill_std(out[rows], extended, len(tail), window)
+        tail = extended[max(0, len(extended) - (window - 1)):]
+    return out
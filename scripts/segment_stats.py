@@ -0,0 +1,148 @@
+# Prefix-sum helpers shared by the change point engines
+#
+# A segment [start, stop) of the log return series is fully described, for a
+# Normal likelihood, by its length and the sums of x and x**2 over it. Taking
+# cumulative sums once lets every engine read those three numbers in O(1) for
+# any segment instead of re-scanning the data.
+
+from math import lgamma
+
+import numpy as np
+
+
+def cumulative_sums(x):
+    """Return prefix sums (c1, c2) of x and x**2, each with a leading zero.
+
+    The sums over the segment [start, stop) are c1[stop] - c1[start] and
+    c2[stop] - c2[start].
+    """
+    x = np.asarray(x, dtype=np.float64)
+    c1 = np.concatenate([[0.0], np.cumsum(x)])
+    c2 = np.concatenate([[0.0], np.cumsum(x * x)])
+    return c1, c2
+
+
+def segment_bounds(tau_sorted, n):
+    """Segment boundaries [0, tau_1, ..., tau_K, n] for sorted change points."""
+    return np.concatenate([[0], np.asarray(tau_sorted, dtype=np.int64), [n]])
+
+
+def segment_normal_logp(c1, c2, tau_sorted, mu, sigma):
+    """Log-likelihood of a piecewise-constant-mean Normal model in O(K).
+
+    Segment k covers indices [tau_sorted[k-1], tau_sorted[k]) and has mean
+    mu[k]; all segments share sigma. Equivalent to summing
+    Normal(mu_t, sigma).logpdf(x_t) over every observation.
+    """
+    n = len(c1) - 1
+    bounds = segment_bounds(tau_sorted, n)
+    counts = np.diff(bounds)
+    s1 = np.diff(c1[bounds])
+    s2 = np.diff(c2[bounds])
+    mu = np.asarray(mu, dtype=np.float64)
+    sse = s2 - 2.0 * mu * s1 + counts * mu ** 2
+    return float(-0.5 * n * np.log(2 * np.pi * sigma ** 2) - sse.sum() / (2 * sigma ** 2))
+
+
+def prefix_normal_loglik(c1, c2, mu, sigma):
+    """Cumulative Normal log-likelihood E[k, t] of x[:t] under mean mu[k].
+
+    Returns an array of shape (len(mu), n + 1); the log-likelihood of segment
+    [s, t) under mean mu[k] is E[k, t] - E[k, s].
+    """
+    t = np.arange(len(c1), dtype=np.float64)
+    mu = np.asarray(mu, dtype=np.float64)[:, None]
+    return (-0.5 * t * np.log(2 * np.pi * sigma ** 2)
+            - (c2 - 2.0 * mu * c1 + t * mu ** 2) / (2 * sigma ** 2))
+
+
+def log_n_configurations(n, n_change_points):
+    """log C(n - 1, K): number of ways to place K distinct change points in 1..n-1."""
+    return lgamma(n) - lgamma(n_change_points + 1) - lgamma(n - n_change_points)
+
+
+def window_mask(windows, n):
+    """Boolean (K, n + 1) mask allowing change point k only in windows[k] = (lo, hi), inclusive."""
+    allowed = np.zeros((len(windows), n + 1), dtype=bool)
+    for k, (lo, hi) in enumerate(windows):
+        allowed[k, max(int(lo), 1):min(int(hi), n - 1) + 1] = True
+    return allowed
+
+
+def log_n_allowed(allowed, min_size=1):
+    """log of the number of increasing placements with change point k in allowed[k].
+
+    Every segment, including the first and last, has at least min_size
+    points; with every position allowed and min_size=1 this is
+    log_n_configurations.
+    """
+    n_change_points, size = allowed.shape
+    n = size - 1
+    ok = allowed.copy()
+    ok[:, :min_size] = False
+    ok[:, n - min_size + 1:] = False
+    log_count = np.where(ok[0], 0.0, -np.inf)
+    for k in range(1, n_change_points):
+        running = np.logaddexp.accumulate(log_count)
+        previous = np.full(size, -np.inf)
+        previous[min_size:] = running[:-min_size]
+        log_count = np.where(ok[k], previous, -np.inf)
+    return float(np.logaddexp.reduce(log_count))
+
+
+def changepoint_forward(E, allowed=None):
+    """Forward log-weights over change point positions.
+
+    E is the cumulative log-likelihood table from prefix_normal_loglik for
+    K+1 segment means. F[k, t] is the log of the summed likelihood of x[:t]
+    over all placements of the first k+1 change points with change point k at
+    t. Change points are distinct and lie in 1..n-1 (every segment is
+    non-empty); an optional window_mask restricts them further.
+    """
+    n_segments, size = E.shape
+    n = size - 1
+    valid = np.zeros(size, dtype=bool)
+    valid[1:n] = True
+    F = np.full((n_segments - 1, size), -np.inf)
+    F[0, valid] = E[0, valid]
+    for k in range(1, n_segments - 1):
+        if allowed is not None:
+            F[k - 1, ~allowed[k - 1]] = -np.inf
+        running = np.logaddexp.accumulate(F[k - 1] - E[k])
+        F[k, 2:n] = E[k, 2:n] + running[1:n - 1]
+    if allowed is not None:
+        F[-1, ~allowed[-1]] = -np.inf
+    return F
+
+
+def changepoint_log_evidence(E, F=None):
+    """log of the likelihood summed over all change point placements."""
+    if F is None:
+        F = changepoint_forward(E)
+    n = E.shape[1] - 1
+    return float(np.logaddexp.reduce(F[-1] + E[-1, n] - E[-1]))
+
+
+def _sample_log_weights(log_w, rng):
+    p = np.exp(log_w - log_w.max())
+    cdf = np.cumsum(p)
+    return int(np.searchsorted(cdf, rng.random() * cdf[-1], side='right'))
+
+
+def sample_change_points(E, rng, F=None):
+    """Draw one sorted change point vector from p(tau | mu, sigma, x).
+
+    Backward sampling through the forward table: the last change point is
+    drawn from its marginal, then each earlier one given the next.
+    """
+    if F is None:
+        F = changepoint_forward(E)
+    n_cp = F.shape[0]
+    n = E.shape[1] - 1
+    tau = np.empty(n_cp, dtype=np.int64)
+    t = _sample_log_weights(F[-1] + E[-1, n] - E[-1], rng)
+    tau[-1] = t
+    for k in range(n_cp - 1, 0, -1):
+        t = _sample_log_weights(F[k - 1, :t] - E[k, :t], rng)
+        tau[k - 1] = t
+    return tau
@@ -0,0 +1,94 @@
+# Warm-started refits
+#
+# Appending a day of prices barely moves the posterior, so a refit can start
+# where the previous fit ended instead of from the prior: every chain starts
+# at the previous tau modes, mu means and sigma means, and NUTS starts from
+# the previously adapted step size with a diagonal mass matrix set to the
+# previous posterior variances of mu and log(sigma) - what a full warmup
+# would estimate again, centred on the previous posterior means. A short
+# tuning phase then only fine-tunes both.
+#
+# The warm NUTS step uses PyMC>=4 internals (QuadPotentialDiagAdapt on the
+# model's value variables). Under PyMC3 warm_step_factory returns None and
+# NUTS adapts from a cold start; the chains still start at the previous
+# posterior.
+
+from functools import partial
+
+import numpy as np
+
+from .artifact_cache import array_digest
+
+WARM_TUNE = 100
+# How many draws the previous mass matrix estimate is worth during re-tuning
+PRIOR_MASS_WEIGHT = 50
+
+
+def warm_start_id(warm_start):
+    """Stable identifier of a warm start (a PosteriorCache key or an InferenceData)."""
+    if isinstance(warm_start, str):
+        return warm_start
+    posterior = warm_start.posterior
+    return array_digest(*(posterior[name].values for name in ('tau_sorted', 'mu', 'sigma')
+                          if name in posterior))
+
+
+def _column_modes(values):
+    return np.array([np.bincount(column).argmax() for column in values.T])
+
+
+def warm_start_point(trace, variant, n_obs, windows=None):
+    """Starting point for a refit of variant on n_obs returns from a previous posterior.
+
+    With windows (see build_multi_cp_model) the tau modes are moved into them.
+    """
+    posterior = trace.posterior
+    point = {'mu': posterior['mu'].mean(('chain', 'draw')).values,
+             'sigma': posterior['sigma'].mean(('chain', 'draw')).values}
+    if variant == 'discrete':
+        tau = posterior['tau_sorted'].values.reshape(-1, posterior['tau_sorted'].shape[-1])
+        point['tau'] = np.minimum(np.sort(_column_modes(tau.astype(np.int64))), n_obs - 1)
+        if windows is not None:
+            point['tau'] = np.clip(point['tau'], [lo for lo, _ in windows], [hi for _, hi in windows])
+    return point
+
+
+def adapted_step_size(trace):
+    """Median over chains of the NUTS step size used after tuning, or None."""
+    sample_stats = getattr(trace, 'sample_stats', None)
+    if sample_stats is None or 'step_size' not in sample_stats:
+        return None
+    per_chain = sample_stats['step_size'].median('draw').values
+    per_chain = per_chain[np.isfinite(per_chain)]
+    return float(np.median(per_chain)) if per_chain.size else None
+
+
+def _build_nuts(step_size, means, variances, compile_kwargs, model):
+    from pymc.step_methods.hmc.quadpotential import QuadPotentialDiagAdapt
+
+    from .cp_models import pm
+
+    value_vars = [model.rvs_to_values[model[name]] for name in variances]
+    mean = np.concatenate([np.ravel(means[name]) for name in variances])
+    diag = np.concatenate([np.ravel(variances[name]) for name in variances])
+    potential = QuadPotentialDiagAdapt(len(diag), mean, diag, PRIOR_MASS_WEIGHT)
+    step_kwargs = {} if step_size is None else {'step_scale': step_size * len(diag) ** 0.25}
+    return pm.NUTS(vars=value_vars, potential=potential, **step_kwargs, **compile_kwargs)
+
+
+def warm_step_factory(trace, compile_kwargs=None):
+    """Picklable callable building, inside a model, NUTS for mu and sigma adapted as in trace.
+
+    Returns None under PyMC3, where the default (cold) NUTS step is used.
+    """
+    try:
+        import pymc.step_methods.hmc.quadpotential  # noqa: F401
+    except ImportError:
+        return None
+    posterior = trace.posterior
+    # NUTS moves in the unconstrained space, where sigma is log(sigma)
+    unconstrained = {'mu': posterior['mu'], 'sigma': np.log(posterior['sigma'])}
+    means = {name: v.mean(('chain', 'draw')).values for name, v in unconstrained.items()}
+    variances = {name: np.maximum(v.var(('chain', 'draw')).values, 1e-12)
+                 for name, v in unconstrained.items()}
+    return partial(_build_nuts, adapted_step_size(trace), means, variances, compile_kwargs or {})
@@ -0,0 +1,41 @@
+import json
+
+import numpy as np
+import pytest
+
+pytest.importorskip('pymc')
+pytest.importorskip('arviz')
+
+from scripts.adaptive_sampling import sample_until_converged
+from scripts.parallel_sampling import model_factory
+
+BATCH = 40
+
+
+@pytest.fixture(scope='module')
+def factory():
+    rng = np.random.default_rng(0)
+    returns = np.concatenate([rng.normal(0, 0.01, 30), rng.normal(0.02, 0.03, 30)])
+    return model_factory('marginal', returns, 1)
+
+
+def _sample(factory, targets, max_draws):
+    return sample_until_converged(factory, ('mu', 'sigma'), tune=100, batch_draws=BATCH, max_draws=max_draws,
+                                  retune=20, chains=2, cores=1, random_seed=1, targets=targets)
+
+
+def test_stops_after_the_batch_that_meets_the_targets(factory):
+    trace = _sample(factory, {'r_hat': 10.0, 'ess_bulk': 1, 'ess_tail': 1}, max_draws=4 * BATCH)
+    assert trace.posterior.sizes['draw'] == BATCH
+    assert trace.posterior.attrs['converged'] == 1
+    assert len(json.loads(trace.posterior.attrs['convergence'])) == 1
+
+
+def test_unmet_targets_run_to_max_draws_and_warn(factory):
+    with pytest.warns(UserWarning, match='without reaching'):
+        trace = _sample(factory, {'ess_bulk': 1e9}, max_draws=3 * BATCH)
+    assert trace.posterior.sizes['draw'] == 3 * BATCH
+    np.testing.assert_array_equal(trace.posterior['draw'].values, np.arange(3 * BATCH))
+    assert trace.posterior.attrs['converged'] == 0
+    history = json.loads(trace.posterior.attrs['convergence'])
+    assert [report['draws'] for report in history] == [BATCH, 2 * BATCH, 3 * BATCH]
@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+
+from scripts import artifact_cache
+from scripts.artifact_cache import ArtifactCache, stage_key
+
+
+def test_key_changes_with_dependencies_parameters_and_version(monkeypatch):
+    key = stage_key('eda_plots', 'upstream', window=30)
+    assert key == stage_key('eda_plots', 'upstream', window=30)
+    assert key != stage_key('eda_plots', 'upstream', window=20)
+    assert key != stage_key('eda_plots', 'changed upstream', window=30)
+    assert key != stage_key('change_point_plot', 'upstream', window=30)
+    monkeypatch.setitem(artifact_cache.STAGE_VERSIONS, 'eda_plots', 99)
+    assert key != stage_key('eda_plots', 'upstream', window=30)
+
+
+class _Stage:
+    def __init__(self, out_dir, text='result'):
+        self.out_dir, self.text, self.calls = out_dir, text, 0
+
+    def __call__(self):
+        self.calls += 1
+        (self.out_dir / 'out.txt').write_text(self.text)
+        return {'text': self.text}
+
+
+def test_hit_restores_outputs_and_value_without_recomputing(tmp_path):
+    cache = ArtifactCache(tmp_path / 'cache')
+    out_dir = tmp_path / 'out'
+    out_dir.mkdir()
+    stage = _Stage(out_dir)
+    key = stage_key('stage', param=1)
+    assert cache.run('stage', key, stage, outputs=['out.txt'], out_dir=out_dir) == {'text': 'result'}
+    os.remove(out_dir / 'out.txt')
+    assert cache.run('stage', key, stage, outputs=['out.txt'], out_dir=out_dir) == {'text': 'result'}
+    assert stage.calls == 1
+    assert (out_dir / 'out.txt').read_text() == 'result'
+    assert (cache.misses, cache.hits) == (['stage'], ['stage'])
+    # A new parameter is a new entry
+    cache.run('stage', stage_key('stage', param=2), stage, outputs=['out.txt'], out_dir=out_dir)
+    assert stage.calls == 2
+
+
+def test_load_reads_the_value_from_restored_outputs(tmp_path):
+    cache = ArtifactCache(tmp_path / 'cache')
+    stage = _Stage(tmp_path, 'from file')
+    load = lambda: (tmp_path / 'out.txt').read_text()
+    cache.run('stage', 'k' * 64, stage, outputs=['out.txt'], out_dir=tmp_path, load=load)
+    (tmp_path / 'out.txt').write_text('overwritten')
+    assert cache.run('stage', 'k' * 64, stage, outputs=['out.txt'], out_dir=tmp_path, load=load) == 'from file'
+    assert not os.path.exists(os.path.join(cache._entry_dir('k' * 64), artifact_cache.VALUE_FILE))
+
+
+def test_disabled_cache_always_computes(tmp_path):
+    cache = ArtifactCache(tmp_path / 'cache', enabled=False)
+    stage = _Stage(tmp_path)
+    for _ in range(2):
+        cache.run('stage', 'k' * 64, stage, outputs=['out.txt'], out_dir=tmp_path)
+    assert stage.calls == 2
+    assert not os.path.exists(tmp_path / 'cache')
+
+
+def test_eviction_keeps_the_newest_entry_within_max_bytes(tmp_path):
+    cache = ArtifactCache(tmp_path / 'cache', max_bytes=1500)
+    for i in range(3):
+        cache.run('stage', f'{i}' * 64, _Stage(tmp_path, 'x' * 1000), outputs=['out.txt'], out_dir=tmp_path,
+                  store_value=False)
+    assert [key for _, _, key in cache.entries()] == ['2' * 64]
+
+
+def test_model_version_is_part_of_the_posterior_key(monkeypatch):
+    from scripts import brent_oil_change_point_model as pipeline
+    log_returns = np.linspace(-0.01, 0.01, 50)
+    key = pipeline.model_posterior_key(log_returns, 2, 'conjugate_dp', random_seed=0)
+    monkeypatch.setitem(pipeline.MODEL_VERSIONS, 'conjugate_dp', pipeline.MODEL_VERSIONS['conjugate_dp'] + 1)
+    assert pipeline.model_posterior_key(log_returns, 2, 'conjugate_dp', random_seed=0) != key
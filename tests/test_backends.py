@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('pymc')
+az = pytest.importorskip('arviz')
+
+from scripts import backends, parallel_sampling
+from scripts.brent_oil_change_point_model import fit_model
+
+
+@pytest.fixture
+def broken_c(monkeypatch):
+    # A C compiler is configured, but compiling with it fails
+    original = backends._probe_function
+
+    def probe(mode):
+        if mode == 'C':
+            raise RuntimeError('cc1plus: not found')
+        return original(mode)
+    monkeypatch.setattr(backends, '_probe_function', probe)
+    backends.backend_works.cache_clear()
+    yield
+    backends.backend_works.cache_clear()
+
+
+def test_python_backend_always_works():
+    assert backends.backend_works('python')
+    assert backends.available_backends()[-1] == 'python'
+
+
+def test_failed_probe_removes_a_backend(broken_c):
+    assert 'c' not in backends.available_backends()
+    with pytest.warns(UserWarning, match="'c' is not available"):
+        assert backends.select_backend('c', 'discrete') == backends.next_backend('discrete')
+
+
+def test_discrete_model_never_gets_a_jax_backend():
+    assert not set(backends.JAX_BACKENDS) & set(backends._candidates('discrete'))
+
+
+def test_next_backend_skips_excluded():
+    ranking = [name for name in backends.BACKENDS if name in backends.available_backends()]
+    assert backends.next_backend('marginal', exclude=ranking[:-1]) == ranking[-1]
+    assert backends.next_backend('marginal', exclude=ranking) is None
+
+
+def test_fit_model_falls_back_when_sampling_fails(monkeypatch):
+    used = []
+
+    def sample_parallel(factory, draws, tune, chains, cores, random_seed, backend, **kwargs):
+        used.append(backend)
+        if len(used) == 1:
+            raise RuntimeError('compilation failed')
+        return az.from_dict(posterior={'tau_sorted': np.zeros((chains, draws, 1))})
+    monkeypatch.setattr(parallel_sampling, 'sample_parallel', sample_parallel)
+    with pytest.warns(UserWarning, match='retrying'):
+        trace, _ = fit_model(np.zeros(20), 1, 'discrete', draws=5, tune=0, chains=1)
+    assert used == [backends.next_backend('discrete'), backends.next_backend('discrete', exclude=used[:1])]
+    assert trace.posterior.attrs['sampling_backend'] == used[1]
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from scripts.benchmark import hausdorff, map_run_onsets, run_benchmark, synthetic_series
+
+
+def test_hausdorff_is_the_worst_match_in_either_direction():
+    assert hausdorff([100, 200], [100, 200]) == 0
+    assert hausdorff([95, 210], [100, 200]) == 10
+    # A spurious detection far from every true break dominates
+    assert hausdorff([100, 200, 500], [100, 200]) == 300
+    # So does a missed break
+    assert hausdorff([100], [100, 200]) == 100
+    assert hausdorff([200, 100], [100, 200]) == 0
+    assert hausdorff([], []) == 0
+    assert hausdorff([], [100]) == np.inf
+    assert hausdorff([100], []) == np.inf
+
+
+@pytest.mark.parametrize('kind', ['mean', 'meanvar'])
+def test_synthetic_breaks_are_spaced_and_reproducible(kind):
+    x, breaks = synthetic_series(2000, 3, random_seed=1, kind=kind)
+    assert len(x) == 2000 and len(breaks) == 3
+    assert np.diff(np.concatenate([[0], breaks, [2000]])).min() >= 2000 // 16
+    again, _ = synthetic_series(2000, 3, random_seed=1, kind=kind)
+    np.testing.assert_array_equal(x, again)
+    with pytest.raises(ValueError, match='kind'):
+        synthetic_series(100, kind='variance')
+
+
+def test_map_run_onsets_walks_back_through_segments():
+    # Runs starting at 0, 4 and 7; the run after return t has length r_t
+    map_run_lengths = [0, 1, 2, 3, 0, 1, 2, 0, 1, 2]
+    assert map_run_onsets(map_run_lengths) == [4, 7]
+    assert map_run_onsets(np.arange(10)) == []
+
+
+def test_benchmark_rows_per_engine_and_size():
+    results = run_benchmark(sizes=(1200, 20000), engines=['pelt_mean', 'conjugate_dp', 'bocpd'], trace_memory=False)
+    # conjugate_dp is skipped above its max_n
+    assert list(zip(results['engine'], results['n'])) == [
+        ('pelt_mean', 1200), ('conjugate_dp', 1200), ('bocpd', 1200), ('pelt_mean', 20000), ('bocpd', 20000)]
+    assert list(results['breaks']) == ['mean', 'meanvar', 'meanvar', 'mean', 'meanvar']
+    # Given the number of breaks, the exact posterior lands next to them
+    assert results.loc[1, 'hausdorff'] <= 20
+    assert (results['n_detected'] > 0).all()
+    assert results['ess_per_s'].isna().all()
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from scipy import stats
+from scipy.special import logsumexp
+
+from scripts.bocpd import OnlineChangePointDetector
+from scripts.conjugate_dp import DEFAULT_PRIOR
+
+HAZARD = 1 / 20
+
+
+def _adams_mackay(x, hazard, prior):
+    # Textbook recursion over every run length, with the Student-t predictive
+    # of each run recomputed from the returns it contains. As in the detector,
+    # run length k holds the last k + 1 returns and the stream starts a run.
+    m0, kappa0, alpha0, beta0 = (prior[k] for k in ('m0', 'kappa0', 'alpha0', 'beta0'))
+
+    def predictive(value, run):
+        n = len(run)
+        kappa, alpha = kappa0 + n, alpha0 + n / 2
+        mean, beta = m0, beta0
+        if n:
+            mean = (kappa0 * m0 + run.sum()) / kappa
+            beta += 0.5 * ((run - run.mean()) ** 2).sum() + kappa0 * n * (run.mean() - m0) ** 2 / (2 * kappa)
+        return stats.t.logpdf(value, 2 * alpha, mean, np.sqrt(beta * (kappa + 1) / (alpha * kappa)))
+
+    log_post = np.empty(0)
+    posteriors = []
+    for t, value in enumerate(x):
+        growth = log_post + np.log1p(-hazard) + np.array(
+            [predictive(value, x[t - k - 1:t]) for k in range(len(log_post))])
+        change = np.log(hazard) + predictive(value, x[:0])
+        log_joint = np.concatenate([[change], growth])
+        log_post = log_joint - logsumexp(log_joint)
+        posteriors.append(np.exp(log_post))
+    return posteriors
+
+
+def test_run_length_posterior_matches_direct_recursion():
+    rng = np.random.default_rng(3)
+    x = np.concatenate([rng.normal(0, 0.01, 15), rng.normal(0.02, 0.04, 10)])
+    expected = _adams_mackay(x, HAZARD, DEFAULT_PRIOR)
+    detector = OnlineChangePointDetector(hazard=HAZARD, tail_mass=1e-300, max_run_lengths=100)
+    for value, posterior in zip(x, expected):
+        detector.update(value)
+        found = np.zeros(len(posterior))
+        found[detector.run_lengths] = np.exp(detector.log_probs)
+        np.testing.assert_allclose(found, posterior, rtol=1e-9)
+
+
+def test_memory_is_bounded_by_max_run_lengths():
+    detector = OnlineChangePointDetector(max_run_lengths=40, tail_mass=1e-300)
+    sizes = []
+    for value in np.random.default_rng(0).normal(0, 0.01, 3000):
+        detector.update(value)
+        sizes.append(len(detector.run_lengths))
+    assert max(sizes) == 40
+    state = [detector.run_lengths, detector.log_probs, detector.mu, detector.beta]
+    assert all(len(array) == 40 for array in state)
+    assert np.exp(detector.log_probs).sum() == pytest.approx(1)
+    # The run that started with the stream is kept whatever its length
+    assert detector.map_run_length == 2999
+
+
+def test_alerts_once_on_a_volatility_jump():
+    rng = np.random.default_rng(5)
+    x = np.concatenate([rng.normal(0, 0.01, 600), rng.normal(0, 0.04, 200)])
+    detector = OnlineChangePointDetector.from_history(x)
+    assert len(detector.alerts) == 1
+    assert 600 + detector.min_run <= detector.alerts[0] <= 600 + 30
+
+
+def test_single_large_returns_do_not_alert():
+    x = np.random.default_rng(2).normal(0, 0.01, 1500)
+    x[[300, 700, 701, 1100]] = [0.04, -0.035, 0.03, 0.045]
+    assert OnlineChangePointDetector.from_history(x).alerts == []
+
+
+def test_alert_window_must_cover_min_run():
+    with pytest.raises(ValueError, match='min_run'):
+        OnlineChangePointDetector(alert_lag=0)
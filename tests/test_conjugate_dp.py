@@ -0,0 +1,75 @@
+import itertools
+
+import numpy as np
+import pytest
+from scipy.special import logsumexp
+
+from scripts.conjugate_dp import DEFAULT_PRIOR, evidence_by_k, fit_conjugate_dp, nig_segment_logml
+
+
+def _segmentations(n, n_change_points, min_size, windows=None):
+    for tau in itertools.combinations(range(1, n), n_change_points):
+        bounds = (0,) + tau + (n,)
+        if min(np.diff(bounds)) < min_size:
+            continue
+        if windows is not None and not all(lo <= t <= hi for t, (lo, hi) in zip(tau, windows)):
+            continue
+        yield tau
+
+
+def _log_ml(x, tau):
+    bounds = (0,) + tau + (len(x),)
+    return sum(float(nig_segment_logml(stop - start, x[start:stop].sum(), (x[start:stop] ** 2).sum(),
+                                       **DEFAULT_PRIOR))
+               for start, stop in zip(bounds[:-1], bounds[1:]))
+
+
+def _enumerate(x, n_change_points, min_size=2, windows=None):
+    taus = list(_segmentations(len(x), n_change_points, min_size, windows))
+    log_ml = np.array([_log_ml(x, tau) for tau in taus])
+    return taus, log_ml, logsumexp(log_ml) - np.log(len(taus))
+
+
+@pytest.fixture
+def returns():
+    rng = np.random.default_rng(3)
+    return np.concatenate([rng.normal(0.0, 0.01, 6), rng.normal(0.02, 0.03, 5), rng.normal(-0.01, 0.01, 5)])
+
+
+@pytest.mark.parametrize('n_change_points', [1, 2, 3])
+def test_log_evidence_matches_enumeration(returns, n_change_points):
+    _, _, expected = _enumerate(returns, n_change_points)
+    _, evidence = fit_conjugate_dp(returns, n_change_points, draws=1, random_seed=0)
+    assert evidence == pytest.approx(expected, rel=1e-10)
+
+
+def test_evidence_by_k_matches_single_fits(returns):
+    evidence, _, _ = evidence_by_k(returns, 3)
+    assert evidence[0] == pytest.approx(_log_ml(returns, ()), rel=1e-10)
+    for k in range(1, 4):
+        assert evidence[k] == pytest.approx(fit_conjugate_dp(returns, k, draws=1)[1], rel=1e-10)
+
+
+def test_windowed_evidence_matches_enumeration(returns):
+    windows = [(2, 7), (8, 13)]
+    _, _, expected = _enumerate(returns, 2, windows=windows)
+    _, evidence = fit_conjugate_dp(returns, 2, draws=1, windows=windows)
+    assert evidence == pytest.approx(expected, rel=1e-10)
+
+
+def test_draws_follow_enumerated_posterior(returns):
+    taus, log_ml, _ = _enumerate(returns, 2)
+    exact = np.exp(log_ml - logsumexp(log_ml))
+    posterior, _ = fit_conjugate_dp(returns, 2, draws=20000, random_seed=1)
+    draws = posterior['tau_sorted'][0]
+    index = {tau: i for i, tau in enumerate(taus)}
+    counts = np.bincount([index[tuple(int(t) for t in row)] for row in draws], minlength=len(taus))
+    assert 0.5 * np.abs(counts / len(draws) - exact).sum() < 0.02
+
+
+def test_posterior_layout(returns):
+    posterior, _ = fit_conjugate_dp(returns, 2, draws=50, random_seed=0)
+    assert posterior['tau_sorted'].shape == (1, 50, 2)
+    assert posterior['mu'].shape == posterior['sigma'].shape == (1, 50, 3)
+    assert (np.diff(posterior['tau_sorted'], axis=-1) >= 2).all()
+    assert (posterior['sigma'] > 0).all()
@@ -0,0 +1,75 @@
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+pytest.importorskip('pymc')
+az = pytest.importorskip('arviz')
+from scipy.special import logsumexp
+
+from scripts.cp_models import build_marginal_cp_model, build_multi_cp_model, sample_tau_posterior
+from scripts.segment_stats import cumulative_sums, segment_normal_logp
+
+N_OBS = 9
+MU = np.array([-0.5, 0.8, 0.1])
+SIGMA = 0.7
+WINDOWS = [(2, 5), (4, 7)]
+
+
+@pytest.fixture
+def returns():
+    return np.array([-0.9, -0.2, -0.6, 1.1, 0.4, 0.9, 0.3, -0.1, 0.2])
+
+
+def _placements(n, windows=None):
+    # Every increasing placement of len(MU) - 1 change points in 1..n-1
+    placements = combinations(range(1, n), len(MU) - 1)
+    if windows is not None:
+        placements = (tau for tau in placements if all(lo <= t <= hi for t, (lo, hi) in zip(tau, windows)))
+    return [np.array(tau) for tau in placements]
+
+
+def _loglik(returns, placements):
+    c1, c2 = cumulative_sums(returns)
+    return np.array([segment_normal_logp(c1, c2, tau, MU, SIGMA) for tau in placements])
+
+
+def _potential(model, **point):
+    # The Potential term alone, at the given values of the free variables
+    likelihood, = model.replace_rvs_by_values([model['likelihood']])
+    f = model.compile_fn(likelihood, inputs=model.value_vars, point_fn=True)
+    return float(f({'mu': MU, 'sigma_log__': np.log(SIGMA), **point}))
+
+
+@pytest.mark.parametrize('windows', [None, WINDOWS])
+def test_marginal_likelihood_matches_enumeration(returns, windows):
+    placements = _placements(N_OBS, windows)
+    # Uniform prior over the allowed placements
+    expected = logsumexp(_loglik(returns, placements)) - np.log(len(placements))
+    model = build_marginal_cp_model(returns, len(MU) - 1, windows)
+    assert _potential(model) == pytest.approx(expected, rel=1e-10)
+
+
+def test_discrete_likelihood_matches_segment_logp(returns):
+    tau = np.array([6, 3])  # unsorted on purpose
+    value = _potential(build_multi_cp_model(returns, len(MU) - 1), tau=tau)
+    assert value == pytest.approx(_loglik(returns, [np.sort(tau)])[0], rel=1e-12)
+
+
+@pytest.mark.parametrize('windows', [None, WINDOWS])
+def test_backward_sampled_tau_matches_exact_posterior(returns, windows):
+    draws = 20000
+    trace = az.from_dict(posterior={'mu': np.broadcast_to(MU, (1, draws, len(MU))).copy(),
+                                    'sigma': np.full((1, draws), SIGMA)})
+    sample_tau_posterior(trace, returns, len(MU) - 1, random_seed=0, windows=windows)
+    tau = trace.posterior['tau_sorted'].values.reshape(draws, -1)
+
+    placements = _placements(N_OBS, windows)
+    loglik = _loglik(returns, placements)
+    exact = np.exp(loglik - logsumexp(loglik))
+    index = {tuple(p): i for i, p in enumerate(placements)}
+    counts = np.zeros(len(placements))
+    for row in map(tuple, tau):
+        counts[index[row]] += 1  # KeyError: a placement outside the support
+    # Within five standard errors for every placement
+    assert np.all(np.abs(counts / draws - exact) <= 5 * np.sqrt(exact * (1 - exact) / draws) + 1e-9)
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from scripts.eda_stats import eda_statistics, merge_moments
+
+
+@pytest.fixture
+def prices():
+    rng = np.random.default_rng(0)
+    return 60 * np.exp(np.cumsum(rng.normal(0, 0.025, 1500)))
+
+
+@pytest.mark.parametrize('chunk_size', [13, 100, 10000])
+def test_table_matches_pandas(prices, chunk_size):
+    dates = pd.bdate_range('2010-01-01', periods=len(prices))
+    table, _ = eda_statistics(prices, windows=(5, 120), lambdas=(0.94,), dates=dates, chunk_size=chunk_size)
+    series = pd.Series(prices)
+    log_returns = np.log(series).diff().iloc[1:].reset_index(drop=True)
+    assert (table['date'] == dates[1:]).all()
+    np.testing.assert_allclose(table['log_return'], log_returns, rtol=1e-12)
+    for w in (5, 120):
+        rolling = log_returns.rolling(w)
+        np.testing.assert_allclose(table[f'mean_{w}'], rolling.mean(), rtol=1e-9, atol=1e-12)
+        np.testing.assert_allclose(table[f'std_{w}'], rolling.std(), rtol=1e-8)
+        np.testing.assert_allclose(table[f'skew_{w}'], rolling.skew(), rtol=1e-6, atol=1e-8)
+    running_max = series.cummax().iloc[1:].to_numpy()
+    np.testing.assert_allclose(table['running_max'], running_max)
+    np.testing.assert_allclose(table['running_min'], series.cummin().iloc[1:])
+    np.testing.assert_allclose(table['drawdown'], prices[1:] / running_max - 1)
+
+
+@pytest.mark.parametrize('chunk_size', [13, 10000])
+def test_summary_matches_scipy(prices, chunk_size):
+    _, summary = eda_statistics(prices, windows=(5,), chunk_size=chunk_size)
+    log_returns = np.diff(np.log(prices))
+    assert summary['count'] == len(log_returns)
+    assert summary['mean'] == pytest.approx(log_returns.mean(), rel=1e-12)
+    assert summary['std'] == pytest.approx(log_returns.std(ddof=1), rel=1e-12)
+    assert summary['skew'] == pytest.approx(stats.skew(log_returns), rel=1e-9)
+    assert summary['kurtosis'] == pytest.approx(stats.kurtosis(log_returns), rel=1e-9)
+    assert summary['max_drawdown'] == pytest.approx((prices / np.maximum.accumulate(prices) - 1)[1:].min())
+
+
+def test_merged_moments_equal_pooled_moments():
+    rng = np.random.default_rng(1)
+    a, b = rng.normal(0, 1, 37), rng.normal(3, 2, 11)
+
+    def moments(x):
+        d = x - x.mean()
+        return len(x), x.mean(), (d ** 2).sum(), (d ** 3).sum(), (d ** 4).sum()
+    np.testing.assert_allclose(merge_moments(moments(a), moments(b)), moments(np.concatenate([a, b])),
+                               rtol=1e-10)
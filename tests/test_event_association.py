@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.event_association import associate_events, event_break_probabilities
+from scripts.event_catalog import EventCatalog
+
+
+@pytest.fixture
+def dates():
+    return pd.bdate_range('2020-01-01', periods=300)
+
+
+@pytest.fixture
+def events():
+    return pd.DataFrame({'Event_Date': ['2020-02-03', '2020-02-06', '2020-05-15', '2020-09-01', '2021-01-04'],
+                         'Event_Description': ['a', 'b', 'c', 'd', 'e'],
+                         'Event_Type': ['OPEC Policy', 'Conflict', 'Economic', 'Conflict', 'Economic']})
+
+
+def test_probabilities_match_direct_count(dates, events):
+    rng = np.random.default_rng(0)
+    tau = np.sort(rng.choice([20, 22, 24, 25, 95, 100, 170, 175, 250], size=(2, 400, 3)), axis=-1)
+    window = pd.Timedelta(days=5)
+    result = event_break_probabilities(tau, dates, events, window)
+
+    event_dates = pd.to_datetime(result['Event_Date'])
+    change_dates = dates.values[tau.reshape(-1, 3) + 1]
+    near = np.abs((change_dates[:, :, None] - event_dates.values[None, None, :])
+                  / np.timedelta64(1, 'D')) <= window.days
+    np.testing.assert_allclose(result['probability'], near.any(axis=1).mean(axis=0))
+    for k in range(3):
+        np.testing.assert_allclose(result[f'probability_cp{k + 1}'], near[:, k].mean(axis=0))
+
+
+def test_catalog_and_frame_agree(dates, events):
+    tau = np.array([[[22, 100]]])
+    pd.testing.assert_frame_equal(event_break_probabilities(tau, dates, events),
+                                  event_break_probabilities(tau, dates, EventCatalog.from_frame(events)))
+
+
+def test_associate_events_picks_closest_within_window(events):
+    records = associate_events(pd.to_datetime(['2020-02-04', '2020-02-05', '2020-07-01']), events)
+    assert [r['Event_Description'] for r in records] == ['a', 'b', 'No event within ±7 days']
+    assert records[0] == {'Change_Point_Date': '2020-02-04', 'Event_Date': '2020-02-03',
+                          'Event_Description': 'a'}
+    assert records[2]['Event_Date'] == 'N/A'
@@ -0,0 +1,112 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts import event_catalog
+from scripts.event_catalog import EventCatalog
+
+
+@pytest.fixture
+def events():
+    rng = np.random.default_rng(0)
+    dates = pd.Timestamp('2020-01-01') + pd.to_timedelta(np.sort(rng.choice(400, 40, replace=False)), unit='D')
+    return pd.DataFrame({'Event_Date': dates[rng.permutation(40)].strftime('%Y-%m-%d'),
+                         'Event_Description': [f'event {i}' for i in range(40)],
+                         'Event_Type': rng.choice(['OPEC Policy', 'Conflict', 'Economic'], 40)})
+
+
+def _brute_force_nearest(catalog, query, event_type=None, max_days=None):
+    result = []
+    for day in query:
+        candidates = [i for i in range(len(catalog)) if event_type is None or catalog.types[i] == event_type]
+        if max_days is not None:
+            candidates = [i for i in candidates if abs(catalog.days[i] - day) <= max_days]
+        # Ties go to the earlier event
+        result.append(min(candidates, key=lambda i: (abs(catalog.days[i] - day), catalog.days[i]),
+                          default=-1))
+    return result
+
+
+@pytest.mark.parametrize('event_type', [None, 'Conflict', 'Missing'])
+@pytest.mark.parametrize('max_days', [None, 3])
+def test_nearest_matches_brute_force(events, event_type, max_days):
+    catalog = EventCatalog.from_frame(events)
+    dates = pd.date_range('2019-12-20', '2021-02-10', freq='D')
+    query = dates.values.astype('datetime64[D]').astype(np.int64)
+    expected = _brute_force_nearest(catalog, query, event_type, max_days)
+    np.testing.assert_array_equal(catalog.nearest(dates, event_type, max_days), expected)
+
+
+def test_window_matches_mask(events):
+    catalog = EventCatalog.from_frame(events)
+    frame = catalog.frame()
+    for event_type in (None, 'Economic'):
+        positions = catalog.window('2020-03-01', '2020-09-30', event_type)
+        mask = frame['Event_Date'].between('2020-03-01', '2020-09-30')
+        if event_type is not None:
+            mask &= frame['Event_Type'] == event_type
+        np.testing.assert_array_equal(positions, np.flatnonzero(mask))
+    around = catalog.around(frame['Event_Date'][5], pd.Timedelta(days=0))
+    assert around['Event_Description'].tolist() == [frame['Event_Description'][5]]
+
+
+def test_catalog_is_sorted_by_date(events):
+    frame = EventCatalog.from_frame(events).frame()
+    assert frame['Event_Date'].is_monotonic_increasing
+    pd.testing.assert_frame_equal(
+        frame, events.assign(Event_Date=pd.to_datetime(events['Event_Date']))
+        .sort_values('Event_Date', kind='stable').reset_index(drop=True), check_dtype=False)
+
+
+@pytest.mark.parametrize('later', [True, False])
+def test_append_then_reopen(events, tmp_path, later):
+    first, second = (events[:30], events[30:])
+    if later:
+        cutoff = pd.to_datetime(events['Event_Date']).sort_values().iloc[30]
+        first = events[pd.to_datetime(events['Event_Date']) < cutoff]
+        second = events[pd.to_datetime(events['Event_Date']) >= cutoff]
+    catalog = EventCatalog.from_frame(first, store_dir=tmp_path)
+    catalog.append(second)
+    reopened = EventCatalog.open(tmp_path)
+    expected = EventCatalog.from_frame(events)
+    pd.testing.assert_frame_equal(reopened.frame(), expected.frame())
+    assert reopened.digest() == catalog.digest() == expected.digest()
+    np.testing.assert_array_equal(reopened.window('2020-01-01', '2020-12-31', 'Conflict'),
+                                  expected.window('2020-01-01', '2020-12-31', 'Conflict'))
+
+
+def _crash(*args, **kwargs):
+    raise OSError('simulated crash')
+
+
+def test_append_recovers_from_a_crash_before_days_are_written(events, tmp_path, monkeypatch):
+    ordered = EventCatalog.from_frame(events).frame()
+    catalog = EventCatalog.from_frame(ordered[:20], store_dir=tmp_path)
+    with monkeypatch.context() as patch:
+        patch.setattr(event_catalog, 'append_array', _crash)
+        with pytest.raises(OSError):
+            catalog.append(ordered[20:30])
+    # The orphaned records are invisible, then replaced by the next append
+    reopened = EventCatalog.open(tmp_path)
+    pd.testing.assert_frame_equal(reopened.frame(), ordered[:20])
+    reopened.append(ordered[30:])
+    pd.testing.assert_frame_equal(EventCatalog.open(tmp_path).frame(),
+                                  pd.concat([ordered[:20], ordered[30:]], ignore_index=True))
+
+
+def test_rewrite_completes_after_a_crash_between_renames(events, tmp_path, monkeypatch):
+    ordered = EventCatalog.from_frame(events).frame()
+    catalog = EventCatalog.from_frame(ordered[20:], store_dir=tmp_path)
+    replace = os.replace
+
+    def crash_on_days(src, dst):
+        if dst.endswith(event_catalog.DAYS_FILE):
+            raise OSError('simulated crash')
+        replace(src, dst)
+    with monkeypatch.context() as patch:
+        patch.setattr(event_catalog.os, 'replace', crash_on_days)
+        with pytest.raises(OSError):
+            catalog.append(ordered[:20])  # out of order: full rewrite
+    pd.testing.assert_frame_equal(EventCatalog.open(tmp_path).frame(), ordered)
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.event_study import event_study
+
+
+@pytest.fixture
+def market():
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range('2015-01-01', periods=801)
+    returns = rng.normal(0.0003, 0.02, size=(800, 2))
+    events = pd.DataFrame({'Event_Date': ['2015-03-02', '2016-01-09', '2016-06-15', '2017-12-20', '2019-01-01'],
+                           'Event_Description': ['early', 'weekend', 'mid', 'late', 'after']})
+    return returns, dates, events
+
+
+def _per_event(returns, dates, event_date, window, estimation):
+    # Day 0: the first return ending on or after the event date
+    day0 = next((t for t, end in enumerate(dates[1:]) if end >= pd.Timestamp(event_date)), len(returns))
+    lo, hi = day0 + estimation[0], day0 + estimation[1]
+    start, stop = day0 - window, day0 + window + 1
+    if lo < 0 or start < 0 or stop > len(returns) or hi > len(returns):
+        return np.full(returns.shape[1], np.nan), np.full(returns.shape[1], np.nan)
+    estimation_returns = returns[lo:hi]
+    car = returns[start:stop].sum(axis=0)
+    abnormal = car - estimation_returns.mean(axis=0) * (2 * window + 1)
+    t_stat = abnormal / (estimation_returns.std(axis=0, ddof=1) * np.sqrt(2 * window + 1))
+    return abnormal, t_stat
+
+
+def test_matches_per_event_loop(market):
+    returns, dates, events = market
+    windows, estimation = (1, 5, 20), (-250, -20)
+    study = event_study(returns, dates, events, windows, estimation, instruments=['brent', 'wti'])
+    assert len(study) == len(events) * len(windows) * 2
+    for (description, window), rows in study.groupby(['Event_Description', 'window'], sort=False):
+        event_date = events.set_index('Event_Description').loc[description, 'Event_Date']
+        abnormal, t_stat = _per_event(returns, dates, event_date, window, estimation)
+        assert rows['instrument'].tolist() == ['brent', 'wti']
+        np.testing.assert_allclose(rows['abnormal'], abnormal, rtol=1e-9, atol=1e-12)
+        np.testing.assert_allclose(rows['t_stat'], t_stat, rtol=1e-9)
+        np.testing.assert_allclose(rows['abnormal_pct'], np.expm1(abnormal) * 100, rtol=1e-9)
+
+
+def test_windows_off_the_series_are_nan(market):
+    returns, dates, events = market
+    study = event_study(returns[:, 0], dates, events).set_index('Event_Description')
+    # Before the estimation window is complete only the abnormal return is undefined
+    assert study.loc['early', 'car'].notna().all() and study.loc['early', 'abnormal'].isna().all()
+    assert study.loc['after', ['car', 'abnormal']].isna().all().all()
+    assert study.loc['mid', ['car', 'abnormal', 't_stat']].notna().all().all()
@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts import ingest
+from scripts.ingest import DOWNSTREAM_ARTIFACTS, ingest_prices, mark_fresh, stale_artifacts
+from scripts.price_store import (append_array, from_epoch_days, open_price_store, truncate_array,
+                                 write_price_store)
+
+
+def _rows(start, count, price=50.0):
+    dates = pd.bdate_range(start, periods=count)
+    prices = price * np.exp(np.cumsum(np.random.default_rng(count).normal(0, 0.02, count)))
+    return [f'{d:%d-%b-%y},{p:.4f}' for d, p in zip(dates, prices)]
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'prices.csv'
+    path.write_text('\n'.join(['Date,Price'] + _rows('2020-01-01', 60)) + '\n')
+    return path
+
+
+def _expected(csv_path, window):
+    df = pd.read_csv(csv_path)
+    prices = df['Price'].to_numpy()
+    log_returns = np.diff(np.log(prices))
+    return prices, log_returns, pd.Series(log_returns).rolling(window).std().to_numpy()
+
+
+def _check(result, csv_path, window):
+    prices, log_returns, rolling_std = _expected(csv_path, window)
+    np.testing.assert_allclose(result['prices'], prices)
+    np.testing.assert_allclose(result['log_returns'], log_returns, rtol=1e-12)
+    np.testing.assert_allclose(result['rolling_std'], rolling_std, rtol=1e-9)
+    reopened_days, reopened_prices = open_price_store(result['state_dir'])
+    np.testing.assert_array_equal(reopened_prices, result['prices'])
+    assert (from_epoch_days(reopened_days) == pd.to_datetime(pd.read_csv(csv_path)['Date'],
+                                                            format='%d-%b-%y')).all()
+
+
+def test_append_then_reload_matches_full_ingest(csv_path, tmp_path):
+    state_dir = tmp_path / 'state'
+    assert ingest_prices(csv_path, state_dir, window=10)['mode'] == 'full'
+    with open(csv_path, 'a') as f:
+        f.write('\n'.join(_rows('2020-03-25', 7, 60.0)) + '\n')
+    result = ingest_prices(csv_path, state_dir, window=10)
+    assert (result['mode'], result['new_rows']) == ('append', 7)
+    _check(result, csv_path, 10)
+
+    reloaded = ingest_prices(csv_path, state_dir, window=10)
+    assert (reloaded['mode'], reloaded['new_rows']) == ('unchanged', 0)
+    _check(reloaded, csv_path, 10)
+
+
+def test_partial_last_line_waits_for_the_next_call(csv_path, tmp_path):
+    state_dir = tmp_path / 'state'
+    ingest_prices(csv_path, state_dir, window=5)
+    rows = _rows('2020-03-25', 2, 60.0)
+    with open(csv_path, 'a') as f:
+        f.write(rows[0] + '\n' + rows[1][:6])
+    assert ingest_prices(csv_path, state_dir, window=5)['new_rows'] == 1
+    with open(csv_path, 'a') as f:
+        f.write(rows[1][6:] + '\n')
+    result = ingest_prices(csv_path, state_dir, window=5)
+    assert (result['mode'], result['new_rows']) == ('append', 1)
+    _check(result, csv_path, 5)
+
+
+@pytest.mark.parametrize('append', [False, True])
+def test_rewritten_history_triggers_full_ingest(csv_path, tmp_path, append):
+    # Long enough that the edit lies more than 64 KB before the end
+    csv_path.write_text('\n'.join(['Date,Price'] + _rows('2000-01-03', 4000)) + '\n')
+    state_dir = tmp_path / 'state'
+    ingest_prices(csv_path, state_dir, window=5)
+    lines = csv_path.read_text().splitlines()
+    # Same length, so only the content changes
+    date, price = lines[3].split(',')
+    lines[3] = f'{date},{price[:-1]}{(int(price[-1]) + 1) % 10}'
+    if append:
+        lines += _rows('2016-01-04', 3, 60.0)
+    csv_path.write_text('\n'.join(lines) + '\n')
+    result = ingest_prices(csv_path, state_dir, window=5)
+    assert result['mode'] == 'full'
+    _check(result, csv_path, 5)
+
+
+def _crash(*args, **kwargs):
+    raise OSError('simulated crash')
+
+
+@pytest.mark.parametrize('crash', ['arrays', 'state'])
+def test_rerun_after_an_interrupted_append(csv_path, tmp_path, monkeypatch, crash):
+    # Crash after dates.npy and prices.npy grew, or after every array grew
+    # but before state.json was written
+    state_dir = tmp_path / 'state'
+    ingest_prices(csv_path, state_dir, window=5)
+    with open(csv_path, 'a') as f:
+        f.write('\n'.join(_rows('2020-03-25', 4, 60.0)) + '\n')
+    calls = []
+
+    def append_twice(path, values):
+        if len(calls) == 2:
+            _crash()
+        calls.append(path)
+        append_array(path, values)
+    write_json = ingest._write_json
+    with monkeypatch.context() as patch:
+        if crash == 'arrays':
+            patch.setattr(ingest, 'append_array', append_twice)
+        else:
+            patch.setattr(ingest, '_write_json', lambda path, data: (
+                _crash() if path.endswith(ingest.STATE_FILE) else write_json(path, data)))
+        with pytest.raises(OSError):
+            ingest_prices(csv_path, state_dir, window=5)
+    result = ingest_prices(csv_path, state_dir, window=5)
+    assert (result['mode'], result['new_rows']) == ('append', 4)
+    _check(result, csv_path, 5)
+
+
+def test_invalid_rows_are_rejected(csv_path, tmp_path):
+    state_dir = tmp_path / 'state'
+    ingest_prices(csv_path, state_dir, window=5)
+    with open(csv_path, 'a') as f:
+        f.write('01-Jan-20,55.0\n')
+    with pytest.raises(ValueError, match='increasing date order'):
+        ingest_prices(csv_path, state_dir, window=5)
+
+
+def test_ingest_marks_downstream_artifacts_stale(csv_path, tmp_path):
+    state_dir = tmp_path / 'state'
+    ingest_prices(csv_path, state_dir, window=5)
+    mark_fresh(state_dir, DOWNSTREAM_ARTIFACTS)
+    assert stale_artifacts(state_dir) == {}
+    with open(csv_path, 'a') as f:
+        f.write('\n'.join(_rows('2020-03-25', 2, 60.0)) + '\n')
+    ingest_prices(csv_path, state_dir, window=5)
+    assert set(stale_artifacts(state_dir)) == set(DOWNSTREAM_ARTIFACTS)
+
+
+def test_price_store_append_then_reopen(tmp_path):
+    dates = pd.bdate_range('2020-01-01', periods=5)
+    write_price_store(tmp_path, dates.values, np.arange(5.0))
+    more = pd.bdate_range('2020-01-08', periods=3)
+    append_array(tmp_path / 'dates.npy', more.values.astype('datetime64[D]').astype(np.int64))
+    append_array(tmp_path / 'prices.npy', [5.0, 6.0, 7.0])
+    days, prices = open_price_store(tmp_path)
+    assert isinstance(prices, np.memmap)
+    np.testing.assert_array_equal(prices, np.arange(8.0))
+    assert (from_epoch_days(days) == dates.append(more)).all()
+
+
+def test_truncate_array(tmp_path):
+    path = tmp_path / 'values.npy'
+    np.save(path, np.arange(10.0))
+    truncate_array(path, 6)
+    np.testing.assert_array_equal(np.load(path), np.arange(6.0))
+    truncate_array(path, 8)  # never grows
+    assert len(np.load(path)) == 6
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('arviz')
+
+from scripts.conjugate_dp import fit_conjugate_dp
+from scripts.model_selection import pointwise_log_likelihood, select_n_change_points
+
+PLANTED = [40, 80]
+
+
+@pytest.fixture(scope='module')
+def returns():
+    rng = np.random.default_rng(4)
+    return np.concatenate([rng.normal(0.0, 0.01, 40), rng.normal(0.03, 0.02, 40), rng.normal(-0.02, 0.01, 40)])
+
+
+def test_evidence_table_matches_fixed_k_fits(returns):
+    table, best_k, trace = select_n_change_points(returns, k_max=4, random_seed=0, draws=200)
+    expected = [fit_conjugate_dp(returns, k, draws=1)[1] for k in table['n_change_points']]
+    np.testing.assert_allclose(table['log_evidence'], expected, rtol=1e-10)
+    assert table['weight'].sum() == pytest.approx(1)
+    assert best_k == len(PLANTED)
+    assert table.loc[table['rank'] == 1, 'n_change_points'].item() == best_k
+    assert trace.posterior.attrs['log_evidence'] == pytest.approx(expected[best_k - 1])
+    assert trace.posterior['tau_sorted'].shape[-1] == best_k
+
+
+def test_pointwise_log_likelihood_uses_each_draws_segments(returns):
+    import arviz as az
+
+    tau = np.array(PLANTED)
+    mu, sigma = np.array([0.0, 0.03, -0.02]), np.array([0.01, 0.02, 0.01])
+    trace = az.from_dict(posterior={'tau_sorted': tau[None, None], 'mu': mu[None, None], 'sigma': sigma[None, None]})
+    segment = np.repeat([0, 1, 2], 40)
+    expected = (-0.5 * ((returns - mu[segment]) / sigma[segment]) ** 2 - np.log(sigma[segment])
+                - 0.5 * np.log(2 * np.pi))
+    np.testing.assert_allclose(pointwise_log_likelihood(trace, returns)[0, 0], expected)
+
+
+def test_loo_picks_the_planted_number_of_change_points(returns):
+    pytest.importorskip('pymc')
+    table, best_k, trace = select_n_change_points(returns, k_max=3, variant='marginal', cores=3, random_seed=0,
+                                                  draws=150, tune=150, chains=2)
+    assert best_k == len(PLANTED)
+    assert list(table.columns[:3]) == ['n_change_points', 'elpd_loo', 'se']
+    assert trace.posterior['tau_sorted'].shape[-1] == best_k
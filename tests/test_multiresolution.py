@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+az = pytest.importorskip('arviz')
+
+from scripts.conjugate_dp import fit_conjugate_dp
+from scripts.multiresolution import aggregate_returns, coarse_windows, fit_multiresolution, refine_windows
+
+PLANTED = [600, 1300]
+
+
+@pytest.fixture(scope='module')
+def returns():
+    rng = np.random.default_rng(7)
+    return np.concatenate([rng.normal(0, 0.01, 600), rng.normal(0, 0.04, 700), rng.normal(0, 0.01, 500)])
+
+
+def _modes(trace):
+    tau = trace.posterior['tau_sorted'].values
+    tau = tau.reshape(-1, tau.shape[-1])
+    return [np.bincount(column).argmax() for column in tau.T]
+
+
+def test_blocks_are_scaled_to_daily_variance():
+    x = np.arange(1.0, 11.0)
+    np.testing.assert_allclose(aggregate_returns(x, 4), [10 / 2, 26 / 2, 19 / np.sqrt(2)])
+    noise = np.random.default_rng(0).normal(0, 0.01, 21 * 4000)
+    assert aggregate_returns(noise, 21).std() == pytest.approx(0.01, rel=0.03)
+
+
+def test_refined_windows_contain_the_coarse_modes():
+    tau = np.tile([[3, 9]], (200, 1))
+    tau[:5, 0] = 2
+    trace = az.from_dict(posterior={'tau_sorted': tau[None]})
+    windows = refine_windows(trace, 5, n_fine=48, coverage=0.9)
+    # The 2.5% at 2 falls outside the 90% interval; one coarse block of
+    # margin either side, the second window clipped to n_fine - 1
+    assert windows == [(10, 20), (40, 47)]
+
+
+def test_coarse_to_fine_finds_the_full_resolution_modes(returns):
+    windows = coarse_windows(returns, 2, 'conjugate_dp', levels=(21,), random_seed=0, draws=500)
+    for (lo, hi), planted in zip(windows, PLANTED):
+        assert lo <= planted <= hi
+        assert hi - lo < len(returns) / 8
+    trace, _, _ = fit_multiresolution(returns, 2, 'conjugate_dp', levels=(20, 5), random_seed=0, draws=2000)
+    full, _ = fit_conjugate_dp(returns, 2, draws=2000, random_seed=0)
+    assert _modes(trace) == _modes(az.from_dict(posterior=full))
+
+
+def test_levels_must_nest(returns):
+    with pytest.raises(ValueError, match='multiple'):
+        coarse_windows(returns, 2, 'conjugate_dp', levels=(21, 5))
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('pymc')
+pytest.importorskip('arviz')
+
+from scripts.parallel_sampling import chain_seeds, model_factory, sample_parallel
+
+
+def test_chain_seeds_are_distinct_and_reproducible():
+    seeds = chain_seeds(42, 8)
+    assert len(set(seeds)) == 8
+    assert chain_seeds(42, 8) == seeds
+    assert chain_seeds(42, 4) == seeds[:4]
+    assert chain_seeds(43, 8) != seeds
+
+
+@pytest.fixture(scope='module')
+def factory():
+    rng = np.random.default_rng(0)
+    return model_factory('marginal', np.concatenate([rng.normal(0, 0.01, 25), rng.normal(0.02, 0.03, 25)]), 1)
+
+
+def test_worker_chains_merge_and_match_in_process_sampling(factory):
+    trace = sample_parallel(factory, draws=30, tune=30, chains=3, cores=3, random_seed=5)
+    assert list(trace.posterior['chain'].values) == [0, 1, 2]
+    assert list(trace.sample_stats['chain'].values) == [0, 1, 2]
+    mu = trace.posterior['mu'].values
+    assert mu.shape[:2] == (3, 30)
+    assert not np.allclose(mu[0], mu[1]) and not np.allclose(mu[1], mu[2])
+    # Each chain depends on its seed only, not on where it ran
+    serial = sample_parallel(factory, draws=30, tune=30, chains=3, cores=1, random_seed=5)
+    np.testing.assert_array_equal(serial.posterior['mu'].values, mu)
@@ -0,0 +1,106 @@
+import time
+
+import numpy as np
+import pytest
+
+import scripts.pelt as pelt_module
+
+from scripts.benchmark import synthetic_series
+from scripts.pelt import COSTS, DEFAULT_MIN_SIZE, default_penalty, pelt, pelt_sweep
+from scripts.segment_stats import cumulative_sums
+
+
+def _optimal_partitioning(x, penalty, cost, min_size):
+    # O(n^2) optimal partitioning without pruning, the result PELT must reproduce
+    c1, c2 = cumulative_sums(x)
+    n = len(x)
+    cost_fn = COSTS[cost]
+    F = np.full(n + 1, np.inf)
+    F[0] = -penalty
+    last = np.zeros(n + 1, dtype=np.int64)
+    for t in range(min_size, n + 1):
+        starts = np.array([s for s in range(t - min_size + 1) if s == 0 or s >= min_size])
+        values = F[starts] + cost_fn(c1, c2, starts, t) + penalty
+        last[t] = starts[np.argmin(values)]
+        F[t] = values.min()
+    change_points, t = [], last[n]
+    while t > 0:
+        change_points.append(int(t))
+        t = last[t]
+    return change_points[::-1], F[n]
+
+
+def _total_cost(x, change_points, penalty, cost):
+    c1, c2 = cumulative_sums(x)
+    bounds = np.array([0] + list(change_points) + [len(x)])
+    return COSTS[cost](c1, c2, bounds[:-1], bounds[1:]).sum() + penalty * len(change_points)
+
+
+@pytest.fixture
+def returns():
+    rng = np.random.default_rng(1)
+    return np.concatenate([rng.normal(0, 0.01, 120), rng.normal(0.01, 0.03, 80), rng.normal(-0.005, 0.015, 100)])
+
+
+@pytest.mark.parametrize('cost', ['mean', 'meanvar'])
+@pytest.mark.parametrize('factor', [0.25, 1, 4])
+def test_matches_optimal_partitioning(returns, cost, factor):
+    penalty = default_penalty(returns, cost) * factor
+    min_size = DEFAULT_MIN_SIZE[cost]
+    expected, optimum = _optimal_partitioning(returns, penalty, cost, min_size)
+    found = pelt(returns, penalty, cost)
+    assert _total_cost(returns, found, penalty, cost) == pytest.approx(optimum, rel=1e-9, abs=1e-12)
+    assert found == expected
+
+
+def test_finds_planted_breaks(returns):
+    found = pelt(returns, cost='meanvar')
+    assert len(found) == 2
+    assert abs(found[0] - 120) <= 10 and abs(found[1] - 200) <= 10
+
+
+def test_sweep_matches_single_runs(returns):
+    penalties = [default_penalty(returns, 'meanvar') * f for f in (0.5, 1, 2)]
+    sweep = pelt_sweep(returns, penalties, cost='meanvar')
+    assert sweep == {p: pelt(returns, p, cost='meanvar') for p in penalties}
+
+
+@pytest.mark.parametrize('cost', ['mean', 'meanvar'])
+@pytest.mark.parametrize('seed', range(5))
+def test_matches_optimal_partitioning_on_random_series(cost, seed):
+    x, _ = synthetic_series(400, n_breaks=6, random_seed=seed, kind=cost)
+    penalty = default_penalty(x, cost)
+    expected, _ = _optimal_partitioning(x, penalty, cost, DEFAULT_MIN_SIZE[cost])
+    assert pelt(x, penalty, cost) == expected
+
+
+def test_sweep_over_many_penalties_matches_single_runs(returns, monkeypatch):
+    base = default_penalty(returns, 'meanvar')
+    penalties = list(base * np.geomspace(0.05, 20, 25))
+    expected = {p: pelt(returns, p, cost='meanvar') for p in penalties}
+    calls = []
+    run = pelt_module._pelt
+    monkeypatch.setattr(pelt_module, '_pelt', lambda *args: calls.append(args[2]) or run(*args))
+    assert pelt_sweep(returns, penalties, cost='meanvar') == expected
+    # Penalties sharing a segmentation with their neighbours are never run
+    assert len(calls) < len(penalties)
+
+
+def _best_time(f, repeats=3):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def test_runtime_grows_roughly_linearly():
+    # With a break every ~250 points pruning keeps the candidate set bounded;
+    # without it four times the data would take sixteen times as long
+    times = []
+    for n in (10_000, 40_000):
+        x, _ = synthetic_series(n, n_breaks=n // 250, random_seed=0)
+        times.append(_best_time(lambda: pelt(x, cost='meanvar')))
+    assert times[1] / times[0] < 8
+    assert times[1] < 5
@@ -0,0 +1,56 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from scripts.posterior_cache import PosteriorCache, posterior_key
+
+az = pytest.importorskip('arviz')
+
+
+def _trace(seed=0, draws=50):
+    rng = np.random.default_rng(seed)
+    return az.from_dict(posterior={'mu': rng.normal(size=(2, draws, 3)), 'sigma': rng.gamma(2, size=(2, draws))})
+
+
+def test_key_depends_on_data_model_sampler_and_seed():
+    x = np.arange(10.0)
+    key = posterior_key(x, {'variant': 'marginal'}, {'draws': 100}, 1)
+    assert key == posterior_key(x.copy(), {'variant': 'marginal'}, {'draws': 100}, 1)
+    assert len({key,
+                posterior_key(x + 1, {'variant': 'marginal'}, {'draws': 100}, 1),
+                posterior_key(x, {'variant': 'discrete'}, {'draws': 100}, 1),
+                posterior_key(x, {'variant': 'marginal'}, {'draws': 200}, 1),
+                posterior_key(x, {'variant': 'marginal'}, {'draws': 100}, 2)}) == 5
+
+
+def test_put_then_get_round_trip(tmp_path):
+    cache = PosteriorCache(tmp_path)
+    trace = _trace()
+    assert cache.get('a') is None
+    cache.put('a', trace, {'variant': 'marginal', 'n_obs': 10})
+    restored = cache.get('a')
+    np.testing.assert_array_equal(restored.posterior['mu'].values, trace.posterior['mu'].values)
+    assert cache.metadata('a')['n_obs'] == 10
+    cache.put('b', _trace(1), {'variant': 'marginal', 'n_obs': 12})
+    cache.put('c', _trace(2), {'variant': 'discrete', 'n_obs': 12})
+    assert [key for key, _ in cache.find(variant='marginal')] == ['b', 'a']
+
+
+def test_evicts_expired_then_least_recently_used(tmp_path):
+    cache = PosteriorCache(tmp_path, max_age_days=1)
+    for i, key in enumerate('abc'):
+        cache.put(key, _trace(i))
+    old = time.time() - 2 * 86400
+    os.utime(cache.path('a'), (old, old))
+    assert cache.evict() == ['a']
+
+    size = os.path.getsize(cache.path('b'))
+    cache.max_bytes = 2 * size + size // 2
+    now = time.time()
+    os.utime(cache.path('b'), (now - 60, now - 60))
+    cache.get('b')  # refreshes b, so c is now least recently used
+    cache.put('d', _trace(3))
+    assert sorted(key for _, _, key in cache.entries()) == ['b', 'd']
+    assert not os.path.exists(tmp_path / 'c.json')
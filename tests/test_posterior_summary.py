@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.posterior_summary import hdi_bounds, summarize_change_points, tau_histograms
+
+
+def _brute_force_hdi(counts, prob):
+    need = np.ceil(prob * counts.sum())
+    best = None
+    for lo in range(len(counts)):
+        for hi in range(lo, len(counts)):
+            if counts[lo:hi + 1].sum() >= need:
+                if best is None or hi - lo < best[1] - best[0]:
+                    best = (lo, hi)
+                break
+    return best
+
+
+@pytest.fixture
+def tau_draws():
+    rng = np.random.default_rng(0)
+    first = rng.choice([3, 4, 5, 9, 10], size=(4, 250), p=[0.1, 0.3, 0.2, 0.15, 0.25])
+    second = rng.integers(20, 40, size=(4, 250))
+    return np.stack([first, second], axis=-1)
+
+
+def test_histograms_count_every_draw(tau_draws):
+    counts = tau_histograms(tau_draws)
+    for k in range(2):
+        np.testing.assert_array_equal(counts[k], np.bincount(tau_draws[..., k].ravel(), minlength=40))
+
+
+@pytest.mark.parametrize('prob', [0.1, 0.5, 0.94, 1.0])
+def test_hdi_bounds_match_brute_force(tau_draws, prob):
+    counts = tau_histograms(tau_draws)
+    lo, hi = hdi_bounds(counts, prob)
+    for k in range(counts.shape[0]):
+        assert (lo[k], hi[k]) == _brute_force_hdi(counts[k], prob)
+
+
+def test_hdi_of_a_point_mass():
+    counts = np.zeros((1, 8), dtype=np.int64)
+    counts[0, 5] = 10
+    assert [b.tolist() for b in hdi_bounds(counts, 0.94)] == [[5], [5]]
+
+
+def test_summary_statistics(tau_draws):
+    dates = pd.date_range('2020-01-01', periods=42)
+    summary, pmf = summarize_change_points(tau_draws, dates)
+    flat = tau_draws.reshape(-1, 2)
+    for k in range(2):
+        row = summary.iloc[k]
+        assert row['mode'] == np.bincount(flat[:, k]).argmax()
+        assert row['mean'] == pytest.approx(flat[:, k].mean())
+        assert row['median'] == np.quantile(flat[:, k], 0.5, method='inverted_cdf')
+        assert row['mode_date'] == dates[row['mode'] + 1]
+    assert pmf.groupby('change_point')['probability'].sum().to_numpy() == pytest.approx([1, 1])
+    assert (pmf['date'] == dates[pmf['tau'] + 1]).all()
@@ -0,0 +1,51 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts import price_cache
+from scripts.price_cache import load_price_arrays, load_price_frame
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'prices.csv'
+    path.write_text('Date,Price\n20-May-87,18.63\n22-May-87,18.55\n21-May-87,18.45\n'
+                    '"Apr 22, 2020",13.77\n')
+    return str(path)
+
+
+def _forbid_parsing(monkeypatch):
+    def fail(path):
+        raise AssertionError('CSV parsed despite a cached entry')
+    monkeypatch.setattr(price_cache, 'parse_price_csv', fail)
+
+
+def test_parses_mixed_dates_sorted(csv_path, tmp_path):
+    df = load_price_frame(csv_path, cache_dir=tmp_path / 'cache')
+    assert df['Date'].dt.strftime('%Y-%m-%d').tolist() == ['1987-05-20', '1987-05-21', '1987-05-22', '2020-04-22']
+    assert df['Price'].tolist() == [18.63, 18.45, 18.55, 13.77]
+
+
+def test_unchanged_file_is_served_from_cache(csv_path, tmp_path, monkeypatch):
+    days, prices = load_price_arrays(csv_path, tmp_path / 'cache')
+    _forbid_parsing(monkeypatch)
+    cached_days, cached_prices = load_price_arrays(csv_path, tmp_path / 'cache')
+    assert isinstance(cached_prices, np.memmap)
+    np.testing.assert_array_equal(cached_days, days)
+    np.testing.assert_array_equal(cached_prices, prices)
+
+    # Same content with a new mtime is recognised by its hash
+    os.utime(csv_path, ns=(0, 10 ** 18))
+    np.testing.assert_array_equal(load_price_arrays(csv_path, tmp_path / 'cache')[1], prices)
+
+
+def test_changed_content_is_parsed_again(csv_path, tmp_path):
+    load_price_frame(csv_path, cache_dir=tmp_path / 'cache')
+    with open(csv_path, 'a') as f:
+        f.write('23-Apr-20,14.00\n')
+    df = load_price_frame(csv_path, cache_dir=tmp_path / 'cache')
+    assert len(df) == 5 and df['Price'].iloc[-1] == 14.0
+    assert df['Date'].is_monotonic_increasing
+    pd.testing.assert_frame_equal(df, price_cache.parse_price_csv(csv_path), check_dtype=False)
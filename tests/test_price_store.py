@@ -0,0 +1,37 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from scripts.price_store import current_version, open_published_store, publish_price_store
+
+
+def _prices(n, start=50.0):
+    return pd.bdate_range('2020-01-01', periods=n).values, start + np.arange(n, dtype=float)
+
+
+def test_publish_then_open(tmp_path):
+    dates, prices = _prices(5)
+    assert publish_price_store(tmp_path, dates, prices, 'v1')
+    version, days, opened = open_published_store(tmp_path)
+    assert version == 'v1' and isinstance(opened, np.memmap)
+    np.testing.assert_array_equal(opened, prices)
+    np.testing.assert_array_equal(days, dates.astype('datetime64[D]').astype(np.int64))
+
+
+def test_unchanged_version_is_not_rewritten(tmp_path):
+    publish_price_store(tmp_path, *_prices(5), 'v1')
+    path = tmp_path / 'v1' / 'prices.npy'
+    before = os.stat(path).st_mtime_ns
+    assert not publish_price_store(tmp_path, *_prices(5), 'v1')
+    assert os.stat(path).st_mtime_ns == before
+
+
+def test_new_version_replaces_current_and_keeps_one_predecessor(tmp_path):
+    for i, version in enumerate(['v1', 'v2', 'v3']):
+        publish_price_store(tmp_path, *_prices(5 + i), version)
+    assert current_version(tmp_path) == 'v3'
+    assert sorted(entry.name for entry in os.scandir(tmp_path) if entry.is_dir()) == ['v2', 'v3']
+    # A reader that cached v2 keeps consistent arrays until it sees the new CURRENT
+    _, days, prices = open_published_store(tmp_path)
+    assert len(days) == len(prices) == 7
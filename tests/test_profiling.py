@@ -0,0 +1,46 @@
+import json
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from scripts.profiling import StageProfiler, resource
+
+
+def test_records_every_stage(tmp_path):
+    profiler = StageProfiler()
+    profiler.begin('first')
+    profiler.begin('second')
+    with profiler.stage('third'):
+        sum(range(10000))
+    profiler.write_json(tmp_path / 'run.json')
+    record = json.loads((tmp_path / 'run.json').read_text())
+    assert [s['stage'] for s in record['stages']] == ['first', 'second', 'third']
+    # Memory tracing is opt-in
+    assert all(s['peak_mem_delta_mb'] is None for s in record['stages'])
+    assert all(s['wall_s'] >= 0 and s['cpu_s'] >= 0 for s in record['stages'])
+
+
+def test_peak_memory_is_relative_to_the_stage_start(tmp_path):
+    profiler = StageProfiler(trace_memory=True)
+    with profiler.stage('setup'):
+        held = np.ones(2 ** 22)  # 32 MB that stays alive through the next stage
+    with profiler.stage('work'):
+        np.ones(2 ** 21).sum()  # 16 MB, freed before the stage ends
+    profiler.write_json(tmp_path / 'run.json')  # also stops tracemalloc
+    setup, work = profiler.stages
+    assert setup['peak_mem_delta_mb'] == pytest.approx(32, abs=1)
+    assert work['peak_mem_delta_mb'] == pytest.approx(16, abs=1)
+    del held
+
+
+@pytest.mark.skipif(resource is None, reason='no getrusage')
+def test_counts_child_process_cpu():
+    profiler = StageProfiler()
+    with profiler.stage('children'):
+        subprocess.run([sys.executable, '-c', 'import time\nend = time.process_time() + 0.3\n'
+                        'while time.process_time() < end: pass'], check=True)
+    stage = profiler.stages[0]
+    assert stage['children_cpu_s'] >= 0.25
+    assert stage['cpu_s'] < stage['children_cpu_s']
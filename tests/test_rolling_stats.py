@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.rolling_stats import ewma_column, rolling_columns, rolling_statistics, rolling_std
+
+WINDOWS = (2, 5, 30, 252)
+
+
+@pytest.fixture
+def returns():
+    rng = np.random.default_rng(0)
+    # A large common offset stresses the centring of the prefix sums
+    return 0.5 + rng.standard_t(4, 2000) * 0.02
+
+
+def _pandas_rolling(x, w):
+    rolling = pd.Series(x).rolling(w)
+    return rolling.mean().to_numpy(), rolling.std().to_numpy(), rolling.skew().to_numpy()
+
+
+def _ewma(x, lam):
+    variance = np.empty(len(x))
+    previous = x[0] ** 2
+    for t, value in enumerate(x):
+        previous = lam * previous + (1 - lam) * value ** 2
+        variance[t] = previous
+    return np.sqrt(variance * 252)
+
+
+@pytest.mark.parametrize('chunk_size', [7, 300, 5000])
+def test_matches_pandas_rolling(returns, chunk_size):
+    table = rolling_statistics(returns, WINDOWS, lambdas=(0.94, 0.975), chunk_size=chunk_size)
+    assert list(table) == rolling_columns(WINDOWS, (0.94, 0.975))
+    for w in WINDOWS:
+        mean, std, skew = _pandas_rolling(returns, w)
+        np.testing.assert_allclose(table[f'mean_{w}'], mean, rtol=1e-9, atol=1e-12)
+        np.testing.assert_allclose(table[f'std_{w}'], std, rtol=1e-7, atol=1e-12)
+        if w > 2:
+            np.testing.assert_allclose(table[f'skew_{w}'], skew, rtol=1e-6, atol=1e-8)
+        realized = np.sqrt(pd.Series(returns ** 2).rolling(w).mean().to_numpy() * 252)
+        np.testing.assert_allclose(table[f'realized_vol_{w}'], realized, rtol=1e-9)
+    for lam in (0.94, 0.975):
+        np.testing.assert_allclose(table[ewma_column(lam)], _ewma(returns, lam), rtol=1e-10)
+
+
+@pytest.mark.parametrize('chunk_size', [7, 300, 5000])
+@pytest.mark.parametrize('window', [2, 30, 252])
+def test_rolling_std_matches_pandas(returns, window, chunk_size):
+    expected = pd.Series(returns).rolling(window).std().to_numpy()
+    np.testing.assert_allclose(rolling_std(returns, window, chunk_size), expected, rtol=1e-7, atol=1e-12)
+
+
+def test_short_series_and_memory_map(returns, tmp_path):
+    assert np.isnan(rolling_std(returns[:3], 5)).all()
+    np.save(tmp_path / 'returns.npy', returns)
+    mapped = np.load(tmp_path / 'returns.npy', mmap_mode='r')
+    pd.testing.assert_frame_equal(rolling_statistics(mapped, (30,), chunk_size=100),
+                                  rolling_statistics(returns, (30,), chunk_size=100))
+
+
+def test_ewma_names_keep_every_digit():
+    assert [ewma_column(lam) for lam in (0.94, 0.97, 0.975, 0.98)] == [
+        'ewma_vol_94', 'ewma_vol_97', 'ewma_vol_975', 'ewma_vol_98']
+    with pytest.raises(ValueError):
+        rolling_statistics(np.zeros(10), (5,), lambdas=(1.0,))
@@ -0,0 +1,61 @@
+import itertools
+
+import numpy as np
+import pytest
+from scipy.special import logsumexp
+from scipy.stats import norm
+
+from scripts.segment_stats import (
+    changepoint_log_evidence,
+    cumulative_sums,
+    log_n_allowed,
+    log_n_configurations,
+    prefix_normal_loglik,
+    segment_normal_logp,
+    window_mask,
+)
+
+
+@pytest.fixture
+def returns():
+    return np.random.default_rng(0).normal(0.001, 0.02, 14)
+
+
+def _direct_logp(x, tau, mu, sigma):
+    bounds = [0] + list(tau) + [len(x)]
+    means = np.repeat(mu, np.diff(bounds))
+    return norm.logpdf(x, means, sigma).sum()
+
+
+def test_segment_normal_logp_matches_direct_sum(returns):
+    c1, c2 = cumulative_sums(returns)
+    mu = [0.01, -0.02, 0.005]
+    for tau in [(3, 9), (1, 13), (7, 8)]:
+        assert segment_normal_logp(c1, c2, tau, mu, 0.03) == pytest.approx(
+            _direct_logp(returns, tau, mu, 0.03), rel=1e-12)
+
+
+def test_prefix_loglik_differences_are_segment_logliks(returns):
+    c1, c2 = cumulative_sums(returns)
+    mu = np.array([0.01, -0.02])
+    E = prefix_normal_loglik(c1, c2, mu, 0.03)
+    assert E.shape == (2, len(returns) + 1)
+    for k, (s, t) in itertools.product(range(2), [(0, 14), (3, 9), (5, 6)]):
+        assert E[k, t] - E[k, s] == pytest.approx(norm.logpdf(returns[s:t], mu[k], 0.03).sum(), rel=1e-10)
+
+
+def test_log_evidence_matches_enumeration(returns):
+    c1, c2 = cumulative_sums(returns)
+    mu = np.array([0.01, -0.02, 0.005])
+    E = prefix_normal_loglik(c1, c2, mu, 0.03)
+    placements = list(itertools.combinations(range(1, len(returns)), 2))
+    expected = logsumexp([_direct_logp(returns, tau, mu, 0.03) for tau in placements])
+    assert changepoint_log_evidence(E) == pytest.approx(expected, rel=1e-10)
+
+
+def test_placement_counts(returns):
+    n = len(returns)
+    assert np.exp(log_n_configurations(n, 3)) == pytest.approx(len(list(itertools.combinations(range(1, n), 3))))
+    windows = [(2, 6), (4, 11)]
+    expected = sum(1 for a, b in itertools.combinations(range(1, n), 2) if 2 <= a <= 6 and 4 <= b <= 11)
+    assert np.exp(log_n_allowed(window_mask(windows, n))) == pytest.approx(expected)
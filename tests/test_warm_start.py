@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+az = pytest.importorskip('arviz')
+
+from scripts.warm_start import adapted_step_size, warm_start_id, warm_start_point, warm_step_factory
+
+
+@pytest.fixture
+def trace():
+    rng = np.random.default_rng(0)
+    tau = np.array([[[10, 30], [10, 31], [11, 30]], [[10, 30], [12, 29], [10, 30]]])
+    return az.from_dict(posterior={'tau_sorted': tau, 'mu': rng.normal([0.0, 0.01, -0.01], 0.002, (2, 3, 3)),
+                                   'sigma': rng.lognormal(np.log(0.02), 0.1, (2, 3))},
+                        sample_stats={'step_size': np.array([[0.3, 0.3, 0.3], [0.5, 0.5, np.nan]])})
+
+
+def test_start_point_is_the_previous_posterior(trace):
+    point = warm_start_point(trace, 'discrete', n_obs=50)
+    np.testing.assert_allclose(point['mu'], trace.posterior['mu'].values.mean(axis=(0, 1)))
+    assert point['sigma'] == pytest.approx(trace.posterior['sigma'].values.mean())
+    np.testing.assert_array_equal(point['tau'], [10, 30])
+    assert 'tau' not in warm_start_point(trace, 'marginal', n_obs=50)
+
+
+def test_start_tau_is_kept_inside_the_data_and_windows(trace):
+    np.testing.assert_array_equal(warm_start_point(trace, 'discrete', n_obs=25)['tau'], [10, 24])
+    windowed = warm_start_point(trace, 'discrete', n_obs=50, windows=[(12, 20), (21, 28)])
+    np.testing.assert_array_equal(windowed['tau'], [12, 28])
+
+
+def test_adapted_step_size_skips_undefined_chains(trace):
+    assert adapted_step_size(trace) == pytest.approx(0.4)
+    del trace.sample_stats['step_size']
+    assert adapted_step_size(trace) is None
+
+
+def test_warm_nuts_uses_the_previous_step_size_and_mass_matrix(trace):
+    pytest.importorskip('pymc')
+    from scripts.cp_models import build_marginal_cp_model
+
+    factory = warm_step_factory(trace)
+    returns = np.random.default_rng(1).normal(0, 0.02, 50)
+    with build_marginal_cp_model(returns, 2) as model:
+        step = factory(model)
+    posterior = trace.posterior
+    log_sigma = np.log(posterior['sigma'].values)
+    expected_mean = np.concatenate([posterior['mu'].values.mean(axis=(0, 1)), [log_sigma.mean()]])
+    expected_var = np.concatenate([posterior['mu'].values.var(axis=(0, 1)), [log_sigma.var()]])
+    assert [v.name for v in step.vars] == ['mu', 'sigma_log__']
+    np.testing.assert_allclose(step.potential._initial_mean, expected_mean)
+    np.testing.assert_allclose(step.potential._initial_diag, expected_var)
+    assert step.step_size == pytest.approx(0.4)
+
+
+def test_warm_start_id_follows_the_posterior(trace):
+    assert warm_start_id('some-key') == 'some-key'
+    before = warm_start_id(trace)
+    trace.posterior['mu'] = trace.posterior['mu'] + 1e-9
+    assert warm_start_id(trace) != before